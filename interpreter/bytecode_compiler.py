@@ -0,0 +1,422 @@
+from __future__ import annotations
+import typing
+from typing import Callable, List, Optional
+
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, ExprVisitor, GetExpr, GroupingExpr, LiteralExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.function_type import FunctionType
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.op_code import OpCode
+from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt, Stmt, StmtVisitor, VarStmt, WhileStmt
+from interpreter.vm_objects import VMFunction
+
+
+class Local:
+    __slots__ = ('name', 'depth', 'is_captured')
+
+    def __init__(self, name: str, depth: int) -> None:
+        self.name = name
+        self.depth = depth
+        self.is_captured = False
+
+
+class Loop:
+    """
+    An enclosing while loop, or top-level statement, that a break ends: how
+    many locals were live when it started, and the jumps its break
+    statements need patched to its exit.
+    """
+    def __init__(self, local_count: int) -> None:
+        self.local_count = local_count
+        self.breaks: List[int] = list()
+
+
+class FunctionScope:
+    """
+    Compile-time state of one function, in the shape of clox's Compiler: its
+    locals in stack slot order, the upvalues it captures and its loops.
+    """
+    def __init__(self, enclosing: Optional[FunctionScope], function: VMFunction, function_type: FunctionType) -> None:
+        self.enclosing = enclosing
+        self.function = function
+        self.function_type = function_type
+        # Slot 0 holds the callee, or the receiver for methods.
+        slot_zero = "this" if function_type in (FunctionType.METHOD, FunctionType.INITIALIZER) else ""
+        self.locals: List[Local] = [Local(slot_zero, 0)]
+        self.upvalues: List[tuple[int, bool]] = list()
+        self.scope_depth = 0
+        self.loops: List[Loop] = list()
+
+
+BINARY_OPS = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+}
+
+
+class BytecodeCompiler(ExprVisitor, StmtVisitor):
+    """
+    Compiles resolved statements into a VMFunction for the VM, following
+    clox: locals live in stack slots, variables captured by closures become
+    upvalues and everything else is a global looked up by name. The resolver
+    has already reported every static error, so scoping is simply
+    recomputed here in the VM's terms.
+
+    Each instruction's line is the line of the token the tree-walking
+    Interpreter would report a runtime error at, so errors read the same.
+    """
+    def __init__(self, error_handler: LoxErrorHandler, repl: bool = False) -> None:
+        self.error_handler = error_handler
+        self.repl = repl
+        self.scope: FunctionScope = FunctionScope(None, VMFunction(""), FunctionType.NONE)
+        self.line = 1
+
+    def compile(self, statements: List[Stmt]) -> VMFunction:
+        for statement in statements:
+            # As in the tree-walker, a break no loop catches ends the top-level
+            # statement it is in, so each one is a break target of its own.
+            self.break_target(lambda: self.compile_stmt(statement))
+        self.emit_return()
+        return self.scope.function
+
+    def compile_stmt(self, stmt: Stmt) -> None:
+        stmt.accept(self)
+
+    def compile_expr(self, expr: Expr) -> None:
+        if isinstance(expr, FunctionStmt):
+            self.function_expression(expr)
+        else:
+            expr.accept(self)
+
+    def emit(self, *codes: int, line: Optional[int] = None) -> int:
+        chunk = self.scope.function.chunk
+        if line is not None:
+            self.line = line
+        for code in codes:
+            chunk.write(code, self.line)
+        return len(chunk.code) - len(codes)
+
+    def emit_constant(self, value: object) -> None:
+        self.emit(OpCode.CONSTANT, self.scope.function.chunk.add_constant(value))
+
+    def make_name(self, name: str) -> int:
+        return self.scope.function.chunk.add_constant(name)
+
+    def emit_jump(self, op: int, line: Optional[int] = None) -> int:
+        return self.emit(op, -1, line=line) + 1
+
+    def patch_jump(self, operand: int) -> None:
+        code = self.scope.function.chunk.code
+        code[operand] = len(code) - operand - 1
+
+    def emit_loop(self, loop_start: int) -> None:
+        code = self.scope.function.chunk.code
+        self.emit(OpCode.LOOP, len(code) + 2 - loop_start)
+
+    def emit_return(self) -> None:
+        if self.scope.function_type == FunctionType.INITIALIZER:
+            self.emit(OpCode.GET_LOCAL, 0)
+        else:
+            self.emit(OpCode.NIL)
+        self.emit(OpCode.RETURN)
+
+    def begin_scope(self) -> None:
+        self.scope.scope_depth += 1
+
+    def end_scope(self) -> None:
+        scope = self.scope
+        scope.scope_depth -= 1
+        while scope.locals and scope.locals[-1].depth > scope.scope_depth:
+            self.emit(OpCode.CLOSE_UPVALUE if scope.locals[-1].is_captured else OpCode.POP)
+            scope.locals.pop()
+
+    def declare_variable(self, name: str) -> None:
+        if self.scope.scope_depth > 0:
+            self.scope.locals.append(Local(name, self.scope.scope_depth))
+
+    def define_variable(self, name: Token) -> None:
+        """
+        Binds the value on top of the stack to name: a local simply stays where
+        it is, a global is stored by name.
+        """
+        if self.scope.scope_depth == 0:
+            self.emit(OpCode.DEFINE_GLOBAL, self.make_name(name.lexeme), line=name.line)
+
+    @staticmethod
+    def resolve_local(scope: FunctionScope, name: str) -> int:
+        for slot in range(len(scope.locals) - 1, -1, -1):
+            if scope.locals[slot].name == name:
+                return slot
+        return -1
+
+    def resolve_upvalue(self, scope: FunctionScope, name: str) -> int:
+        if scope.enclosing is None:
+            return -1
+        local = self.resolve_local(scope.enclosing, name)
+        if local != -1:
+            scope.enclosing.locals[local].is_captured = True
+            return self.add_upvalue(scope, local, True)
+        upvalue = self.resolve_upvalue(scope.enclosing, name)
+        if upvalue != -1:
+            return self.add_upvalue(scope, upvalue, False)
+        return -1
+
+    @staticmethod
+    def add_upvalue(scope: FunctionScope, index: int, is_local: bool) -> int:
+        if (index, is_local) in scope.upvalues:
+            return scope.upvalues.index((index, is_local))
+        scope.upvalues.append((index, is_local))
+        scope.function.upvalue_count = len(scope.upvalues)
+        return len(scope.upvalues) - 1
+
+    def named_variable(self, name: str, line: int, assign: bool = False) -> None:
+        slot = self.resolve_local(self.scope, name)
+        if slot != -1:
+            self.emit(OpCode.SET_LOCAL if assign else OpCode.GET_LOCAL, slot, line=line)
+            return
+        upvalue = self.resolve_upvalue(self.scope, name)
+        if upvalue != -1:
+            self.emit(OpCode.SET_UPVALUE if assign else OpCode.GET_UPVALUE, upvalue, line=line)
+            return
+        self.emit(OpCode.SET_GLOBAL if assign else OpCode.GET_GLOBAL, self.make_name(name), line=line)
+
+    def function(self, stmt: FunctionStmt, function_type: FunctionType) -> None:
+        """
+        Compiles a function body in its own scope and emits the CLOSURE that
+        creates it at run time.
+        """
+        function = VMFunction(stmt.name.lexeme, len(stmt.params))
+        enclosing = self.scope
+        self.scope = FunctionScope(enclosing, function, function_type)
+        self.begin_scope()
+        for param in stmt.params:
+            self.declare_variable(param.lexeme)
+        for statement in stmt.body:
+            self.compile_stmt(statement)
+        self.emit_return()
+        scope = self.scope
+        self.scope = enclosing
+
+        self.emit(OpCode.CLOSURE, self.make_constant(function))
+        for index, is_local in scope.upvalues:
+            self.emit(1 if is_local else 0, index)
+
+    def make_constant(self, value: object) -> int:
+        return self.scope.function.chunk.add_constant(value)
+
+    def function_expression(self, stmt: FunctionStmt) -> None:
+        # Like Interpreter.visit_function_stmt, a function in expression
+        # position is still defined under its name at the top level.
+        self.function(stmt, FunctionType.FUNCTION)
+        if self.scope.scope_depth == 0:
+            self.emit(OpCode.DUP)
+            self.define_variable(stmt.name)
+
+    @staticmethod
+    def may_be_nil(expr: Optional[Expr]) -> bool:
+        while isinstance(expr, GroupingExpr):
+            expr = expr.expression
+        if isinstance(expr, LiteralExpr):
+            return expr.value is None
+        return not isinstance(expr, (BinaryExpr, UnaryExpr, FunctionStmt))
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self.begin_scope()
+        for statement in stmt.statements:
+            self.compile_stmt(statement)
+        self.end_scope()
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        name = stmt.name
+        self.declare_variable(name.lexeme)
+        self.emit(OpCode.CLASS, self.make_name(name.lexeme), line=name.line)
+        self.define_variable(name)
+
+        if stmt.superclass:
+            self.begin_scope()
+            self.visit_var_expr(stmt.superclass)
+            self.declare_variable("super")
+            self.named_variable(name.lexeme, name.line)
+            self.emit(OpCode.INHERIT, line=stmt.superclass.name.line)
+
+        self.named_variable(name.lexeme, name.line)
+        for method in stmt.methods:
+            function_type = FunctionType.INITIALIZER if method.name.lexeme == "init" else FunctionType.METHOD
+            self.function(method, function_type)
+            self.emit(OpCode.METHOD, self.make_name(method.name.lexeme), line=method.name.line)
+        self.emit(OpCode.POP)
+
+        if stmt.superclass:
+            self.end_scope()
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        self.compile_expr(stmt.expression)
+        if self.repl and self.scope.enclosing is None and self.scope.scope_depth == 0:
+            self.emit(OpCode.ECHO)
+        else:
+            self.emit(OpCode.POP)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        self.declare_variable(stmt.name.lexeme)
+        self.function(stmt, FunctionType.FUNCTION)
+        self.define_variable(stmt.name)
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        self.compile_expr(stmt.condition)
+        then_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self.compile_stmt(stmt.thenBranch)
+        if stmt.elsebranch:
+            else_jump = self.emit_jump(OpCode.JUMP)
+            self.patch_jump(then_jump)
+            self.compile_stmt(stmt.elsebranch)
+            self.patch_jump(else_jump)
+        else:
+            self.patch_jump(then_jump)
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        self.compile_expr(stmt.expression)
+        self.emit(OpCode.PRINT)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.value is None:
+            self.emit_return()
+            return
+        if stmt.tail:
+            # A call to a Lox function reuses this frame and never comes back
+            # to the RETURN; a call to anything else does, with its result.
+            call = typing.cast(CallExpr, stmt.value)
+            self.compile_expr(call.callee)
+            for argument in call.arguments:
+                self.compile_expr(argument)
+            self.emit(OpCode.TAIL_CALL, len(call.arguments), line=call.paren.line)
+        else:
+            self.compile_expr(stmt.value)
+        self.emit(OpCode.RETURN, line=stmt.keyword.line)
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        self.declare_variable(stmt.name.lexeme)
+        if stmt.initializer is not None:
+            self.compile_expr(stmt.initializer)
+        else:
+            self.emit(OpCode.NIL)
+        if self.may_be_nil(stmt.initializer):
+            self.emit(OpCode.CHECK_INITIALIZED, line=stmt.name.line)
+        self.define_variable(stmt.name)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        def loop() -> None:
+            loop_start = len(self.scope.function.chunk.code)
+            self.compile_expr(stmt.condition)
+            exit_jump = self.emit_jump(OpCode.POP_JUMP_IF_FALSE)
+            self.compile_stmt(stmt.body)
+            self.emit_loop(loop_start)
+            self.patch_jump(exit_jump)
+        self.break_target(loop)
+
+    def break_target(self, compile_code: Callable[[], None]) -> None:
+        """
+        Compiles code that break statements in it jump out of, and records
+        its range in the chunk, so that a break unwinding out of a function
+        called from it ends it as well.
+        """
+        chunk = self.scope.function.chunk
+        start = len(chunk.code)
+        loop = Loop(len(self.scope.locals))
+        self.scope.loops.append(loop)
+        compile_code()
+        self.scope.loops.pop()
+        for break_jump in loop.breaks:
+            self.patch_jump(break_jump)
+        chunk.break_targets.append((start, len(chunk.code), loop.local_count))
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        if not self.scope.loops:
+            # Outside any loop of its function, a break leaves the function
+            # and ends the loop running in the innermost caller that has one.
+            self.emit(OpCode.BREAK, line=stmt.keyword.line)
+            return
+        loop = self.scope.loops[-1]
+        # Discard the loop body's locals without forgetting them: the code
+        # after the break is still inside their scope.
+        for local in reversed(self.scope.locals[loop.local_count:]):
+            self.emit(OpCode.CLOSE_UPVALUE if local.is_captured else OpCode.POP, line=stmt.keyword.line)
+        loop.breaks.append(self.emit_jump(OpCode.JUMP, line=stmt.keyword.line))
+
+    def visit_ternary_expr(self, expr: TernaryExpr):
+        # Interpreter.visit_ternary_expr evaluates to nil without running any branch.
+        self.emit(OpCode.NIL)
+
+    def visit_assign_expr(self, expr: AssignExpr):
+        self.compile_expr(expr.value)
+        self.named_variable(expr.name.lexeme, expr.name.line, assign=True)
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        self.compile_expr(expr.left)
+        self.compile_expr(expr.right)
+        self.emit(BINARY_OPS[expr.operator.token_type], line=expr.operator.line)
+
+    def visit_call_expr(self, expr: CallExpr):
+        self.compile_expr(expr.callee)
+        for argument in expr.arguments:
+            self.compile_expr(argument)
+        self.emit(OpCode.CALL, len(expr.arguments), line=expr.paren.line)
+
+    def visit_get_expr(self, expr: GetExpr):
+        self.compile_expr(expr.obj)
+        self.emit(OpCode.GET_PROPERTY, self.make_name(expr.name.lexeme), line=expr.name.line)
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        self.compile_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        if expr.value is None:
+            self.emit(OpCode.NIL)
+        elif expr.value is True:
+            self.emit(OpCode.TRUE)
+        elif expr.value is False:
+            self.emit(OpCode.FALSE)
+        else:
+            self.emit_constant(expr.value)
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        self.compile_expr(expr.left)
+        jump = self.emit_jump(OpCode.JUMP_IF_TRUE if expr.operator.token_type == TokenType.OR else OpCode.JUMP_IF_FALSE)
+        self.emit(OpCode.POP)
+        self.compile_expr(expr.right)
+        self.patch_jump(jump)
+
+    def visit_set_expr(self, expr: SetExpr):
+        self.compile_expr(expr.obj)
+        # The Interpreter checks the object before evaluating the value, which
+        # is only observable when the value can fail or has side effects.
+        if not isinstance(expr.obj, ThisExpr) and not isinstance(expr.value, LiteralExpr):
+            self.emit(OpCode.CHECK_INSTANCE, line=expr.name.line)
+        self.compile_expr(expr.value)
+        self.emit(OpCode.SET_PROPERTY, self.make_name(expr.name.lexeme), line=expr.name.line)
+
+    def visit_super_expr(self, expr: SuperExpr):
+        self.named_variable("this", expr.keyword.line)
+        self.named_variable("super", expr.keyword.line)
+        self.emit(OpCode.GET_SUPER, self.make_name(expr.method.lexeme), line=expr.method.line)
+
+    def visit_this_expr(self, expr: ThisExpr):
+        self.named_variable("this", expr.keyword.line)
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        self.compile_expr(expr.right)
+        if expr.operator.token_type == TokenType.BANG:
+            self.emit(OpCode.NOT, line=expr.operator.line)
+        else:
+            self.emit(OpCode.NEGATE, line=expr.operator.line)
+
+    def visit_var_expr(self, expr: VarExpr):
+        self.named_variable(expr.name.lexeme, expr.name.line)
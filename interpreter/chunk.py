@@ -0,0 +1,68 @@
+from typing import Any, Dict, List, Optional, Tuple
+
+from interpreter.op_code import OpCode
+
+
+class Chunk:
+    """
+    A function's compiled code: the instruction list, its constant pool and a
+    line table holding the source line of every entry in code. Its break
+    targets are the code ranges a break ends, loops and top-level
+    statements, each with the number of locals live at its start.
+    """
+    def __init__(self) -> None:
+        self.code: List[int] = list()
+        self.constants: List[Any] = list()
+        self.lines: List[int] = list()
+        self.constant_indices: Dict[Tuple[type, str], int] = dict()
+        self.break_targets: List[Tuple[int, int, int]] = list()
+
+    def write(self, byte: int, line: int) -> int:
+        self.code.append(byte)
+        self.lines.append(line)
+        return len(self.code) - 1
+
+    def break_target(self, offset: int) -> Optional[Tuple[int, int, int]]:
+        """:return: the innermost break target whose code contains offset, if any"""
+        innermost: Optional[Tuple[int, int, int]] = None
+        for target in self.break_targets:
+            if target[0] <= offset < target[1] and (innermost is None or target[1] - target[0] < innermost[1] - innermost[0]):
+                innermost = target
+        return innermost
+
+    def add_constant(self, value: Any) -> int:
+        # Numbers and strings are shared. Keying on repr keeps 0.0 and -0.0
+        # apart, and other values (functions) are always added.
+        if not isinstance(value, (float, str)):
+            self.constants.append(value)
+            return len(self.constants) - 1
+        key = (type(value), repr(value))
+        if key not in self.constant_indices:
+            self.constants.append(value)
+            self.constant_indices[key] = len(self.constants) - 1
+        return self.constant_indices[key]
+
+    def disassemble(self, name: str) -> str:
+        lines: List[str] = [f'== {name} ==']
+        offset = 0
+        while offset < len(self.code):
+            op = self.code[offset]
+            operands = self.code[offset + 1:offset + 1 + OpCode.OPERANDS.get(op, 0)]
+            text = f'{offset:04} {self.lines[offset]:4} {OpCode.name(op):<18}'
+            if operands:
+                text += ' ' + ' '.join(str(operand) for operand in operands)
+            if op in (OpCode.CONSTANT, OpCode.GET_GLOBAL, OpCode.DEFINE_GLOBAL, OpCode.SET_GLOBAL, OpCode.GET_PROPERTY,
+                      OpCode.SET_PROPERTY, OpCode.GET_SUPER, OpCode.CLOSURE, OpCode.CLASS, OpCode.METHOD):
+                text += f" '{self.constants[operands[0]]}'"
+            offset += 1 + len(operands)
+            if op == OpCode.CLOSURE:
+                upvalue_count = self.constants[operands[0]].upvalue_count
+                pairs = self.code[offset:offset + 2 * upvalue_count]
+                text += ''.join(f" {'local' if is_local else 'upvalue'} {index}"
+                                for is_local, index in zip(pairs[::2], pairs[1::2]))
+                offset += 2 * upvalue_count
+            lines.append(text)
+        for constant in self.constants:
+            if hasattr(constant, 'chunk'):
+                lines.append(constant.chunk.disassemble(str(constant)))
+        return '\n'.join(lines)
@@ -0,0 +1,557 @@
+from __future__ import annotations
+from typing import Any, Callable, List, Optional
+
+from interpreter.break_exception import BreakException
+from interpreter.compiled_function import CompiledFunction
+from interpreter.completion import BREAK, RETURN, TAIL_CALL, Completion
+from interpreter.environment import Environment
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, GetExpr, GroupingExpr, LiteralExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.fused_expr import CompareLocalExpr, FieldUpdateExpr, IncrementLocalExpr
+from interpreter.global_environment import UNDEFINED
+from interpreter.interpreter import Interpreter
+from interpreter.lox_callable import LoxCallable
+from interpreter.lox_class import LoxClass
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_function import LoxFunction
+from interpreter.lox_instance import LoxInstance
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.quickened_expr import FloatBinaryExpr, FloatNegateExpr, GenericBinaryExpr, GenericUnaryExpr, StringAddExpr
+from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt, Stmt, VarStmt, WhileStmt
+
+# Compiled code takes the environment it runs in and returns the node's value;
+# for statements, a Completion when they break or return.
+Code = Callable[[Environment], Any]
+
+
+class ClosureCompiler(Interpreter):
+    """
+    Execution engine that compiles the resolved AST into nested Python
+    closures before running it. Every node is visited once: the visitor
+    dispatch, the operator match and the resolved variable coordinates are
+    all settled at compile time, and the closure that is left only does the
+    work of that one operation. Values, classes, instances and functions
+    are the same ones the tree-walking Interpreter uses.
+    """
+    def __init__(self, error_handler: LoxErrorHandler):
+        super().__init__(error_handler)
+
+    def interpret(self, statements: List[Stmt], repl: bool = False) -> None:
+        try:
+            for stmt in statements:
+                try:
+                    value = self.compile_stmt(stmt)(self.globals)
+                except BreakException:
+                    # As in Interpreter.interpret.
+                    continue
+                if repl and isinstance(stmt, ExpressionStmt):
+                    print(value)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error)
+
+    def evaluate(self, expr: Expr) -> Any:
+        return self.compile_expr(expr)(self.globals)
+
+    def execute(self, stmt: Stmt) -> None:
+        return self.compile_stmt(stmt)(self.globals)
+
+    def execute_block(self, statements: List[Stmt], environment: Environment) -> Optional[Completion]:
+        return self.compile_block(statements)(environment)
+
+    def compile_expr(self, expr: Expr) -> Code:
+        return expr.accept(self)
+
+    def compile_stmt(self, stmt: Stmt) -> Code:
+        return stmt.accept(self)
+
+    def compile_block(self, statements: List[Stmt]) -> Code:
+        """
+        Compiles a statement list to a single closure running it in the
+        environment it is given
+        """
+        codes = tuple(self.compile_stmt(stmt) for stmt in statements)
+        if len(codes) == 1:
+            return codes[0]
+
+        def block(environment: Environment) -> Optional[Completion]:
+            for code in codes:
+                completion = code(environment)
+                if completion is RETURN or completion is BREAK:
+                    return completion
+            return None
+        return block
+
+    def compile_function(self, stmt: FunctionStmt, is_initializer: bool) -> Code:
+        """
+        Compiles a function's body once; the returned closure makes a new
+        CompiledFunction over it each time the declaration is executed.
+        """
+        body = self.compile_block(stmt.body)
+
+        def function(environment: Environment) -> CompiledFunction:
+            return CompiledFunction(stmt, environment, is_initializer, body)
+        return function
+
+    def compile_lookup(self, name: Token, depth: Optional[int], idx: int) -> Code:
+        if depth is None:
+            # The globals' list is never replaced, only grown, so it can be captured.
+            global_values = self.globals.values
+            get_slot = self.globals.get_slot
+
+            def lookup_global(environment: Environment) -> Any:
+                value = global_values[idx]
+                return get_slot(idx, name) if value is UNDEFINED else value
+            return lookup_global
+        if depth == 0:
+            return lambda environment: environment.values[idx]
+        if depth == 1:
+            return lambda environment: environment.enclosing.values[idx]
+        return lambda environment: environment.ancestor(depth).values[idx]
+
+    def visit_ternary_expr(self, expr: TernaryExpr) -> Code:
+        return lambda environment: None
+
+    def visit_binary_expr(self, expr: BinaryExpr) -> Code:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+
+        match operator.token_type:
+            case TokenType.PLUS:
+                def add(environment: Environment) -> Any:
+                    a = left(environment)
+                    b = right(environment)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a + b
+                    if isinstance(a, str) and isinstance(b, str):
+                        return a + b
+                    if (isinstance(a, str) and isinstance(b, float)) or (isinstance(a, float) and isinstance(b, str)):
+                        return str(a) + str(b)
+                    raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
+                return add
+            case TokenType.MINUS:
+                def subtract(environment: Environment) -> Any:
+                    a = left(environment)
+                    b = right(environment)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a - b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+                return subtract
+            case TokenType.STAR:
+                def multiply(environment: Environment) -> Any:
+                    a = left(environment)
+                    b = right(environment)
+                    if isinstance(a, float) and isinstance(b, float):
+                        return a * b
+                    raise LoxRuntimeError(operator, "Operands must be numbers.")
+                return multiply
+            case TokenType.SLASH:
+                def divide(environment: Environment) -> Any:
+                    a = left(environment)
+                    b = right(environment)
+                    if not (isinstance(a, float) and isinstance(b, float)):
+                        raise LoxRuntimeError(operator, "Operands must be numbers.")
+                    if b == 0:
+                        raise LoxRuntimeError(operator, "Cannot divide by zero.")
+                    return a / b
+                return divide
+            case TokenType.EQUAL_EQUAL:
+                return lambda environment: left(environment) == right(environment)
+            case TokenType.BANG_EQUAL:
+                return lambda environment: not left(environment) == right(environment)
+            case TokenType.GREATER | TokenType.GREATER_EQUAL | TokenType.LESS | TokenType.LESS_EQUAL:
+                return self.compile_comparison(operator, left, right)
+        return lambda environment: None
+
+    def compile_comparison(self, operator: Token, left: Code, right: Code) -> Code:
+        """
+        Comparisons are between two numbers, or between the lengths of two
+        strings.
+        """
+        compare: Callable[[Any, Any], bool] = {
+            TokenType.GREATER: float.__gt__,
+            TokenType.GREATER_EQUAL: float.__ge__,
+            TokenType.LESS: float.__lt__,
+            TokenType.LESS_EQUAL: float.__le__,
+        }[operator.token_type]
+
+        def comparison(environment: Environment) -> bool:
+            a = left(environment)
+            b = right(environment)
+            if isinstance(a, float) and isinstance(b, float):
+                return compare(a, b)
+            if isinstance(a, str) and isinstance(b, str):
+                return compare(float(len(a)), float(len(b)))
+            raise LoxRuntimeError(operator, "Operands must be numbers.")
+        return comparison
+
+    def visit_call_expr(self, expr: CallExpr) -> Code:
+        return self.compile_call(expr, False)
+
+    def compile_call(self, expr: CallExpr, tail: bool) -> Code:
+        """A call; in tail position a call to a Lox function is left in TAIL_CALL as in Interpreter.call_value."""
+        if type(expr.callee) is GetExpr:
+            return self.compile_invoke(expr, expr.callee, tail)
+        callee = self.compile_expr(expr.callee)
+        arguments = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        paren = expr.paren
+
+        def call(environment: Environment) -> Any:
+            function_obj = callee(environment)
+            values = [argument(environment) for argument in arguments]
+            if not isinstance(function_obj, LoxCallable):
+                raise LoxRuntimeError(paren, "Can only call functions and classes.")
+            if len(values) != function_obj.arity():
+                raise LoxRuntimeError(paren, f"Expected {function_obj.arity()} arguments but got {len(values)}.")
+            if tail and isinstance(function_obj, LoxFunction):
+                TAIL_CALL.function = function_obj
+                TAIL_CALL.receiver = function_obj.receiver
+                TAIL_CALL.arguments = values
+                return TAIL_CALL
+            try:
+                return function_obj.call(self, values)
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.") from None
+        return call
+
+    def compile_invoke(self, expr: CallExpr, get: GetExpr, tail: bool = False) -> Code:
+        """A method call on an instance, made without a bound method as in Interpreter.invoke."""
+        obj = self.compile_expr(get.obj)
+        arguments = tuple(self.compile_expr(argument) for argument in expr.arguments)
+        name = get.name
+        paren = expr.paren
+        cache = get.cache or self.cache_site(get, 'get', name.line)
+        entries = cache.entries
+        lookup_property = self.lookup_property
+
+        def invoke(environment: Environment) -> Any:
+            instance = obj(environment)
+            if not isinstance(instance, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have properties.")
+            target = entries.get(instance.shape)
+            if target is None:
+                cache.misses += 1
+                target = lookup_property(cache, instance, name)
+            else:
+                cache.hits += 1
+            if type(target) is int:
+                function_obj = instance.values[target]
+                values = [argument(environment) for argument in arguments]
+                if not isinstance(function_obj, LoxCallable):
+                    raise LoxRuntimeError(paren, "Can only call functions and classes.")
+                if len(values) != function_obj.arity():
+                    raise LoxRuntimeError(paren, f"Expected {function_obj.arity()} arguments but got {len(values)}.")
+                if tail and isinstance(function_obj, LoxFunction):
+                    TAIL_CALL.function = function_obj
+                    TAIL_CALL.receiver = function_obj.receiver
+                    TAIL_CALL.arguments = values
+                    return TAIL_CALL
+                try:
+                    return function_obj.call(self, values)
+                except RecursionError:
+                    raise LoxRuntimeError(paren, "Stack overflow.") from None
+            values = [argument(environment) for argument in arguments]
+            if len(values) != target.arity():
+                raise LoxRuntimeError(paren, f"Expected {target.arity()} arguments but got {len(values)}.")
+            if tail:
+                TAIL_CALL.function = target
+                TAIL_CALL.receiver = instance
+                TAIL_CALL.arguments = values
+                return TAIL_CALL
+            try:
+                return target.invoke(self, instance, values)
+            except RecursionError:
+                raise LoxRuntimeError(paren, "Stack overflow.") from None
+        return invoke
+
+    def visit_get_expr(self, expr: GetExpr) -> Code:
+        obj = self.compile_expr(expr.obj)
+        name = expr.name
+        cache = expr.cache or self.cache_site(expr, 'get', name.line)
+        entries = cache.entries
+        lookup_property = self.lookup_property
+
+        def get(environment: Environment) -> Any:
+            instance = obj(environment)
+            if isinstance(instance, LoxInstance):
+                target = entries.get(instance.shape)
+                if target is None:
+                    cache.misses += 1
+                    target = lookup_property(cache, instance, name)
+                else:
+                    cache.hits += 1
+                if type(target) is int:
+                    return instance.values[target]
+                return target.bind(instance)
+            raise LoxRuntimeError(name, "Only instances have properties.")
+        return get
+
+    def visit_grouping_expr(self, expr: GroupingExpr) -> Code:
+        return self.compile_expr(expr.expression)
+
+    def visit_unary_expr(self, expr: UnaryExpr) -> Code:
+        right = self.compile_expr(expr.right)
+        operator = expr.operator
+        is_truthy = self.is_truthy
+
+        match operator.token_type:
+            case TokenType.BANG:
+                return lambda environment: not is_truthy(right(environment))
+            case TokenType.MINUS:
+                def negate(environment: Environment) -> Any:
+                    value = right(environment)
+                    if isinstance(value, float):
+                        return -value
+                    raise LoxRuntimeError(operator, "Operand must be a number.")
+                return negate
+        return lambda environment: None
+
+    def visit_literal_expr(self, expr: LiteralExpr) -> Code:
+        value = expr.value
+        return lambda environment: value
+
+    def visit_logical_expr(self, expr: LogicalExpr) -> Code:
+        left = self.compile_expr(expr.left)
+        right = self.compile_expr(expr.right)
+        is_truthy = self.is_truthy
+
+        if expr.operator.token_type == TokenType.OR:
+            def logical_or(environment: Environment) -> Any:
+                value = left(environment)
+                return value if is_truthy(value) else right(environment)
+            return logical_or
+
+        def logical_and(environment: Environment) -> Any:
+            value = left(environment)
+            return right(environment) if is_truthy(value) else value
+        return logical_and
+
+    def visit_set_expr(self, expr: SetExpr) -> Code:
+        obj = self.compile_expr(expr.obj)
+        value_code = self.compile_expr(expr.value)
+        name = expr.name
+        cache = expr.cache or self.cache_site(expr, 'set', name.line)
+        entries = cache.entries
+
+        def set(environment: Environment) -> Any:
+            instance = obj(environment)
+            if not isinstance(instance, LoxInstance):
+                raise LoxRuntimeError(name, "Only instances have fields.")
+            value = value_code(environment)
+            shape = instance.shape
+            entry = entries.get(shape)
+            if entry is None:
+                cache.misses += 1
+                instance.set(name, value)
+                if shape.shared and instance.shape.shared:
+                    cache.add(shape, (instance.shape.slots[name.lexeme], instance.shape))
+            else:
+                cache.hits += 1
+                slot, next_shape = entry
+                if next_shape is shape:
+                    instance.values[slot] = value
+                else:
+                    instance.values.append(value)
+                    instance.shape = next_shape
+            return value
+        return set
+
+    def visit_super_expr(self, expr: SuperExpr) -> Code:
+        distance: int = expr.depth or 0
+        method_name = expr.method
+        cache = expr.cache or self.cache_site(expr, 'super', method_name.line)
+        entries = cache.entries
+
+        def super_method(environment: Environment) -> LoxFunction:
+            superclass_environment = environment.ancestor(distance)
+            superclass: LoxClass = superclass_environment.values[-1]
+            obj: LoxInstance = environment.ancestor(distance - 1).values[0]
+            method: Optional[LoxFunction] = entries.get(superclass)
+            if method is None:
+                cache.misses += 1
+                method = superclass.find_method(method_name.lexeme)
+                if method is None:
+                    raise LoxRuntimeError(method_name, f"Undefined property '{method_name.lexeme}'.")
+                cache.add(superclass, method)
+            else:
+                cache.hits += 1
+            return method.bind(obj)
+        return super_method
+
+    def visit_this_expr(self, expr: ThisExpr) -> Code:
+        return self.compile_lookup(expr.keyword, expr.depth, expr.idx)
+
+    def visit_var_expr(self, expr: VarExpr) -> Code:
+        return self.compile_lookup(expr.name, expr.depth, expr.idx)
+
+    def visit_assign_expr(self, expr: AssignExpr) -> Code:
+        value_code = self.compile_expr(expr.value)
+        name = expr.name
+        depth = expr.depth
+        idx = expr.idx
+
+        if depth is None:
+            assign_slot = self.globals.assign_slot
+
+            def assign_global(environment: Environment) -> Any:
+                value = value_code(environment)
+                assign_slot(idx, name, value)
+                return value
+            return assign_global
+
+        def assign(environment: Environment) -> Any:
+            value = value_code(environment)
+            environment.assign_at(depth, name, value, idx)
+            return value
+        return assign
+
+    # Nodes fused under -O compile as the nodes they stand for.
+
+    def visit_increment_local_expr(self, expr: IncrementLocalExpr) -> Code:
+        return self.visit_assign_expr(expr)
+
+    def visit_compare_local_expr(self, expr: CompareLocalExpr) -> Code:
+        return self.visit_binary_expr(expr)
+
+    def visit_field_update_expr(self, expr: FieldUpdateExpr) -> Code:
+        return self.visit_set_expr(expr)
+
+    # So do nodes the tree-walker quickened before a function tiered up.
+
+    def visit_float_binary_expr(self, expr: FloatBinaryExpr) -> Code:
+        return self.visit_binary_expr(expr)
+
+    def visit_string_add_expr(self, expr: StringAddExpr) -> Code:
+        return self.visit_binary_expr(expr)
+
+    def visit_generic_binary_expr(self, expr: GenericBinaryExpr) -> Code:
+        return self.visit_binary_expr(expr)
+
+    def visit_float_negate_expr(self, expr: FloatNegateExpr) -> Code:
+        return self.visit_unary_expr(expr)
+
+    def visit_generic_unary_expr(self, expr: GenericUnaryExpr) -> Code:
+        return self.visit_unary_expr(expr)
+
+    def visit_block_stmt(self, stmt: BlockStmt) -> Code:
+        block = self.compile_block(stmt.statements)
+        if not stmt.locals:
+            # A block without a frame of its own runs in the enclosing one.
+            return block
+        size = len(stmt.locals)
+        return lambda environment: block(Environment(environment, size))
+
+    def visit_class_stmt(self, stmt: ClassStmt) -> Code:
+        superclass_code = self.compile_expr(stmt.superclass) if stmt.superclass else None
+        methods = tuple((method.name.lexeme, self.compile_function(method, method.name.lexeme == "init"))
+                        for method in stmt.methods)
+        name = stmt.name
+        declare = self.compile_declaration(stmt.slot, name)
+
+        def klass(environment: Environment) -> None:
+            superclass: Any = None
+            if superclass_code:
+                superclass = superclass_code(environment)
+                if not isinstance(superclass, LoxClass):
+                    raise LoxRuntimeError(stmt.superclass.name, "Superclass must be a class.")
+
+            method_environment = environment
+            if superclass_code:
+                method_environment = Environment(environment, 1)
+                method_environment.values[0] = superclass
+
+            functions: dict[str, LoxFunction] = {method_name: function(method_environment)
+                                                 for method_name, function in methods}
+            declare(environment, LoxClass(name.lexeme, superclass, functions))
+        return klass
+
+    def compile_declaration(self, slot: Optional[int], name: Token) -> Callable[[Environment, Any], None]:
+        """Stores a declared variable's value in its slot, or by name when it is a global."""
+        if slot is None:
+            globals_define = self.globals.define
+            lexeme = name.lexeme
+            return lambda environment, value: globals_define(lexeme, value)
+
+        def declare(environment: Environment, value: Any) -> None:
+            environment.values[slot] = value
+        return declare
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt) -> Code:
+        return self.compile_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: FunctionStmt) -> Code:
+        function = self.compile_function(stmt, False)
+        define = self.compile_declaration(stmt.slot, stmt.name)
+
+        def declare(environment: Environment) -> CompiledFunction:
+            function_obj = function(environment)
+            define(environment, function_obj)
+            return function_obj
+        return declare
+
+    def visit_if_stmt(self, stmt: IfStmt) -> Code:
+        condition = self.compile_expr(stmt.condition)
+        then_branch = self.compile_stmt(stmt.thenBranch)
+        else_branch = self.compile_stmt(stmt.elsebranch) if stmt.elsebranch else None
+        is_truthy = self.is_truthy
+
+        def if_stmt(environment: Environment) -> Optional[Completion]:
+            if is_truthy(condition(environment)):
+                return then_branch(environment)
+            elif else_branch:
+                return else_branch(environment)
+            return None
+        return if_stmt
+
+    def visit_print_stmt(self, stmt: PrintStmt) -> Code:
+        expression = self.compile_expr(stmt.expression)
+        stringify = self.stringify
+
+        def print_stmt(environment: Environment) -> None:
+            print(stringify(expression(environment)))
+        return print_stmt
+
+    def visit_return_stmt(self, stmt: ReturnStmt) -> Code:
+        if stmt.tail and type(stmt.value) is CallExpr:
+            value_code: Optional[Code] = self.compile_call(stmt.value, True)
+        else:
+            value_code = self.compile_expr(stmt.value) if stmt.value is not None else None
+
+        def return_stmt(environment: Environment) -> Completion:
+            RETURN.value = value_code(environment) if value_code else None
+            return RETURN
+        return return_stmt
+
+    def visit_break_stmt(self, stmt: BreakStmt) -> Code:
+        return lambda environment: BREAK
+
+    def visit_var_stmt(self, stmt: VarStmt) -> Code:
+        initializer = self.compile_expr(stmt.initializer) if stmt.initializer is not None else None
+        name = stmt.name
+        define = self.compile_declaration(stmt.slot, name)
+
+        def var_stmt(environment: Environment) -> None:
+            value: Any = initializer(environment) if initializer else None
+            if value is None:
+                raise LoxRuntimeError(name, "A variable must be initialized before it can be used.")
+            define(environment, value)
+        return var_stmt
+
+    def visit_while_stmt(self, stmt: WhileStmt) -> Code:
+        condition = self.compile_expr(stmt.condition)
+        body = self.compile_stmt(stmt.body)
+        is_truthy = self.is_truthy
+
+        def while_stmt(environment: Environment) -> Optional[Completion]:
+            try:
+                while is_truthy(condition(environment)):
+                    completion = body(environment)
+                    if completion is BREAK:
+                        break
+                    if completion is RETURN:
+                        return completion
+            except BreakException:
+                pass
+            return None
+        return while_stmt
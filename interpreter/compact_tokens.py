@@ -0,0 +1,87 @@
+from array import array
+from sys import intern
+from typing import Any, List, Optional
+
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.token_stream import TokenStream
+
+
+class CompactTokens:
+    """
+    Struct-of-arrays token storage. Each token costs four array entries
+    (type id, start and end offsets into the source, line) instead of a
+    Token object; lexemes and literals are sliced from the source only when
+    a Token is actually materialized.
+    """
+    TOKEN_TYPES: List[TokenType] = list(TokenType)
+    TOKEN_IDS: dict[TokenType, int] = {token_type: idx for idx, token_type in enumerate(TOKEN_TYPES)}
+
+    def __init__(self, source_code: str) -> None:
+        self.source_code = source_code
+        self.types = array('B')
+        self.starts = array('I')
+        self.ends = array('I')
+        self.lines = array('I')
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def append(self, token_type: TokenType, start: int, end: int, line: int) -> None:
+        self.types.append(self.TOKEN_IDS[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.lines.append(line)
+
+    def token_type(self, idx: int) -> TokenType:
+        return self.TOKEN_TYPES[self.types[idx]]
+
+    def lexeme(self, idx: int) -> str:
+        return self.source_code[self.starts[idx]:self.ends[idx]]
+
+    def literal(self, idx: int) -> Any:
+        token_type = self.token_type(idx)
+        if token_type == TokenType.NUMBER:
+            return float(self.lexeme(idx))
+        if token_type == TokenType.STRING:
+            return intern(self.source_code[self.starts[idx] + 1:self.ends[idx] - 1])
+        return None
+
+    def token(self, idx: int) -> Token:
+        token_type = self.token_type(idx)
+        lexeme = self.lexeme(idx)
+        if token_type == TokenType.IDENTIFIER:
+            lexeme = intern(lexeme)
+        return Token(token_type, lexeme, self.literal(idx), self.lines[idx])
+
+    def stream(self) -> 'CompactTokenStream':
+        return CompactTokenStream(self)
+
+
+class CompactTokenStream(TokenStream):
+    """
+    TokenStream over CompactTokens. Type checks read the arrays directly;
+    a Token object is only built when the parser asks for one.
+    """
+    def __init__(self, tokens: CompactTokens) -> None:
+        self.compact_tokens = tokens
+        self.types = tokens.types
+        self.token_types = tokens.TOKEN_TYPES
+        self.current = 0
+        self.previous_token: Optional[Token] = None
+
+    def peek(self) -> Token:
+        return self.compact_tokens.token(self.current)
+
+    def peek_type(self) -> TokenType:
+        return self.token_types[self.types[self.current]]
+
+    def previous(self) -> Token:
+        # The parser often asks for the same previous token more than once.
+        if self.previous_token is None:
+            self.previous_token = self.compact_tokens.token(self.current - 1)
+        return self.previous_token
+
+    def advance(self) -> None:
+        self.current += 1
+        self.previous_token = None
@@ -0,0 +1,28 @@
+from __future__ import annotations
+import typing
+from typing import Any, Callable, Optional
+from interpreter.completion import Completion
+from interpreter.environment import Environment
+from interpreter.lox_function import LoxFunction
+from interpreter.stmt import FunctionStmt
+if typing.TYPE_CHECKING:
+    from interpreter.interpreter import Interpreter
+    from interpreter.lox_instance import LoxInstance
+
+
+class CompiledFunction(LoxFunction):
+    """
+    A LoxFunction whose body has already been compiled into a closure by the
+    ClosureCompiler, so calling it runs that closure instead of walking the
+    declaration's statements.
+    """
+    def __init__(self, declaration: FunctionStmt, closure: Environment, is_initializer: bool,
+                 body: Callable[[Environment], Any], receiver: Optional[LoxInstance] = None) -> None:
+        super().__init__(declaration, closure, is_initializer, receiver)
+        self.body = body
+
+    def bind(self, instance: LoxInstance):
+        return CompiledFunction(self.declaration, self.closure, self.is_initializer, self.body, instance)
+
+    def execute_body(self, interpreter: Interpreter, environment: Environment) -> Optional[Completion]:
+        return self.body(environment)
@@ -0,0 +1,39 @@
+from typing import Any, List
+
+
+class Completion:
+    """
+    How a statement ended when it did not simply run to its end. Executing a
+    statement returns BREAK or RETURN, instead of raising an exception, and
+    blocks, ifs and loops pass it on until the loop or function it ends.
+    Anything else a statement returns means it completed normally.
+
+    A return leaves its value in RETURN.value, where the function call
+    picks it up; no Lox code runs in between, so one slot is enough.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self) -> None:
+        self.value: Any = None
+
+
+BREAK = Completion()
+RETURN = Completion()
+
+
+class TailCall:
+    """
+    A call in tail position, `return f(...)`, that has been set up but not
+    made: a return leaves TAIL_CALL in RETURN.value, and LoxFunction.run
+    makes the call in place of the function that returned it, so a chain
+    of tail calls runs in constant Python stack.
+    """
+    __slots__ = ('function', 'receiver', 'arguments')
+
+    def __init__(self) -> None:
+        self.function: Any = None
+        self.receiver: Any = None
+        self.arguments: List[Any] = list()
+
+
+TAIL_CALL = TailCall()
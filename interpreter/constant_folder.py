@@ -0,0 +1,198 @@
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, ExprVisitor, GetExpr, GroupingExpr, LiteralExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.interpreter import Interpreter
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.lox_token_type import TokenType
+from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt, Stmt, StmtVisitor, VarStmt, WhileStmt
+
+
+class ConstantFolder(ExprVisitor, StmtVisitor):
+    """
+    Optimization pass run on resolved statements. Level 1 folds operators
+    whose operands are all literals into a single LiteralExpr; level 2 also
+    propagates locals that are initialised with a constant and never
+    reassigned. Folding applies the interpreter's own operations to the
+    literals, so the result is exactly what the program would have computed,
+    without running (and so quickening) the node itself, and any
+    operation that would raise a runtime error (dividing by zero, bad
+    operand types) is left in place to raise it at run time.
+    """
+    def __init__(self, interpreter: Interpreter, level: int = 1) -> None:
+        self.interpreter = interpreter
+        self.level = level
+        self.propagate = False
+        # Mirrors the frames the resolver laid out: slot idx -> the VarStmt last
+        # declared there, or None for functions and classes. Parameters have none.
+        self.scopes: List[Dict[int, Optional[VarStmt]]] = list()
+        self.assigned: Set[VarStmt] = set()
+
+    def fold(self, statements: List[Stmt]) -> None:
+        # The first walk folds and records every reassigned local, which the
+        # second walk needs before it can treat any local as a constant.
+        self.fold_statements(statements)
+        if self.level >= 2:
+            self.propagate = True
+            self.fold_statements(statements)
+
+    def fold_statements(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def fold_expr(self, expr: Expr) -> Expr:
+        if isinstance(expr, Stmt):
+            # Function expressions are FunctionStmt nodes.
+            expr.accept(self)
+            return expr
+        return expr.accept(self)
+
+    def declare(self, slot: Optional[int], declaration: Optional[VarStmt] = None) -> None:
+        if self.scopes and slot is not None:
+            self.scopes[-1][slot] = declaration
+
+    def declaration_of(self, expr: VarExpr | AssignExpr) -> Optional[VarStmt]:
+        if expr.depth is None:
+            return None
+        scope = self.scopes[len(self.scopes) - 1 - expr.depth]
+        return scope.get(expr.idx)
+
+    def constant(self, expr: Expr, operation: Callable[[], Any]) -> Expr:
+        """
+        The value of an expression whose operands are all literals, unless
+        computing it raises a runtime error.
+        """
+        try:
+            return LiteralExpr(operation())
+        except LoxRuntimeError:
+            return expr
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        if not stmt.locals:
+            # No frame of its own: its variables, if any, are in the enclosing one.
+            self.fold_statements(stmt.statements)
+            return
+        self.scopes.append(dict())
+        self.fold_statements(stmt.statements)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        stmt.expression = self.fold_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        self.declare(stmt.slot)
+        self.fold_function(stmt)
+
+    def fold_function(self, stmt: FunctionStmt):
+        self.scopes.append(dict())
+        self.fold_statements(stmt.body)
+        self.scopes.pop()
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        self.declare(stmt.slot)
+        if stmt.superclass:
+            self.scopes.append(dict())
+        for method in stmt.methods:
+            self.fold_function(method)
+        if stmt.superclass:
+            self.scopes.pop()
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        stmt.condition = self.fold_expr(stmt.condition)
+        stmt.thenBranch.accept(self)
+        if stmt.elsebranch:
+            stmt.elsebranch.accept(self)
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        stmt.expression = self.fold_expr(stmt.expression)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.value is not None:
+            stmt.value = self.fold_expr(stmt.value)
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        if stmt.initializer is not None:
+            stmt.initializer = self.fold_expr(stmt.initializer)
+        self.declare(stmt.slot, stmt)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        stmt.condition = self.fold_expr(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        return None
+
+    def visit_ternary_expr(self, expr: TernaryExpr):
+        expr.condition = self.fold_expr(expr.condition)
+        expr.then_branch = self.fold_expr(expr.then_branch)
+        expr.else_branch = self.fold_expr(expr.else_branch)
+        return expr
+
+    def visit_assign_expr(self, expr: AssignExpr):
+        expr.value = self.fold_expr(expr.value)
+        declaration = self.declaration_of(expr)
+        if declaration is not None:
+            self.assigned.add(declaration)
+        return expr
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        expr.left = self.fold_expr(expr.left)
+        expr.right = self.fold_expr(expr.right)
+        if isinstance(expr.left, LiteralExpr) and isinstance(expr.right, LiteralExpr):
+            left, right = expr.left.value, expr.right.value
+            return self.constant(expr, lambda: self.interpreter.binary_operation(expr.operator, left, right))
+        return expr
+
+    def visit_call_expr(self, expr: CallExpr):
+        expr.callee = self.fold_expr(expr.callee)
+        expr.arguments = [self.fold_expr(argument) for argument in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr: GetExpr):
+        expr.obj = self.fold_expr(expr.obj)
+        return expr
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        # Parentheses only matter to the parser.
+        return self.fold_expr(expr.expression)
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        return expr
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        expr.left = self.fold_expr(expr.left)
+        expr.right = self.fold_expr(expr.right)
+        if not isinstance(expr.left, LiteralExpr):
+            return expr
+        # A constant left operand decides whether the right one is the result.
+        left_truthy = self.interpreter.is_truthy(expr.left.value)
+        if expr.operator.token_type == TokenType.OR:
+            return expr.left if left_truthy else expr.right
+        return expr.right if left_truthy else expr.left
+
+    def visit_set_expr(self, expr: SetExpr):
+        expr.value = self.fold_expr(expr.value)
+        expr.obj = self.fold_expr(expr.obj)
+        return expr
+
+    def visit_super_expr(self, expr: SuperExpr):
+        return expr
+
+    def visit_this_expr(self, expr: ThisExpr):
+        return expr
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        expr.right = self.fold_expr(expr.right)
+        if isinstance(expr.right, LiteralExpr):
+            right = expr.right.value
+            return self.constant(expr, lambda: self.interpreter.unary_operation(expr.operator, right))
+        return expr
+
+    def visit_var_expr(self, expr: VarExpr):
+        if not self.propagate:
+            return expr
+        declaration = self.declaration_of(expr)
+        if declaration is None or declaration in self.assigned:
+            return expr
+        if isinstance(declaration.initializer, LiteralExpr) and declaration.initializer.value is not None:
+            return LiteralExpr(declaration.initializer.value)
+        return expr
@@ -1,49 +1,35 @@
-from typing import Any, Optional, Self
+from typing import Any, List, Optional, Self
 import typing
-from interpreter.lox_runtime_error import LoxRuntimeError
 from interpreter.lox_token import Token
 
 
 class Environment:
-    def __init__(self, enclosing: Optional[Self] = None) -> None:
-        self.enclosing: Optional[Self] = enclosing
-        self.names: dict[str, int] = dict()
-        self.values = list()
+    """
+    The frame of a function call, block or class body: a list with one slot
+    per variable the resolver found in that scope, allocated at its full
+    size up front and indexed by the slot the resolver gave each variable.
+    Only outermost blocks and blocks that a nested function or class
+    captures from get frames of their own; the variables of other blocks
+    have slots in the frame around them.
+    Frames hold no names; those stay with the scope's node (see
+    BlockStmt.locals and FunctionStmt.locals), and only the
+    GlobalEnvironment looks variables up by name.
+    """
+    __slots__ = ('enclosing', 'values')
 
-    def define(self, name: str, value: Any) -> None:
-        self.values.append(value)
-        self.names[name] = len(self.values)
+    def __init__(self, enclosing: Optional[Self] = None, size: int = 0) -> None:
+        self.enclosing: Optional[Self] = enclosing
+        self.values: List[Any] = [None] * size
 
     def ancestor(self, distance: int) -> Self:
         environment: Self = self
-        for i in range(distance):
+        while distance:
             environment = typing.cast(Self, environment.enclosing)
+            distance -= 1
         return environment
 
     def get_at(self, distance: int, name: str, idx: int):
         return self.ancestor(distance).values[idx]
 
     def assign_at(self, distance: int, name: Token, value: Any, idx: int):
-        environment =  self.ancestor(distance)
-        environment.names[name.lexeme] = idx
-        environment.values[idx] = value
-
-    def get(self, name: Token) -> Any:
-        if name.lexeme in self.names:
-            idx: int = self.names[name.lexeme]
-            return self.values[idx]
-        if self.enclosing:
-            return self.enclosing.get(name)
-        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
-    
-    def assign(self, name: Token, value: Any) -> None:
-        if name.lexeme in self.names:
-            idx: int = self.names[name.lexeme]
-            self.values[idx] = value
-            return
-        
-        if self.enclosing:
-            self.enclosing.assign(name, value)
-            return
-        
-        raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
\ No newline at end of file
+        self.ancestor(distance).values[idx] = value
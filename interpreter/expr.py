@@ -8,144 +8,157 @@ class IExprVisitor(ABC):
 		...
 
 class Expr(ABC):
+	__slots__ = ()
+
 	@abstractmethod
 	def accept(self, visitor: IExprVisitor):
 		...
 
 class TernaryExpr(Expr):
+	__slots__ = ('condition', 'then_branch', 'else_branch')
+
 	def __init__(self, condition: Expr, then_branch: Expr, else_branch: Expr):
 		self.condition = condition
 		self.then_branch = then_branch
 		self.else_branch = else_branch
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_ternary_expr(self)
 
 class AssignExpr(Expr):
+	__slots__ = ('name', 'value', 'depth', 'idx')
+
 	def __init__(self, name: Token, value: Expr):
 		self.name = name
 		self.value = value
+		self.depth: Optional[int] = None
+		self.idx: int = -1
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_assign_expr(self)
 
 class BinaryExpr(Expr):
+	__slots__ = ('left', 'operator', 'right')
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left = left
 		self.operator = operator
 		self.right = right
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_binary_expr(self)
 
 class CallExpr(Expr):
+	__slots__ = ('callee', 'paren', 'arguments')
+
 	def __init__(self, callee: Expr, paren: Token, arguments: List[Expr]):
 		self.callee = callee
 		self.paren = paren
 		self.arguments = arguments
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_call_expr(self)
 
 class GetExpr(Expr):
+	__slots__ = ('obj', 'name', 'cache')
+
 	def __init__(self, obj: Expr, name: Token):
 		self.obj = obj
 		self.name = name
+		self.cache: Any = None
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_get_expr(self)
 
 class GroupingExpr(Expr):
+	__slots__ = ('expression',)
+
 	def __init__(self, expression: Expr):
 		self.expression = expression
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_grouping_expr(self)
 
 class LiteralExpr(Expr):
+	__slots__ = ('value',)
+
 	def __init__(self, value: Any):
 		self.value = value
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_literal_expr(self)
 
 class LogicalExpr(Expr):
+	__slots__ = ('left', 'operator', 'right')
+
 	def __init__(self, left: Expr, operator: Token, right: Expr):
 		self.left = left
 		self.operator = operator
 		self.right = right
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_logical_expr(self)
 
 class SetExpr(Expr):
+	__slots__ = ('obj', 'name', 'value', 'cache')
+
 	def __init__(self, obj: Expr, name: Token, value: Expr):
 		self.obj = obj
 		self.name = name
 		self.value = value
+		self.cache: Any = None
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_set_expr(self)
 
 class SuperExpr(Expr):
+	__slots__ = ('keyword', 'method', 'depth', 'idx', 'cache')
+
 	def __init__(self, keyword: Token, method: Token):
 		self.keyword = keyword
 		self.method = method
+		self.depth: Optional[int] = None
+		self.idx: int = -1
+		self.cache: Any = None
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_super_expr(self)
 
 class ThisExpr(Expr):
+	__slots__ = ('keyword', 'depth', 'idx')
+
 	def __init__(self, keyword: Token):
 		self.keyword = keyword
+		self.depth: Optional[int] = None
+		self.idx: int = -1
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_this_expr(self)
 
 class UnaryExpr(Expr):
+	__slots__ = ('operator', 'right')
+
 	def __init__(self, operator: Token, right: Expr):
 		self.operator = operator
 		self.right = right
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_unary_expr(self)
 
 class VarExpr(Expr):
+	__slots__ = ('name', 'depth', 'idx')
+
 	def __init__(self, name: Token):
 		self.name = name
+		self.depth: Optional[int] = None
+		self.idx: int = -1
 
 	def accept(self, visitor: IExprVisitor):
-		return visitor.visit_expr(self)
+		return visitor.visit_var_expr(self)
 
 class ExprVisitor(IExprVisitor):
 	def visit_expr(self, expr):
-		match expr:
-			case TernaryExpr():
-				return self.visit_ternary_expr(expr)
-			case AssignExpr():
-				return self.visit_assign_expr(expr)
-			case BinaryExpr():
-				return self.visit_binary_expr(expr)
-			case CallExpr():
-				return self.visit_call_expr(expr)
-			case GetExpr():
-				return self.visit_get_expr(expr)
-			case GroupingExpr():
-				return self.visit_grouping_expr(expr)
-			case LiteralExpr():
-				return self.visit_literal_expr(expr)
-			case LogicalExpr():
-				return self.visit_logical_expr(expr)
-			case SetExpr():
-				return self.visit_set_expr(expr)
-			case SuperExpr():
-				return self.visit_super_expr(expr)
-			case ThisExpr():
-				return self.visit_this_expr(expr)
-			case UnaryExpr():
-				return self.visit_unary_expr(expr)
-			case VarExpr():
-				return self.visit_var_expr(expr)
+		return expr.accept(self)
 
 	@abstractmethod
 	def visit_ternary_expr(self, expr: TernaryExpr):
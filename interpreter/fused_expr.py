@@ -0,0 +1,68 @@
+import operator
+from typing import Any, Callable, Optional
+
+from interpreter.expr import AssignExpr, BinaryExpr, Expr, IExprVisitor, LiteralExpr, SetExpr, VarExpr
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+
+
+class IncrementLocalExpr(AssignExpr):
+    """
+    `i = i + c` or `i = i - c` on a local, with c a number literal. Keeps the
+    AssignExpr it replaces intact, so a non-number i can fall back to it.
+    """
+    __slots__ = ('amount',)
+
+    def __init__(self, original: AssignExpr, amount: float):
+        super().__init__(original.name, original.value)
+        self.depth = original.depth
+        self.idx = original.idx
+        self.amount = amount
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_increment_local_expr(self)
+
+
+class CompareLocalExpr(BinaryExpr):
+    """
+    A comparison between a local and another local or a literal, such as the
+    condition of a desugared for loop.
+    """
+    __slots__ = ('left_depth', 'left_idx', 'right_depth', 'right_idx', 'constant', 'compare')
+
+    COMPARISONS: dict[TokenType, Callable[[Any, Any], bool]] = {
+        TokenType.LESS: operator.lt,
+        TokenType.LESS_EQUAL: operator.le,
+        TokenType.GREATER: operator.gt,
+        TokenType.GREATER_EQUAL: operator.ge,
+        TokenType.EQUAL_EQUAL: operator.eq,
+        TokenType.BANG_EQUAL: operator.ne,
+    }
+
+    def __init__(self, original: BinaryExpr, left: VarExpr, right: VarExpr | LiteralExpr):
+        super().__init__(original.left, original.operator, original.right)
+        self.left_depth: int = left.depth or 0
+        self.left_idx = left.idx
+        self.right_depth: Optional[int] = right.depth if isinstance(right, VarExpr) else None
+        self.right_idx = right.idx if isinstance(right, VarExpr) else -1
+        self.constant: Any = right.value if isinstance(right, LiteralExpr) else None
+        self.compare = self.COMPARISONS[original.operator.token_type]
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_compare_local_expr(self)
+
+
+class FieldUpdateExpr(SetExpr):
+    """
+    `obj.field = obj.field <op> operand`, where obj is `this` or a variable,
+    so evaluating it once is the same as evaluating it twice.
+    """
+    __slots__ = ('operator', 'operand')
+
+    def __init__(self, original: SetExpr, operator: Token, operand: Expr):
+        super().__init__(original.obj, original.name, original.value)
+        self.operator = operator
+        self.operand = operand
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_field_update_expr(self)
@@ -0,0 +1,59 @@
+from typing import Any, List
+
+from interpreter.environment import Environment
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.lox_token import Token
+
+# What a global's slot holds until the global is declared.
+UNDEFINED: Any = object()
+
+
+class GlobalEnvironment(Environment):
+    """
+    The outermost environment. The resolver gives every global name a slot
+    the first time it meets it, declared or only used, and records it on
+    the node, so reading or writing a global is a list index plus a check
+    that the slot is no longer UNDEFINED. Binding stays late: a function
+    can use a global declared after it, and a REPL line can redefine one,
+    since declaring a name again reuses its slot. The names are only
+    needed for declarations and for the "Undefined variable" error.
+    """
+    __slots__ = ('names',)
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.names: dict[str, int] = dict()
+
+    def slot(self, name: str) -> int:
+        idx = self.names.get(name)
+        if idx is None:
+            idx = self.names[name] = len(self.values)
+            self.values.append(UNDEFINED)
+        return idx
+
+    def bind(self, names: List[str]) -> bool:
+        """
+        Gives names the slots they had when a cached script was resolved,
+        which they get unless other globals were resolved first.
+        """
+        return all(self.slot(name) == idx for idx, name in enumerate(names))
+
+    def define(self, name: str, value: Any) -> None:
+        self.values[self.slot(name)] = value
+
+    def get_slot(self, idx: int, name: Token) -> Any:
+        value = self.values[idx]
+        if value is UNDEFINED:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        return value
+
+    def assign_slot(self, idx: int, name: Token, value: Any) -> None:
+        if self.values[idx] is UNDEFINED:
+            raise LoxRuntimeError(name, f"Undefined variable '{name.lexeme}'.")
+        self.values[idx] = value
+
+    def get(self, name: Token) -> Any:
+        return self.get_slot(self.slot(name.lexeme), name)
+
+    def assign(self, name: Token, value: Any) -> None:
+        self.assign_slot(self.slot(name.lexeme), name, value)
@@ -0,0 +1,58 @@
+from typing import Any, Dict, List
+
+
+class InlineCache:
+    """
+    What one GetExpr, SetExpr or SuperExpr site found on the receivers it
+    has seen, keyed by the receiver's Shape (the superclass for SuperExpr):
+    - a get site caches a field's slot, or the method when there's no such field
+    - a set site caches the slot, plus the shape the instance moves to when
+      the field is new
+    - a super site caches the method
+
+    Shared shapes never change, and adding a field moves an instance to a
+    different shape, so an entry can't go stale. Classes can't change once
+    declared. Dictionary shapes grow in place, so they are never cached.
+    A site holds at most MAX_ENTRIES entries. Past that it is megamorphic
+    and stops caching.
+    """
+    __slots__ = ('kind', 'line', 'entries', 'hits', 'misses', 'megamorphic')
+    MAX_ENTRIES = 4
+
+    def __init__(self, kind: str, line: int) -> None:
+        self.kind = kind
+        self.line = line
+        self.entries: Dict[Any, Any] = dict()
+        self.hits = 0
+        self.misses = 0
+        self.megamorphic = False
+
+    def add(self, key: Any, entry: Any) -> None:
+        if len(self.entries) < InlineCache.MAX_ENTRIES:
+            self.entries[key] = entry
+        else:
+            self.megamorphic = True
+
+    def state(self) -> str:
+        if self.megamorphic:
+            return 'megamorphic'
+        if len(self.entries) > 1:
+            return 'polymorphic'
+        return 'monomorphic' if self.entries else 'uninitialized'
+
+    @staticmethod
+    def report(caches: List['InlineCache']) -> str:
+        states: Dict[str, int] = dict()
+        for cache in caches:
+            states[cache.state()] = states.get(cache.state(), 0) + 1
+        lines = [f"inline caches: {len(caches)} sites, "
+                 + ', '.join(f"{count} {state}" for state, count in sorted(states.items()))]
+        for kind in ('get', 'set', 'super'):
+            sites = [cache for cache in caches if cache.kind == kind]
+            hits = sum(cache.hits for cache in sites)
+            misses = sum(cache.misses for cache in sites)
+            if hits + misses:
+                lines.append(f"  {kind}: {hits} hits, {misses} misses ({hits / (hits + misses):.1%} hit rate)")
+        lines.extend(f"  {cache.kind} [line {cache.line}]: megamorphic, {cache.misses} misses"
+                     for cache in caches if cache.megamorphic)
+        return '\n'.join(lines)
@@ -4,7 +4,11 @@ import typing
 
 from interpreter.break_exception import BreakException
 from interpreter.clock import Clock
+from interpreter.completion import BREAK, RETURN, TAIL_CALL, Completion
 from interpreter.environment import Environment
+from interpreter.global_environment import UNDEFINED, GlobalEnvironment
+from interpreter.inline_cache import InlineCache
+from interpreter.fused_expr import CompareLocalExpr, FieldUpdateExpr, IncrementLocalExpr
 from interpreter.expr import AssignExpr, CallExpr, ExprVisitor, GetExpr, LogicalExpr, SetExpr, SuperExpr, ThisExpr, UnaryExpr, LiteralExpr, GroupingExpr, BinaryExpr, TernaryExpr, Expr, \
     VarExpr
 from interpreter.lox_callable import LoxCallable
@@ -15,23 +19,36 @@ from interpreter.lox_instance import LoxInstance
 from interpreter.lox_runtime_error import LoxRuntimeError
 from interpreter.lox_token import Token
 from interpreter.lox_token_type import TokenType
-from interpreter.return_exception import Return
+from interpreter.quickened_expr import FloatBinaryExpr, FloatNegateExpr, GenericBinaryExpr, GenericUnaryExpr, StringAddExpr
+from interpreter.quickening import Quickening
+from interpreter.shape import Shape
 from interpreter.stmt import BreakStmt, ClassStmt, FunctionStmt, IfStmt, ReturnStmt, StmtVisitor, PrintStmt, ExpressionStmt, Stmt, VarStmt, BlockStmt, WhileStmt
+if typing.TYPE_CHECKING:
+    from interpreter.tiering import Tiering
 
 
 class Interpreter(ExprVisitor, StmtVisitor):
     def __init__(self, error_handler: LoxErrorHandler):
         self.error_handler = error_handler
-        self.globals = Environment()
+        self.globals = GlobalEnvironment()
         self.environment: Environment = self.globals
-        self.locals: dict[Expr, Tuple[int, int]] = dict()
 
         self.globals.define("clock", Clock())
+        # Set by Lox.make_interpreter when tiered execution is on.
+        self.tiering: Optional[Tiering] = None
+        # Every InlineCache the property accesses run so far have made.
+        self.inline_caches: List[InlineCache] = list()
+        self.quickening = Quickening()
 
     def interpret(self, statements: List[Stmt], repl: bool = False) -> None:
         try:
             for stmt in statements:
-                value = self.execute(stmt)
+                try:
+                    value = self.execute(stmt)
+                except BreakException:
+                    # A break no loop caught ends the top-level statement it is
+                    # in, as one outside a loop directly in that statement does.
+                    continue
                 if repl and isinstance(stmt, ExpressionStmt):
                     print(value)
         except LoxRuntimeError as error:
@@ -43,34 +60,61 @@ class Interpreter(ExprVisitor, StmtVisitor):
     def visit_binary_expr(self, expr: BinaryExpr) -> Any:
         left: Any = self.evaluate(expr.left)
         right: Any = self.evaluate(expr.right)
+        self.quickening.quicken_binary(expr, left, right)
+        return self.binary_operation(expr.operator, left, right)
 
-        match expr.operator.token_type:
+    def visit_float_binary_expr(self, expr: FloatBinaryExpr) -> Any:
+        left: Any = self.evaluate(expr.left)
+        right: Any = self.evaluate(expr.right)
+        if type(left) is float and type(right) is float:
+            try:
+                return expr.operation(left, right)
+            except ZeroDivisionError:
+                raise LoxRuntimeError(expr.operator, "Cannot divide by zero.") from None
+        self.quickening.deoptimize(expr, GenericBinaryExpr)
+        return self.binary_operation(expr.operator, left, right)
+
+    def visit_string_add_expr(self, expr: StringAddExpr) -> Any:
+        left: Any = self.evaluate(expr.left)
+        right: Any = self.evaluate(expr.right)
+        if type(left) is str and type(right) is str:
+            return left + right
+        self.quickening.deoptimize(expr, GenericBinaryExpr)
+        return self.binary_operation(expr.operator, left, right)
+
+    def visit_generic_binary_expr(self, expr: GenericBinaryExpr) -> Any:
+        left: Any = self.evaluate(expr.left)
+        right: Any = self.evaluate(expr.right)
+        return self.binary_operation(expr.operator, left, right)
+
+    def binary_operation(self, operator: Token, left: Any, right: Any) -> Any:
+        match operator.token_type:
             case TokenType.GREATER:
                 if isinstance(left, str) and isinstance(right, str):
                     return len(str(left)) > len(str(right))
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) > float(right)
             case TokenType.GREATER_EQUAL:
                 if isinstance(left, str) and isinstance(right, str):
                     return len(str(left)) >= len(str(right))
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) >= float(right)
             case TokenType.LESS:
                 if isinstance(left, str) and isinstance(right, str):
                     return len(str(left)) < len(str(right))
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) < float(right)
             case TokenType.LESS_EQUAL:
                 if isinstance(left, str) and isinstance(right, str):
                     return len(str(left)) <= len(str(right))
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) <= float(right)
             case TokenType.BANG_EQUAL:
                 return not self.is_equal(left, right)
             case TokenType.EQUAL_EQUAL:
                 return self.is_equal(left, right)
             case TokenType.MINUS:
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) - float(right)
             case TokenType.PLUS:
                 if isinstance(left, float) and isinstance(right, float):
@@ -80,48 +124,137 @@ class Interpreter(ExprVisitor, StmtVisitor):
                 if (isinstance(left, str) and isinstance(right, float)) \
                         or isinstance(left, float) and isinstance(right, str):
                     return str(left) + str(right)
-                raise LoxRuntimeError(expr.operator, "Operands must be two numbers or two strings.")
+                raise LoxRuntimeError(operator, "Operands must be two numbers or two strings.")
             case TokenType.SLASH:
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 if float(right) == 0:
-                    raise LoxRuntimeError(expr.operator, "Cannot divide by zero.")
+                    raise LoxRuntimeError(operator, "Cannot divide by zero.")
                 return float(left) / float(right)
             case TokenType.STAR:
-                self.check_number_operands(expr.operator, left, right)
+                self.check_number_operands(operator, left, right)
                 return float(left) * float(right)
 
         return None
     
     def visit_call_expr(self, expr: CallExpr):
-        callee: object = self.evaluate(expr.callee)
+        if type(expr.callee) is GetExpr:
+            return self.invoke(expr, expr.callee)
+        return self.call_value(expr, self.evaluate(expr.callee))
+
+    def invoke(self, expr: CallExpr, get: GetExpr, tail: bool = False) -> Any:
+        """
+        Calls `obj.name(...)`. When name is a method rather than a field, the
+        method is called with obj as its receiver and no bound method is made.
+        A tail call to a method is only set up in TAIL_CALL; see call_value.
+        """
+        obj: Any = self.evaluate(get.obj)
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(get.name, "Only instances have properties.")
+        cache: InlineCache = get.cache or self.cache_site(get, 'get', get.name.line)
+        target: int | LoxFunction | None = cache.entries.get(obj.shape)
+        if target is None:
+            cache.misses += 1
+            target = self.lookup_property(cache, obj, get.name)
+        else:
+            cache.hits += 1
+        if type(target) is int:
+            return self.call_value(expr, obj.values[target], tail)
+        method: LoxFunction = typing.cast(LoxFunction, target)
+        arguments: List[object] = [self.evaluate(argument) for argument in expr.arguments]
+        if len(arguments) != method.arity():
+            raise LoxRuntimeError(expr.paren, f"Expected {method.arity()} arguments but got {len(arguments)}.")
+        if tail:
+            TAIL_CALL.function = method
+            TAIL_CALL.receiver = obj
+            TAIL_CALL.arguments = arguments
+            return TAIL_CALL
+        try:
+            return method.invoke(self, obj, arguments)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
+
+    def call_value(self, expr: CallExpr, callee: object, tail: bool = False) -> Any:
+        """
+        Calls callee. A tail call to a Lox function isn't made here: it is
+        left in TAIL_CALL for the LoxFunction.run that is returning it.
+        """
         arguments: List[object] = list()
         for argument in expr.arguments:
             arguments.append(self.evaluate(argument))
         if not isinstance(callee, LoxCallable):
-            raise RuntimeError("Can only call functions and classes.")
+            raise LoxRuntimeError(expr.paren, "Can only call functions and classes.")
         functionObj: LoxCallable = typing.cast(LoxCallable, callee)
         if len(arguments) != functionObj.arity():
-            raise RuntimeError(expr.paren, f"Expected {functionObj.arity()} arguments but got {len(arguments)}.")
-        return functionObj.call(self, arguments)
+            raise LoxRuntimeError(expr.paren, f"Expected {functionObj.arity()} arguments but got {len(arguments)}.")
+        if tail and isinstance(functionObj, LoxFunction):
+            TAIL_CALL.function = functionObj
+            TAIL_CALL.receiver = functionObj.receiver
+            TAIL_CALL.arguments = arguments
+            return TAIL_CALL
+        try:
+            return functionObj.call(self, arguments)
+        except RecursionError:
+            raise LoxRuntimeError(expr.paren, "Stack overflow.") from None
 
     def visit_get_expr(self, expr: GetExpr):
         obj: Any = self.evaluate(expr.obj)
         if isinstance(obj, LoxInstance):
-            obj = typing.cast(LoxInstance, obj)
-            return obj.get(expr.name)
+            cache: InlineCache = expr.cache or self.cache_site(expr, 'get', expr.name.line)
+            target: int | LoxFunction | None = cache.entries.get(obj.shape)
+            if target is None:
+                cache.misses += 1
+                target = self.lookup_property(cache, obj, expr.name)
+            else:
+                cache.hits += 1
+            if type(target) is int:
+                return obj.values[target]
+            return typing.cast(LoxFunction, target).bind(obj)
 
         raise LoxRuntimeError(expr.name, "Only instances have properties.")
 
+    def cache_site(self, expr: GetExpr | SetExpr | SuperExpr, kind: str, line: int) -> InlineCache:
+        """Gives a property access its InlineCache the first time it runs."""
+        cache = expr.cache = InlineCache(kind, line)
+        self.inline_caches.append(cache)
+        return cache
+
+    @staticmethod
+    def lookup_property(cache: InlineCache, obj: LoxInstance, name: Token) -> int | LoxFunction:
+        """The slot of the field name on obj, or else its method, added to a get site's cache."""
+        shape = obj.shape
+        target: int | LoxFunction | None = shape.slots.get(name.lexeme)
+        if target is None:
+            target = obj.klass.find_method(name.lexeme)
+            if target is None:
+                raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
+        if shape.shared:
+            cache.add(shape, target)
+        return target
+
     def visit_grouping_expr(self, expr: GroupingExpr) -> Any:
         return self.evaluate(expr.expression)
 
     def visit_unary_expr(self, expr: UnaryExpr):
         right = self.evaluate(expr.right)
-        match expr.operator.token_type:
+        self.quickening.quicken_unary(expr, right)
+        return self.unary_operation(expr.operator, right)
+
+    def visit_float_negate_expr(self, expr: FloatNegateExpr) -> Any:
+        right: Any = self.evaluate(expr.right)
+        if type(right) is float:
+            return -right
+        self.quickening.deoptimize(expr, GenericUnaryExpr)
+        return self.unary_operation(expr.operator, right)
+
+    def visit_generic_unary_expr(self, expr: GenericUnaryExpr) -> Any:
+        return self.unary_operation(expr.operator, self.evaluate(expr.right))
+
+    def unary_operation(self, operator: Token, right: Any) -> Any:
+        match operator.token_type:
             case TokenType.BANG:
                 return not self.is_truthy(right)
             case TokenType.MINUS:
-                self.check_number_operand(expr.operator, right)
+                self.check_number_operand(operator, right)
                 return -float(right)
         return None
 
@@ -173,49 +306,92 @@ class Interpreter(ExprVisitor, StmtVisitor):
             raise LoxRuntimeError(expr.name, "Only instances have fields.")
         value: Any = self.evaluate(expr.value)
         obj = typing.cast(LoxInstance, obj)
-        obj.set(expr.name, value)
+        cache: InlineCache = expr.cache or self.cache_site(expr, 'set', expr.name.line)
+        shape: Shape = obj.shape
+        entry: Optional[Tuple[int, Shape]] = cache.entries.get(shape)
+        if entry is None:
+            cache.misses += 1
+            obj.set(expr.name, value)
+            if shape.shared and obj.shape.shared:
+                cache.add(shape, (obj.shape.slots[expr.name.lexeme], obj.shape))
+        else:
+            cache.hits += 1
+            slot, next_shape = entry
+            if next_shape is shape:
+                obj.values[slot] = value
+            else:
+                obj.values.append(value)
+                obj.shape = next_shape
         return value
 
     def visit_super_expr(self, expr: SuperExpr):
-        distance: int = typing.cast(int, self.locals.get(expr, 0))
+        distance: int = typing.cast(int, expr.depth)
         superclass: LoxClass = typing.cast(LoxClass, self.environment.get_at(distance, "super", -1))
 
-        obj : LoxInstance = typing.cast(LoxInstance, self.environment.get_at(distance-1, "this", -1))
-
-        method: Optional[LoxFunction] = superclass.find_method(expr.method.lexeme)
+        obj : LoxInstance = typing.cast(LoxInstance, self.environment.get_at(distance-1, "this", 0))
 
+        cache: InlineCache = expr.cache or self.cache_site(expr, 'super', expr.method.line)
+        method: Optional[LoxFunction] = cache.entries.get(superclass)
         if method is None:
-            raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
+            cache.misses += 1
+            method = superclass.find_method(expr.method.lexeme)
+            if method is None:
+                raise LoxRuntimeError(expr.method, f"Undefined property '{expr.method.lexeme}'.")
+            cache.add(superclass, method)
+        else:
+            cache.hits += 1
         return method.bind(obj)
 
     def visit_this_expr(self, expr: ThisExpr):
         return self.look_up_variable(expr.keyword, expr)
 
     def visit_while_stmt(self, stmt: WhileStmt):
+        if self.tiering is not None:
+            return self.tiering.loop(self, stmt)
         try:
             while self.is_truthy(self.evaluate(stmt.condition)):
-                self.execute(stmt.body)
+                completion = self.execute(stmt.body)
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
         except BreakException as e:
+            # A break in a function called from the loop, outside any loop of its own.
             pass
         return None
 
     def evaluate(self, expr: Expr) -> Any:
         return expr.accept(self)
 
-    def execute(self, stmt: Stmt) -> None:
+    def execute(self, stmt: Stmt) -> Any:
         return stmt.accept(self)
 
-    def resolve(self, expr: Expr, depth: int, idx: int):
-        self.locals[expr] = (depth, idx)
-
-    def execute_block(self, statements: List[Stmt], environment: Environment) -> None:
+    def resolve(self, expr: VarExpr | AssignExpr | ThisExpr | SuperExpr, depth: int, idx: int):
+        """
+        Records where the resolver found a local variable directly on the
+        node. Nodes left at depth None are globals.
+        """
+        expr.depth = depth
+        expr.idx = idx
+
+    def resolve_global(self, expr: VarExpr | AssignExpr | ThisExpr | SuperExpr, name: Token):
+        """
+        Gives a global's node the slot of its name in globals. The global
+        may not be declared yet: the slot is bound when it runs.
+        """
+        expr.idx = self.globals.slot(name.lexeme)
+
+    def execute_block(self, statements: List[Stmt], environment: Environment) -> Optional[Completion]:
         previous: Environment = self.environment
         try:
             self.environment = environment
             for stmt in statements:
-                self.execute(stmt)
+                completion = self.execute(stmt)
+                if completion is RETURN or completion is BREAK:
+                    return completion
         finally:
             self.environment = previous
+        return None
 
     def visit_class_stmt(self, stmt: ClassStmt):
         superclass: Any = None
@@ -223,12 +399,10 @@ class Interpreter(ExprVisitor, StmtVisitor):
             superclass = self.evaluate(stmt.superclass)
             if not isinstance(superclass, LoxClass):
                 raise LoxRuntimeError(stmt.superclass.name, "Superclass must be a class.")
-        
-        self.environment.define(stmt.name.lexeme, None)
-        
+
         if stmt.superclass:
-            self.environment = Environment(self.environment)
-            self.environment.define("super", superclass)
+            self.environment = Environment(self.environment, 1)
+            self.environment.values[0] = superclass
 
         methods: dict[str, LoxFunction] = dict()
         for method in stmt.methods:
@@ -238,26 +412,36 @@ class Interpreter(ExprVisitor, StmtVisitor):
         klass: LoxClass = LoxClass(stmt.name.lexeme, superclass, methods)
         if stmt.superclass:
             self.environment = typing.cast(Environment, self.environment.enclosing)
-        self.environment.assign(stmt.name, klass)
+        self.define(stmt.slot, stmt.name, klass)
         
         return None
 
-    def visit_block_stmt(self, stmt: BlockStmt) -> None:
-        self.execute_block(stmt.statements, Environment(self.environment))
+    def define(self, slot: Optional[int], name: Token, value: Any) -> None:
+        """Declares a variable in the slot the resolver gave it, or by name when it is a global."""
+        if slot is None:
+            self.globals.define(name.lexeme, value)
+        else:
+            self.environment.values[slot] = value
+
+    def visit_block_stmt(self, stmt: BlockStmt) -> Optional[Completion]:
+        if not stmt.locals:
+            # A block without a frame of its own runs in the enclosing one.
+            return self.execute_block(stmt.statements, self.environment)
+        return self.execute_block(stmt.statements, Environment(self.environment, len(stmt.locals)))
 
     def visit_expression_stmt(self, expr: ExpressionStmt) -> None:
         return self.evaluate(expr.expression)
     
     def visit_function_stmt(self, stmt: FunctionStmt):
         functionObj = LoxFunction(stmt, self.environment, False)
-        self.environment.define(stmt.name.lexeme, functionObj)
+        self.define(stmt.slot, stmt.name, functionObj)
         return functionObj 
 
-    def visit_if_stmt(self, stmt: IfStmt) -> None:
+    def visit_if_stmt(self, stmt: IfStmt) -> Optional[Completion]:
         if self.is_truthy(self.evaluate(stmt.condition)):
-            self.execute(stmt.thenBranch)
+            return self.execute(stmt.thenBranch)
         elif stmt.elsebranch:
-            self.execute(stmt.elsebranch)
+            return self.execute(stmt.elsebranch)
         return None
 
     def visit_print_stmt(self, expr: PrintStmt) -> None:
@@ -265,15 +449,22 @@ class Interpreter(ExprVisitor, StmtVisitor):
         print(self.stringify(value))
         return None
 
-    def visit_return_stmt(self, stmt: ReturnStmt):
+    def visit_return_stmt(self, stmt: ReturnStmt) -> Completion:
         value: object = None
-        if stmt.value is not None:
+        if stmt.tail and type(stmt.value) is CallExpr:
+            call: CallExpr = stmt.value
+            if type(call.callee) is GetExpr:
+                value = self.invoke(call, call.callee, True)
+            else:
+                value = self.call_value(call, self.evaluate(call.callee), True)
+        elif stmt.value is not None:
             value = self.evaluate(stmt.value)
-        
-        raise Return(value)
 
-    def visit_break_stmt(self, stmt: BreakStmt):
-        raise BreakException()
+        RETURN.value = value
+        return RETURN
+
+    def visit_break_stmt(self, stmt: BreakStmt) -> Completion:
+        return BREAK
 
     def visit_var_stmt(self, stmt: VarStmt) -> None:
         value: Any = None
@@ -281,25 +472,56 @@ class Interpreter(ExprVisitor, StmtVisitor):
             value = self.evaluate(stmt.initializer)
         if value is None:
             raise LoxRuntimeError(stmt.name, "A variable must be initialized before it can be used.")
-        self.environment.define(stmt.name.lexeme, value)
+        self.define(stmt.slot, stmt.name, value)
         return None
 
     def visit_var_expr(self, expr: VarExpr) -> Any:
         return self.look_up_variable(expr.name, expr)
     
-    def look_up_variable(self, name: Token, expr: Expr):
-        distance, idx =  self.locals.get(expr, (None, None))
-        if distance is not None and idx is not None:
-            return self.environment.get_at(distance, name.lexeme, idx)
-        else:
-            return self.globals.get(name)
+    def look_up_variable(self, name: Token, expr: VarExpr | ThisExpr):
+        depth: Optional[int] = expr.depth
+        if depth == 0:
+            return self.environment.values[expr.idx]
+        if depth is not None:
+            return self.environment.ancestor(depth).values[expr.idx]
+        value = self.globals.values[expr.idx]
+        return self.globals.get_slot(expr.idx, name) if value is UNDEFINED else value
     
+    def visit_increment_local_expr(self, expr: IncrementLocalExpr) -> Any:
+        values: List[Any] = self.environment.ancestor(typing.cast(int, expr.depth)).values
+        value: Any = values[expr.idx]
+        if isinstance(value, float):
+            value += expr.amount
+            values[expr.idx] = value
+            return value
+        return self.visit_assign_expr(expr)
+
+    def visit_compare_local_expr(self, expr: CompareLocalExpr) -> Any:
+        left: Any = self.environment.ancestor(expr.left_depth).values[expr.left_idx]
+        right: Any = expr.constant
+        if expr.right_depth is not None:
+            right = self.environment.ancestor(expr.right_depth).values[expr.right_idx]
+        if isinstance(left, float) and isinstance(right, float):
+            return expr.compare(left, right)
+        return self.binary_operation(expr.operator, left, right)
+
+    def visit_field_update_expr(self, expr: FieldUpdateExpr) -> Any:
+        obj: Any = self.evaluate(expr.obj)
+        if not isinstance(obj, LoxInstance):
+            raise LoxRuntimeError(expr.name, "Only instances have fields.")
+        slot: Optional[int] = obj.shape.slots.get(expr.name.lexeme)
+        if slot is None:
+            # A method or a missing property: take the unfused path.
+            return self.visit_set_expr(expr)
+        value: Any = self.binary_operation(expr.operator, obj.values[slot], self.evaluate(expr.operand))
+        obj.values[slot] = value
+        return value
+
     def visit_assign_expr(self, expr: AssignExpr) -> Any:
         value =  self.evaluate(expr.value)
-        distance, idx = self.locals.get(expr, (None, None))
-        if distance is not None and idx is not None:
-            self.environment.assign_at(distance, expr.name, expr, idx)
+        if expr.depth is not None:
+            self.environment.assign_at(expr.depth, expr.name, value, expr.idx)
         else:
-            self.globals.assign(expr.name, value)
+            self.globals.assign_slot(expr.idx, expr.name, value)
         return value
     
\ No newline at end of file
@@ -1,71 +1,171 @@
 import argparse
-from typing import List
+import sys
+from typing import Iterator, List, Optional
 
+from interpreter.closure_compiler import ClosureCompiler
+from interpreter.constant_folder import ConstantFolder
 from interpreter.expr import Expr
+from interpreter.inline_cache import InlineCache
 from interpreter.interpreter import Interpreter
 from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_options import LoxOptions
 from interpreter.parser import Parser
+from interpreter.pratt_parser import PrattParser
 from interpreter.lox_token import Token
+from interpreter.node_fuser import NodeFuser
 from interpreter.resolver import Resolver
+from interpreter.script_cache import ScriptCache
 from interpreter.stmt import Stmt
 from tools.ast_printer import ASTPrinter
 from interpreter.scanner import Scanner
+from interpreter.regex_scanner import RegexScanner
+from interpreter.tiering import Tiering
+from interpreter.token_stream import TokenStream
+from interpreter.transpiling_interpreter import TranspilingInterpreter
+from interpreter.vm import VM
 
 class Lox:
     @staticmethod
-    def main(args: List[str]) -> None:
+    def main(args: List[str], options: Optional[LoxOptions] = None) -> None:
         if len(args) > 1:
             print('Usage: pylox [script]')
             exit(64)
+        options = options or LoxOptions()
         error_handler = LoxErrorHandler()
-        interpreter = Interpreter(error_handler)
+        interpreter = Lox.make_interpreter(error_handler, options)
         if len(args) == 1:
-            Lox.run_file(error_handler, interpreter, args[0])
+            Lox.run_file(error_handler, interpreter, args[0], options)
         else:
-            Lox.run_prompt(error_handler, interpreter)
+            Lox.run_prompt(error_handler, interpreter, options)
 
     @staticmethod
-    def run_file(error_handler: LoxErrorHandler, interpreter: Interpreter, file_path: str) -> None:
+    def run_file(error_handler: LoxErrorHandler, interpreter: Interpreter, file_path: str, options: LoxOptions) -> None:
         with open(file_path, 'r') as file:
             source_code = file.read()
-            Lox.run(error_handler, interpreter, source_code)
+            cache: Optional[ScriptCache] = ScriptCache(file_path) if options.cache else None
+            Lox.run(error_handler, interpreter, source_code, options=options, cache=cache)
             if error_handler.HAS_ERROR:
                 exit(65)
             if error_handler.HAS_RUNTIME_ERROR:
                 exit(70)
 
     @staticmethod
-    def run_prompt(error_handler: LoxErrorHandler, interpreter: Interpreter) -> None:
+    def run_prompt(error_handler: LoxErrorHandler, interpreter: Interpreter, options: LoxOptions) -> None:
         while True:
             print('>', end='')
             line = input()
             if line is None:
                 break
-            Lox.run(error_handler, interpreter, line, repl=True)
+            Lox.run(error_handler, interpreter, line, repl=True, options=options)
             error_handler.HAS_ERROR = False
 
     @staticmethod
-    def run(error_handler: LoxErrorHandler, interpreter: Interpreter, source_code: str, repl: bool = False) -> None:
+    def run(error_handler: LoxErrorHandler, interpreter: Interpreter, source_code: str, repl: bool = False,
+            options: Optional[LoxOptions] = None, cache: Optional[ScriptCache] = None) -> None:
+        options = options or LoxOptions()
+        statements: Optional[List[Stmt]] = cache.load(source_code, interpreter.globals) if cache else None
+        if statements is None:
+            statements = Lox.compile(error_handler, interpreter, source_code, options)
+            if statements is None:
+                return
+            if cache:
+                cache.store(source_code, statements, interpreter.globals)
+
+        if options.optimize:
+            ConstantFolder(interpreter, options.optimize).fold(statements)
+            if options.engine == 'tree':
+                fuser = NodeFuser()
+                fuser.fuse(statements)
+                if options.stats:
+                    print(fuser.report(), file=sys.stderr)
+        interpreter.interpret(statements, repl)
+        if options.stats and interpreter.tiering is not None:
+            print(interpreter.tiering.report(), file=sys.stderr)
+        if options.stats and interpreter.inline_caches:
+            print(InlineCache.report(interpreter.inline_caches), file=sys.stderr)
+        if options.stats and interpreter.quickening.quickened:
+            print(interpreter.quickening.report(), file=sys.stderr)
 
-        scanner: Scanner = Scanner(error_handler, source_code)
-        tokens: List[Token] = scanner.scan_tokens()
+    @staticmethod
+    def compile(error_handler: LoxErrorHandler, interpreter: Interpreter, source_code: str,
+                options: LoxOptions) -> Optional[List[Stmt]]:
+        """
+        Scans, parses and resolves a program
+        :return: the resolved statements, or None if there were compile errors
+        """
+        scanner: Scanner = Lox.make_scanner(error_handler, source_code, options)
+        tokens: Iterator[Token] | TokenStream
+        if options.tokens == 'compact':
+            tokens = scanner.scan_compact().stream()
+        else:
+            tokens = scanner.iter_tokens()
 
-        parser: Parser = Parser(error_handler, tokens)
+        parser: Parser = Lox.make_parser(error_handler, tokens, options)
         statements: List[Stmt] = parser.parse()
         if error_handler.HAS_ERROR:
-            return 
+            return None
         
         resolver: Resolver = Resolver(interpreter)
         resolver.resolve(statements)
         
         if error_handler.HAS_ERROR:
-            return
+            return None
+        return statements
 
-        interpreter.interpret(statements, repl)
+    @staticmethod
+    def make_interpreter(error_handler: LoxErrorHandler, options: LoxOptions) -> Interpreter:
+        if options.engine == 'closure':
+            return ClosureCompiler(error_handler)
+        if options.engine == 'vm':
+            return VM(error_handler, options.stack_size)
+        if options.engine == 'transpile':
+            return TranspilingInterpreter(error_handler, options.transpile_output)
+        interpreter = Interpreter(error_handler)
+        if options.tier:
+            interpreter.tiering = Tiering(interpreter, options.tier_calls, options.tier_loops)
+        return interpreter
+
+    @staticmethod
+    def make_scanner(error_handler: LoxErrorHandler, source_code: str, options: LoxOptions) -> Scanner:
+        if options.scanner == 'regex':
+            return RegexScanner(error_handler, source_code)
+        return Scanner(error_handler, source_code)
+
+    @staticmethod
+    def make_parser(error_handler: LoxErrorHandler, tokens: Iterator[Token] | TokenStream, options: LoxOptions) -> Parser:
+        if options.parser == 'pratt':
+            return PrattParser(error_handler, tokens)
+        return Parser(error_handler, tokens)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
     parser.add_argument('-f', '--file', required=False)
+    parser.add_argument('--scanner', choices=LoxOptions.SCANNERS, default='loop')
+    parser.add_argument('--tokens', choices=LoxOptions.TOKEN_MODES, default='stream')
+    parser.add_argument('--parser', choices=LoxOptions.PARSERS, default='recursive')
+    parser.add_argument('--engine', choices=LoxOptions.ENGINES, default='tree',
+                        help='tree walks the AST, closure compiles it to Python closures first, vm runs it as bytecode, '
+                             'transpile translates it to a Python module')
+    parser.add_argument('--transpile', nargs='?', const='', metavar='MODULE',
+                        help='same as --engine transpile; with MODULE, also write the generated Python module there')
+    parser.add_argument('--no-cache', action='store_true', help="don't read or write __loxcache__/*.loxc")
+    parser.add_argument('-O', dest='optimize', action='count', default=0,
+                        help='-O folds constant expressions and fuses common node patterns, '
+                             '-OO also propagates constant locals')
+    parser.add_argument('--tier', action='store_true',
+                        help='tree engine: compile hot functions and loops with the closure compiler as they run')
+    parser.add_argument('--tier-calls', type=int, default=100, metavar='N',
+                        help='calls after which --tier compiles a function (default 100)')
+    parser.add_argument('--tier-loops', type=int, default=1000, metavar='N',
+                        help='loop back-edges after which --tier compiles a loop, and its function (default 1000)')
+    parser.add_argument('--stack-size', type=int, default=1024, metavar='N',
+                        help='vm engine: call frames before "Stack overflow." (default 1024); the VM keeps '
+                             'them on its own stack, so this is not limited by Python\'s recursion limit')
+    parser.add_argument('--stats', action='store_true', help='report what the optimization passes, tiering, inline caches and quickening did on stderr')
     args = parser.parse_args()
 
-    Lox.main([args.file] if args.file else [])
\ No newline at end of file
+    options = LoxOptions(scanner=args.scanner, tokens=args.tokens, parser=args.parser, cache=not args.no_cache,
+                         optimize=args.optimize, engine='transpile' if args.transpile is not None else args.engine,
+                         stats=args.stats, transpile_output=args.transpile or None, tier=args.tier,
+                         tier_calls=args.tier_calls, tier_loops=args.tier_loops, stack_size=args.stack_size)
+    Lox.main([args.file] if args.file else [], options)
\ No newline at end of file
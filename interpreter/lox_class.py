@@ -6,35 +6,58 @@ if typing.TYPE_CHECKING:
     from interpreter.interpreter import Interpreter
 from interpreter.lox_callable import LoxCallable
 from interpreter.lox_instance import LoxInstance
+from interpreter.shape import Shape
 
 
 class LoxClass(LoxCallable):
+    """
+    A class keeps its own methods in `methods` and every method it
+    responds to, inherited ones included, in `method_table`, which is
+    filled when the class is created: the superclass's table is copied
+    down and the class's own methods override it. Classes can't change
+    once declared, so method lookup never walks the superclass chain, and
+    the initializer and its arity are looked up once too.
+    """
     def __init__(self, name: str, superclass: 'LoxClass',methods: dict[str, LoxFunction]) -> None:
         self.name: str = name
-        self.superclass: LoxClass = superclass 
+        self.superclass: LoxClass = superclass
         self.methods: dict[str, LoxFunction] = methods
+        self.method_table: dict[str, LoxFunction] = dict()
+        self.initializer: Optional[LoxFunction] = None
+        self.initializer_arity: int = 0
+        # The shape of the class's instances before any field is set.
+        self.shape: Shape = Shape(dict())
+        if superclass:
+            self.inherit(superclass)
+        for method_name, method in methods.items():
+            self.add_method(method_name, method)
 
     def __repr__(self) -> str:
         return self.name
-    
+
+    def inherit(self, superclass: 'LoxClass') -> None:
+        """Copies down the methods of the superclass; own methods are added after."""
+        self.superclass = superclass
+        self.method_table.update(superclass.method_table)
+        self.initializer = superclass.initializer
+        self.initializer_arity = superclass.initializer_arity
+
+    def add_method(self, name: str, method: LoxFunction) -> None:
+        self.methods[name] = method
+        self.method_table[name] = method
+        if name == "init":
+            self.initializer = method
+            self.initializer_arity = method.arity()
+
     def arity(self) -> int:
-        initializer: Optional[LoxFunction] = self.find_method("init")
-        if initializer is None:
-            return 0
-        return initializer.arity()
-    
+        return self.initializer_arity
+
     def call(self, interpreter: 'Interpreter', arguments: List[Any]) -> Any:
         instance: LoxInstance = LoxInstance(self)
-        initializer: Optional[LoxFunction] = self.find_method("init")
+        initializer: Optional[LoxFunction] = self.initializer
         if initializer:
-            initializer.bind(instance).call(interpreter, arguments)
+            initializer.invoke(interpreter, instance, arguments)
         return instance
-    
+
     def find_method(self, name: str) -> Optional[LoxFunction]:
-        if name in self.methods:
-            return self.methods.get(name)
-        
-        if self.superclass:
-            return self.superclass.find_method(name)
-        
-        return None
\ No newline at end of file
+        return self.method_table.get(name)
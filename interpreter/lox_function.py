@@ -1,9 +1,10 @@
 from __future__ import annotations
 import typing
-from typing import Any, List
+from typing import Any, List, Optional
+from interpreter.break_exception import BreakException
+from interpreter.completion import BREAK, RETURN, TAIL_CALL, Completion
 from interpreter.environment import Environment
 from interpreter.lox_callable import LoxCallable
-from interpreter.return_exception import Return
 from interpreter.stmt import FunctionStmt
 if typing.TYPE_CHECKING:
     from interpreter.interpreter import Interpreter
@@ -11,34 +12,65 @@ if typing.TYPE_CHECKING:
 
 
 class LoxFunction(LoxCallable):
-    def __init__(self, declaration: FunctionStmt, closure: Environment, is_initializer: bool) -> None:
+    """
+    A function or method. A method's frame holds its receiver as `this` in
+    the first slot, ahead of the parameters, so binding a method only
+    records the receiver, and Interpreter.invoke calls a method on an
+    instance without binding it at all.
+
+    A call runs as a trampoline: when the body returns TAIL_CALL, the
+    function it tail-calls runs next in the same Python frame, so tail
+    recursion needs no Python stack.
+    """
+    def __init__(self, declaration: FunctionStmt, closure: Environment, is_initializer: bool,
+                 receiver: Optional[LoxInstance] = None) -> None:
         self.declaration: FunctionStmt = declaration
         self.closure = closure
-        self.is_initializer: bool = is_initializer 
+        self.is_initializer: bool = is_initializer
+        self.receiver: Optional[LoxInstance] = receiver
+        # A call's frame: `this` for a method, the parameters, then the body's locals.
+        self.frame_size: int = len(declaration.locals)
 
     def bind(self, instance: LoxInstance):
-        environment: Environment = Environment(self.closure)
-        environment.define("this", instance)
-        return LoxFunction(self.declaration, environment, self.is_initializer)
+        return LoxFunction(self.declaration, self.closure, self.is_initializer, instance)
 
     def arity(self) -> int:
         return len(self.declaration.params)
 
     def call(self, interpreter: Interpreter, arguments: List[Any]) -> Any:
-        environment: Environment = Environment(self.closure)
-        for param, argument in zip(self.declaration.params, arguments):
-            environment.define(param.lexeme, argument)
-        try:
-            interpreter.execute_block(self.declaration.body, environment)
-        except Return as return_value:
-            if self.is_initializer:
-                return self.closure.get_at(0, "this")
-            return return_value.value
-        
-        if self.is_initializer:
-            return self.closure.get_at(0, "this")
-        return None
-    
+        return self.run(interpreter, self.receiver, arguments)
+
+    def invoke(self, interpreter: Interpreter, receiver: LoxInstance, arguments: List[Any]) -> Any:
+        return self.run(interpreter, receiver, arguments)
+
+    def run(self, interpreter: Interpreter, receiver: Optional[LoxInstance], arguments: List[Any]) -> Any:
+        function: LoxFunction = self
+        while True:
+            environment: Environment = Environment(function.closure, function.frame_size)
+            if receiver is None:
+                environment.values[:len(arguments)] = arguments
+            else:
+                environment.values[0] = receiver
+                environment.values[1:len(arguments) + 1] = arguments
+            completion = function.execute_body(interpreter, environment)
+            if completion is BREAK:
+                # A break outside any loop leaves the function and ends the caller's loop.
+                raise BreakException()
+            if function.is_initializer:
+                return environment.values[0]
+            if completion is not RETURN:
+                return None
+            if RETURN.value is not TAIL_CALL:
+                return RETURN.value
+            function = TAIL_CALL.function
+            receiver = TAIL_CALL.receiver
+            arguments = TAIL_CALL.arguments
+
+    def execute_body(self, interpreter: Interpreter, environment: Environment) -> Optional[Completion]:
+        if interpreter.tiering is None:
+            return interpreter.execute_block(self.declaration.body, environment)
+        return interpreter.tiering.call(interpreter, self.declaration, environment)
+
     def __str__(self) -> str:
         return f"<fn {self.declaration.name.lexeme}>"
 
@@ -3,28 +3,50 @@ import typing
 from interpreter.lox_function import LoxFunction
 from interpreter.lox_runtime_error import LoxRuntimeError
 from interpreter.lox_token import Token
+from interpreter.shape import Shape
 if typing.TYPE_CHECKING:
     from interpreter.lox_class import LoxClass
 
 
 
 class LoxInstance:
+    """
+    Fields live in a compact values list, at the slots the instance's Shape
+    gives their names; see Shape.
+    """
+    __slots__ = ('klass', 'shape', 'values')
+
     def __init__(self, klass: 'LoxClass') -> None:
         self.klass: LoxClass = klass
-        self.fields: dict[str, typing.Any] = dict()
+        self.shape: Shape = klass.shape
+        self.values: list[typing.Any] = list()
 
     def __repr__(self) -> str:
         return self.klass.name + " instance"
-    
+
     def get(self, name: Token) -> typing.Any:
-        if name.lexeme in self.fields:
-            return self.fields.get(name.lexeme)
-        
+        slot: typing.Optional[int] = self.shape.slots.get(name.lexeme)
+        if slot is not None:
+            return self.values[slot]
+
         method: typing.Optional[LoxFunction] = self.klass.find_method(name.lexeme)
         if method:
             return method.bind(self)
-        
+
         raise LoxRuntimeError(name, f"Undefined property '{name.lexeme}'.")
-    
+
     def set(self, name: Token, value: typing.Any):
-        self.fields[name.lexeme] = value
\ No newline at end of file
+        slot: typing.Optional[int] = self.shape.slots.get(name.lexeme)
+        if slot is not None:
+            self.values[slot] = value
+            return
+        self.shape = self.shape.add_field(name.lexeme)
+        self.values.append(value)
+
+    def set_field(self, name: str, value: typing.Any) -> None:
+        slot: typing.Optional[int] = self.shape.slots.get(name)
+        if slot is not None:
+            self.values[slot] = value
+            return
+        self.shape = self.shape.add_field(name)
+        self.values.append(value)
@@ -0,0 +1,25 @@
+from typing import Optional
+
+
+class LoxOptions:
+    SCANNERS = ('loop', 'regex')
+    TOKEN_MODES = ('stream', 'compact')
+    PARSERS = ('recursive', 'pratt')
+    ENGINES = ('tree', 'closure', 'vm', 'transpile')
+
+    def __init__(self, scanner: str = 'loop', tokens: str = 'stream', parser: str = 'recursive',
+                 cache: bool = True, optimize: int = 0, engine: str = 'tree',
+                 stats: bool = False, transpile_output: Optional[str] = None, tier: bool = False,
+                 tier_calls: int = 100, tier_loops: int = 1000, stack_size: int = 1024) -> None:
+        self.scanner = scanner
+        self.tokens = tokens
+        self.parser = parser
+        self.cache = cache
+        self.optimize = optimize
+        self.engine = engine
+        self.stats = stats
+        self.transpile_output = transpile_output
+        self.tier = tier
+        self.tier_calls = tier_calls
+        self.tier_loops = tier_loops
+        self.stack_size = stack_size
@@ -0,0 +1,164 @@
+from typing import Dict, List
+
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, ExprVisitor, GetExpr, GroupingExpr, LiteralExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.fused_expr import CompareLocalExpr, FieldUpdateExpr, IncrementLocalExpr
+from interpreter.lox_token_type import TokenType
+from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt, Stmt, StmtVisitor, VarStmt, WhileStmt
+
+
+class NodeFuser(ExprVisitor, StmtVisitor):
+    """
+    Superinstruction pass for the tree-walking Interpreter, run on resolved
+    statements. It replaces the node patterns that dominate loops with fused
+    nodes the Interpreter executes in one visit:
+
+    - `i = i + 1` on a local becomes an IncrementLocalExpr
+    - `i < n` between a local and a local or literal becomes a CompareLocalExpr
+    - `obj.field = obj.field + x` becomes a FieldUpdateExpr
+
+    Fused nodes keep the fields of the node they replace and fall back to it
+    whenever the operands are not plain numbers, so semantics and error
+    messages are unchanged.
+    """
+    def __init__(self) -> None:
+        self.fused: Dict[str, int] = {
+            IncrementLocalExpr.__name__: 0,
+            CompareLocalExpr.__name__: 0,
+            FieldUpdateExpr.__name__: 0,
+        }
+
+    def fuse(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def report(self) -> str:
+        total = sum(self.fused.values())
+        return f"fused {total} nodes: " + ', '.join(f"{count} {name}" for name, count in self.fused.items())
+
+    def fuse_expr(self, expr: Expr) -> Expr:
+        if isinstance(expr, Stmt):
+            # Function expressions are FunctionStmt nodes.
+            expr.accept(self)
+            return expr
+        return expr.accept(self)
+
+    def count(self, expr: Expr) -> Expr:
+        self.fused[type(expr).__name__] += 1
+        return expr
+
+    @staticmethod
+    def is_local(expr: Expr) -> bool:
+        return type(expr) is VarExpr and expr.depth is not None
+
+    @staticmethod
+    def same_variable(a: Expr, b: Expr) -> bool:
+        if type(a) is ThisExpr and type(b) is ThisExpr:
+            return True
+        return type(a) is VarExpr and type(b) is VarExpr and a.name.lexeme == b.name.lexeme \
+            and a.depth == b.depth and a.idx == b.idx
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self.fuse(stmt.statements)
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        for method in stmt.methods:
+            self.fuse(method.body)
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        stmt.expression = self.fuse_expr(stmt.expression)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        self.fuse(stmt.body)
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        stmt.condition = self.fuse_expr(stmt.condition)
+        stmt.thenBranch.accept(self)
+        if stmt.elsebranch:
+            stmt.elsebranch.accept(self)
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        stmt.expression = self.fuse_expr(stmt.expression)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        if stmt.value is not None:
+            stmt.value = self.fuse_expr(stmt.value)
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        if stmt.initializer is not None:
+            stmt.initializer = self.fuse_expr(stmt.initializer)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        stmt.condition = self.fuse_expr(stmt.condition)
+        stmt.body.accept(self)
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        return None
+
+    def visit_ternary_expr(self, expr: TernaryExpr):
+        expr.condition = self.fuse_expr(expr.condition)
+        expr.then_branch = self.fuse_expr(expr.then_branch)
+        expr.else_branch = self.fuse_expr(expr.else_branch)
+        return expr
+
+    def visit_assign_expr(self, expr: AssignExpr):
+        value = expr.value
+        if expr.depth is not None and type(value) is BinaryExpr \
+                and value.operator.token_type in (TokenType.PLUS, TokenType.MINUS) \
+                and type(value.left) is VarExpr and value.left.depth == expr.depth and value.left.idx == expr.idx \
+                and type(value.right) is LiteralExpr and type(value.right.value) is float:
+            amount: float = value.right.value
+            return self.count(IncrementLocalExpr(expr, amount if value.operator.token_type == TokenType.PLUS else -amount))
+        expr.value = self.fuse_expr(value)
+        return expr
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        if expr.operator.token_type in CompareLocalExpr.COMPARISONS and self.is_local(expr.left) \
+                and (self.is_local(expr.right) or type(expr.right) is LiteralExpr):
+            return self.count(CompareLocalExpr(expr, expr.left, expr.right))
+        expr.left = self.fuse_expr(expr.left)
+        expr.right = self.fuse_expr(expr.right)
+        return expr
+
+    def visit_call_expr(self, expr: CallExpr):
+        expr.callee = self.fuse_expr(expr.callee)
+        expr.arguments = [self.fuse_expr(argument) for argument in expr.arguments]
+        return expr
+
+    def visit_get_expr(self, expr: GetExpr):
+        expr.obj = self.fuse_expr(expr.obj)
+        return expr
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        expr.expression = self.fuse_expr(expr.expression)
+        return expr
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        return expr
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        expr.left = self.fuse_expr(expr.left)
+        expr.right = self.fuse_expr(expr.right)
+        return expr
+
+    def visit_set_expr(self, expr: SetExpr):
+        value = expr.value
+        if type(value) is BinaryExpr and type(value.left) is GetExpr \
+                and value.left.name.lexeme == expr.name.lexeme and self.same_variable(expr.obj, value.left.obj):
+            fused = FieldUpdateExpr(expr, value.operator, self.fuse_expr(value.right))
+            return self.count(fused)
+        expr.obj = self.fuse_expr(expr.obj)
+        expr.value = self.fuse_expr(value)
+        return expr
+
+    def visit_super_expr(self, expr: SuperExpr):
+        return expr
+
+    def visit_this_expr(self, expr: ThisExpr):
+        return expr
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        expr.right = self.fuse_expr(expr.right)
+        return expr
+
+    def visit_var_expr(self, expr: VarExpr):
+        return expr
@@ -0,0 +1,67 @@
+class OpCode:
+    """
+    Instructions of the bytecode VM. Operands follow the opcode in the code
+    list as plain ints: constant pool indices, local slots, upvalue indices,
+    argument counts and jump offsets.
+    """
+    CONSTANT = 0            # constant index
+    NIL = 1
+    TRUE = 2
+    FALSE = 3
+    POP = 4
+    DUP = 5
+    GET_LOCAL = 6           # slot
+    SET_LOCAL = 7           # slot
+    GET_GLOBAL = 8          # name constant
+    DEFINE_GLOBAL = 9       # name constant
+    SET_GLOBAL = 10         # name constant
+    GET_UPVALUE = 11        # upvalue index
+    SET_UPVALUE = 12        # upvalue index
+    GET_PROPERTY = 13       # name constant
+    SET_PROPERTY = 14       # name constant
+    CHECK_INSTANCE = 15
+    GET_SUPER = 16          # name constant
+    CHECK_INITIALIZED = 17
+    EQUAL = 18
+    NOT_EQUAL = 19
+    GREATER = 20
+    GREATER_EQUAL = 21
+    LESS = 22
+    LESS_EQUAL = 23
+    ADD = 24
+    SUBTRACT = 25
+    MULTIPLY = 26
+    DIVIDE = 27
+    NOT = 28
+    NEGATE = 29
+    PRINT = 30
+    ECHO = 31
+    JUMP = 32               # forward offset
+    JUMP_IF_FALSE = 33      # forward offset
+    JUMP_IF_TRUE = 34       # forward offset
+    POP_JUMP_IF_FALSE = 35  # forward offset
+    LOOP = 36               # backward offset
+    CALL = 37               # argument count
+    CLOSURE = 38            # function constant, then (is_local, index) per upvalue
+    CLOSE_UPVALUE = 39
+    RETURN = 40
+    CLASS = 41              # name constant
+    INHERIT = 42
+    METHOD = 43             # name constant
+    BREAK = 44              # a break outside any loop of its function
+    TAIL_CALL = 45          # argument count; a CALL whose result the function returns
+
+    # Number of operands following each opcode, apart from CLOSURE's upvalue pairs.
+    OPERANDS = {
+        CONSTANT: 1, GET_LOCAL: 1, SET_LOCAL: 1, GET_GLOBAL: 1, DEFINE_GLOBAL: 1, SET_GLOBAL: 1,
+        GET_UPVALUE: 1, SET_UPVALUE: 1, GET_PROPERTY: 1, SET_PROPERTY: 1, GET_SUPER: 1,
+        JUMP: 1, JUMP_IF_FALSE: 1, JUMP_IF_TRUE: 1, POP_JUMP_IF_FALSE: 1, LOOP: 1, CALL: 1,
+        CLOSURE: 1, CLASS: 1, METHOD: 1, TAIL_CALL: 1,
+    }
+
+    @staticmethod
+    def name(op: int) -> str:
+        for name, value in vars(OpCode).items():
+            if value == op and name.isupper() and name != 'OPERANDS':
+                return name
+        return f'UNKNOWN_{op}'
@@ -1,4 +1,4 @@
-from typing import List, Optional
+from typing import Iterable, List, Optional
 import typing
 
 from interpreter.expr import Expr, BinaryExpr, SetExpr, ThisExpr, UnaryExpr, LiteralExpr, GroupingExpr, TernaryExpr, VarExpr, AssignExpr, LogicalExpr, CallExpr, GetExpr, SuperExpr
@@ -7,13 +7,13 @@ from interpreter.parse_error import ParseError
 from interpreter.lox_token import Token
 from interpreter.lox_token_type import TokenType
 from interpreter.stmt import BlockStmt, Stmt, PrintStmt, ExpressionStmt, VarStmt, IfStmt, WhileStmt, BreakStmt, FunctionStmt, ReturnStmt, ClassStmt
+from interpreter.token_stream import TokenStream
 
 
 class Parser:
-    def __init__(self, error_handler: LoxErrorHandler, tokens: List[Token]):
+    def __init__(self, error_handler: LoxErrorHandler, tokens: Iterable[Token] | TokenStream):
         self.error_handler = error_handler
-        self.tokens = tokens
-        self.current = 0
+        self.tokens = tokens if isinstance(tokens, TokenStream) else TokenStream(tokens)
 
     def parse(self) -> List[Stmt]:
         statements: List[Stmt] = list()
@@ -267,8 +267,10 @@ class Parser:
         return self.call()
     
     def call(self):
-        expr: Optional[Expr] = self.primary()
+        return self.postfix(self.primary())
 
+    def postfix(self, expr: Optional[Expr]) -> Optional[Expr]:
+        """Parses the calls and property accesses that follow expr."""
         while True:
             if self.match(TokenType.LEFT_PAREN):
                 expr = self.finishCall(expr)
@@ -330,14 +332,14 @@ class Parser:
             expr: Expr = self.expression()
             self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return GroupingExpr(expr)
-        if self.peek().token_type == TokenType.FUN:
+        if self.tokens.peek_type() == TokenType.FUN:
             return self.declaration()
         raise self.error(self.peek(), "Expect expression.")
 
     def match(self, *token_types) -> bool:
         for token_type in token_types:
             if self.check(token_type):
-                self.advance()
+                self.tokens.advance()
                 return True
         return False
 
@@ -349,21 +351,21 @@ class Parser:
     def check(self, token_type) -> bool:
         if self.is_at_end():
             return False
-        return self.peek().token_type == token_type
+        return self.tokens.peek_type() == token_type
 
     def advance(self):
         if not self.is_at_end():
-            self.current += 1
+            self.tokens.advance()
         return self.previous()
 
     def is_at_end(self) -> bool:
-        return self.peek().token_type == TokenType.EOF
+        return self.tokens.peek_type() == TokenType.EOF
 
     def peek(self) -> Token:
-        return self.tokens[self.current]
+        return self.tokens.peek()
 
     def previous(self):
-        return self.tokens[self.current - 1]
+        return self.tokens.previous()
 
     def parse_binary_expr(self, higher_precedence, token_types) -> Expr:
         expr: Expr = higher_precedence()
@@ -383,7 +385,7 @@ class Parser:
         while not self.is_at_end():
             if self.previous().token_type == TokenType.SEMICOLON:
                 return
-            match self.peek().token_type:
+            match self.tokens.peek_type():
                 case TokenType.CLASS:
                     return
                 case TokenType.FUN:
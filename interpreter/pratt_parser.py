@@ -0,0 +1,147 @@
+import typing
+from typing import Iterable
+
+from interpreter.expr import AssignExpr, BinaryExpr, Expr, GetExpr, GroupingExpr, LogicalExpr, SetExpr, UnaryExpr, VarExpr
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.parser import Parser
+from interpreter.token_stream import TokenStream
+
+
+class Precedence:
+    NONE = 0
+    ASSIGNMENT = 1
+    OR = 2
+    AND = 3
+    EQUALITY = 4
+    COMPARISON = 5
+    TERM = 6
+    FACTOR = 7
+
+
+class Pending:
+    """What an entry on parse_precedence's stack is waiting for."""
+    PREFIX = 0      # the operand of a unary operator
+    GROUP = 1       # the expression inside parentheses
+    INFIX = 2       # the right operand of a binary or logical operator
+    ASSIGN = 3      # the value of an assignment
+
+
+class PrattParser(Parser):
+    """
+    Parser whose expressions are parsed by precedence climbing over a
+    binding-power table instead of one method per precedence level. It builds
+    exactly the same Expr trees as Parser, but operators, prefix operators and
+    parentheses go on an explicit stack rather than the Python one, so
+    nesting them costs no frames at all; only call arguments and function
+    expressions still recurse.
+    """
+    INFIX_PRECEDENCE: dict[TokenType, int] = {
+        TokenType.EQUAL: Precedence.ASSIGNMENT,
+        TokenType.OR: Precedence.OR,
+        TokenType.AND: Precedence.AND,
+        TokenType.BANG_EQUAL: Precedence.EQUALITY,
+        TokenType.EQUAL_EQUAL: Precedence.EQUALITY,
+        TokenType.GREATER: Precedence.COMPARISON,
+        TokenType.GREATER_EQUAL: Precedence.COMPARISON,
+        TokenType.LESS: Precedence.COMPARISON,
+        TokenType.LESS_EQUAL: Precedence.COMPARISON,
+        TokenType.MINUS: Precedence.TERM,
+        TokenType.PLUS: Precedence.TERM,
+        TokenType.SLASH: Precedence.FACTOR,
+        TokenType.STAR: Precedence.FACTOR,
+    }
+
+    def __init__(self, error_handler: LoxErrorHandler, tokens: Iterable[Token] | TokenStream):
+        super().__init__(error_handler, tokens)
+
+    def expression(self):
+        return self.parse_precedence(Precedence.ASSIGNMENT)
+
+    def parse_precedence(self, precedence: int) -> Expr:
+        """
+        Parses an expression containing only operators that bind at least as
+        tightly as precedence.
+        """
+        infix_precedence = self.INFIX_PRECEDENCE
+        tokens = self.tokens
+        # Entries are (kind, operator or left operand, operator, the
+        # precedence to restore once the entry is complete).
+        stack: list[tuple[int, typing.Any, typing.Any, int]] = []
+        while True:
+            # Prefix operators and opening parentheses before an operand.
+            while True:
+                token_type = tokens.peek_type()
+                if token_type == TokenType.MINUS or token_type == TokenType.BANG:
+                    tokens.advance()
+                    stack.append((Pending.PREFIX, tokens.previous(), None, precedence))
+                elif token_type == TokenType.LEFT_PAREN:
+                    tokens.advance()
+                    stack.append((Pending.GROUP, None, None, precedence))
+                    precedence = Precedence.ASSIGNMENT
+                else:
+                    break
+            expr: Expr = self.call()
+
+            # Complete entries until an operator binds tightly enough to
+            # start a new operand.
+            while True:
+                if stack and stack[-1][0] == Pending.PREFIX:
+                    _, operator, _, precedence = stack.pop()
+                    expr = UnaryExpr(operator, expr)
+                    continue
+                token_type = tokens.peek_type()
+                operator_precedence = infix_precedence.get(token_type, Precedence.NONE)
+                if operator_precedence >= precedence and operator_precedence != Precedence.NONE:
+                    tokens.advance()
+                    if token_type == TokenType.EQUAL:
+                        # Right associative, and the target must already be a place.
+                        stack.append((Pending.ASSIGN, expr, tokens.previous(), precedence))
+                        precedence = Precedence.ASSIGNMENT
+                    else:
+                        stack.append((Pending.INFIX, expr, tokens.previous(), precedence))
+                        precedence = operator_precedence + 1
+                    break
+                if not stack:
+                    return expr
+                kind, left, operator, precedence = stack.pop()
+                if kind == Pending.INFIX:
+                    if operator.token_type == TokenType.OR or operator.token_type == TokenType.AND:
+                        expr = LogicalExpr(left, operator, expr)
+                    else:
+                        expr = BinaryExpr(left, operator, expr)
+                elif kind == Pending.ASSIGN:
+                    if isinstance(left, VarExpr):
+                        expr = AssignExpr(left.name, expr)
+                    elif isinstance(left, GetExpr):
+                        expr = SetExpr(left.obj, left.name, expr)
+                    else:
+                        self.error(operator, 'Invalid assignment target.')
+                        expr = left
+                else:
+                    self.consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
+                    expr = self.postfix(GroupingExpr(expr))
+
+    # primary() recovers from a missing left operand by parsing the rest of the
+    # expression at these levels, so they map onto the table as well.
+    def assignment(self) -> Expr:
+        return self.parse_precedence(Precedence.ASSIGNMENT)
+
+    def logical_or(self):
+        return self.parse_precedence(Precedence.OR)
+
+    def logical_and(self):
+        return self.parse_precedence(Precedence.AND)
+
+    def equality(self):
+        return self.parse_precedence(Precedence.EQUALITY)
+
+    def comparison(self):
+        return self.parse_precedence(Precedence.COMPARISON)
+
+    def term(self):
+        return self.parse_precedence(Precedence.TERM)
+
+    def factor(self):
+        return self.parse_precedence(Precedence.FACTOR)
@@ -0,0 +1,105 @@
+import operator
+from typing import Any, Callable
+
+from interpreter.expr import BinaryExpr, IExprVisitor, UnaryExpr
+
+
+class FloatBinaryExpr(BinaryExpr):
+    """
+    A BinaryExpr that saw two numbers the first time it ran. Its subclasses
+    apply `operation` to the operands while both are still floats, and
+    deoptimize to a GenericBinaryExpr on the first operands that aren't.
+
+    Quickened nodes add no slots to the node they specialize, so the
+    Interpreter quickens and deoptimizes a node by swapping its class.
+    """
+    __slots__ = ()
+    operation: Callable[[float, float], Any] = operator.add
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_float_binary_expr(self)
+
+
+class FloatAddExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.add
+
+
+class FloatSubtractExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.sub
+
+
+class FloatMultiplyExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.mul
+
+
+class FloatDivideExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.truediv
+
+
+class FloatGreaterExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.gt
+
+
+class FloatGreaterEqualExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.ge
+
+
+class FloatLessExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.lt
+
+
+class FloatLessEqualExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.le
+
+
+class FloatEqualExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.eq
+
+
+class FloatNotEqualExpr(FloatBinaryExpr):
+    __slots__ = ()
+    operation = operator.ne
+
+
+class StringAddExpr(BinaryExpr):
+    """A `+` that saw two strings: concatenates while both still are."""
+    __slots__ = ()
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_string_add_expr(self)
+
+
+class GenericBinaryExpr(BinaryExpr):
+    """
+    A BinaryExpr whose operands had no specialization, or that deoptimized:
+    it takes the generic path from then on and is never quickened again.
+    """
+    __slots__ = ()
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_generic_binary_expr(self)
+
+
+class FloatNegateExpr(UnaryExpr):
+    """A unary `-` that saw a number: negates while the operand still is one."""
+    __slots__ = ()
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_float_negate_expr(self)
+
+
+class GenericUnaryExpr(UnaryExpr):
+    """A UnaryExpr that takes the generic path for good."""
+    __slots__ = ()
+
+    def accept(self, visitor: IExprVisitor):
+        return visitor.visit_generic_unary_expr(self)
@@ -0,0 +1,71 @@
+from typing import Dict, Optional, Type
+
+from interpreter.expr import BinaryExpr, UnaryExpr
+from interpreter.lox_token_type import TokenType
+from interpreter.quickened_expr import FloatAddExpr, FloatDivideExpr, FloatEqualExpr, FloatGreaterEqualExpr, \
+    FloatGreaterExpr, FloatLessEqualExpr, FloatLessExpr, FloatMultiplyExpr, FloatNegateExpr, FloatNotEqualExpr, \
+    FloatSubtractExpr, GenericBinaryExpr, GenericUnaryExpr, StringAddExpr
+
+
+class Quickening:
+    """
+    Type specialization of the tree-walker's BinaryExpr and UnaryExpr nodes.
+    The first time a node runs, the Interpreter hands it the operands it
+    saw, and the node is rewritten in place to the quickened node for
+    those types, or to the generic one when there is none. A quickened
+    node deoptimizes to the generic node on its first type miss, so a node
+    changes class at most twice. Counts are kept by quickened class.
+    """
+    FLOAT_BINARY: Dict[TokenType, Type[BinaryExpr]] = {
+        TokenType.PLUS: FloatAddExpr,
+        TokenType.MINUS: FloatSubtractExpr,
+        TokenType.STAR: FloatMultiplyExpr,
+        TokenType.SLASH: FloatDivideExpr,
+        TokenType.GREATER: FloatGreaterExpr,
+        TokenType.GREATER_EQUAL: FloatGreaterEqualExpr,
+        TokenType.LESS: FloatLessExpr,
+        TokenType.LESS_EQUAL: FloatLessEqualExpr,
+        TokenType.EQUAL_EQUAL: FloatEqualExpr,
+        TokenType.BANG_EQUAL: FloatNotEqualExpr,
+    }
+
+    def __init__(self) -> None:
+        self.quickened: Dict[str, int] = dict()
+        self.deoptimized: Dict[str, int] = dict()
+
+    def quicken_binary(self, expr: BinaryExpr, left: object, right: object) -> None:
+        specialized: Optional[Type[BinaryExpr]] = None
+        if type(left) is float and type(right) is float:
+            specialized = Quickening.FLOAT_BINARY.get(expr.operator.token_type)
+        elif type(left) is str and type(right) is str and expr.operator.token_type == TokenType.PLUS:
+            specialized = StringAddExpr
+        self.rewrite(expr, specialized or GenericBinaryExpr)
+
+    def quicken_unary(self, expr: UnaryExpr, right: object) -> None:
+        if type(right) is float and expr.operator.token_type == TokenType.MINUS:
+            self.rewrite(expr, FloatNegateExpr)
+        else:
+            self.rewrite(expr, GenericUnaryExpr)
+
+    def rewrite(self, expr: BinaryExpr | UnaryExpr, specialized: type) -> None:
+        if type(expr) is not BinaryExpr and type(expr) is not UnaryExpr:
+            # A recursive call in its operands got to run it first.
+            return
+        expr.__class__ = specialized
+        self.quickened[specialized.__name__] = self.quickened.get(specialized.__name__, 0) + 1
+
+    def deoptimize(self, expr: BinaryExpr | UnaryExpr, generic: type) -> None:
+        name = type(expr).__name__
+        if type(expr) is generic:
+            return
+        self.deoptimized[name] = self.deoptimized.get(name, 0) + 1
+        expr.__class__ = generic
+
+    def report(self) -> str:
+        specialized = {name: count for name, count in self.quickened.items() if not name.startswith('Generic')}
+        generic = sum(count for name, count in self.quickened.items() if name.startswith('Generic'))
+        lines = [f"quickened {sum(specialized.values())} nodes, {generic} left generic, "
+                 f"{sum(self.deoptimized.values())} deoptimized"]
+        lines.extend(f"  {name}: {count} quickened, {self.deoptimized.get(name, 0)} deoptimized"
+                     for name, count in sorted(specialized.items()))
+        return '\n'.join(lines)
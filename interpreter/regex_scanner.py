@@ -0,0 +1,196 @@
+import re
+from sys import intern
+from typing import Iterator, List
+
+from interpreter.compact_tokens import CompactTokens
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.scanner import Scanner
+
+
+class RegexScanner(Scanner):
+    """
+    Scanner driven by a single compiled master pattern. Each match consumes
+    a whole lexeme, so the per-character Python work of Scanner.scan_token is
+    replaced by one C-level match per token.
+    """
+    TOKEN_PATTERN = re.compile(r'''
+          (?P<space>[ \r\t\n]+)
+        | (?P<identifier>[A-Za-z_][A-Za-z0-9_]*)
+        | (?P<number>[0-9]+(?:\.[0-9]+)?)
+        | (?P<operator>!=|==|<=|>=|[?:(){},.\-+;*!=<>])
+        | (?P<line_comment>//[^\n]*)
+        | (?P<block_comment>/\*)
+        | (?P<slash>/)
+        | (?P<string>"[^"]*"?)
+        | (?P<error>.)
+    ''', re.VERBOSE | re.DOTALL)
+
+    # Nested comments only need to know about openers, closers and newlines.
+    COMMENT_PATTERN = re.compile(r'/\*|\*/|\n')
+
+    OPERATORS = {
+        "?": TokenType.QUESTION_MARK,
+        ":": TokenType.COLON,
+        "(": TokenType.LEFT_PAREN,
+        ")": TokenType.RIGHT_PAREN,
+        "{": TokenType.LEFT_BRACE,
+        "}": TokenType.RIGHT_BRACE,
+        ",": TokenType.COMMA,
+        ".": TokenType.DOT,
+        "-": TokenType.MINUS,
+        "+": TokenType.PLUS,
+        ";": TokenType.SEMICOLON,
+        "*": TokenType.STAR,
+        "!": TokenType.BANG,
+        "!=": TokenType.BANG_EQUAL,
+        "=": TokenType.EQUAL,
+        "==": TokenType.EQUAL_EQUAL,
+        "<": TokenType.LESS,
+        "<=": TokenType.LESS_EQUAL,
+        ">": TokenType.GREATER,
+        ">=": TokenType.GREATER_EQUAL,
+    }
+
+    def __init__(self, error_handler: LoxErrorHandler, source_code: str) -> None:
+        super().__init__(error_handler, source_code)
+
+    def scan_tokens(self) -> List[Token]:
+        self.tokens.extend(self.iter_tokens())
+        return self.tokens
+
+    def iter_tokens(self) -> Iterator[Token]:
+        source_code = self.source_code
+        length = len(source_code)
+        find_tokens = self.TOKEN_PATTERN.finditer
+        operators = self.OPERATORS
+        keywords = self.KEYWORDS
+        line = self.line
+        pos = 0
+
+        while pos < length:
+            # The pattern matches every character, so consecutive matches tile
+            # the source. Only nested comments need to restart the search.
+            for match in find_tokens(source_code, pos):
+                kind = match.lastgroup
+                if kind == 'space':
+                    line += match.group().count('\n')
+                elif kind == 'identifier':
+                    text = match.group()
+                    token_type = keywords.get(text)
+                    if token_type is None:
+                        yield Token(TokenType.IDENTIFIER, intern(text), None, line)
+                    else:
+                        yield Token(token_type, text, None, line)
+                elif kind == 'operator':
+                    text = match.group()
+                    yield Token(operators[text], text, None, line)
+                elif kind == 'number':
+                    text = match.group()
+                    yield Token(TokenType.NUMBER, text, float(text), line)
+                elif kind == 'string':
+                    text = match.group()
+                    line += text.count('\n')
+                    if len(text) < 2 or text[-1] != '"':
+                        self.error_handler.error_on_line(line, "Unterminated String")
+                    else:
+                        yield Token(TokenType.STRING, text, intern(text[1:-1]), line)
+                elif kind == 'line_comment':
+                    pass
+                elif kind == 'slash':
+                    yield Token(TokenType.SLASH, '/', None, line)
+                elif kind == 'block_comment':
+                    pos, line = self.block_comment(match.end(), line)
+                    break
+                else:
+                    self.error_handler.error_on_line(line, "Unexpected character.")
+            else:
+                pos = length
+
+        self.start = self.current = pos
+        self.line = line
+        yield Token(TokenType.EOF, "", None, line)
+
+    def scan_compact(self) -> CompactTokens:
+        compact = CompactTokens(self.source_code)
+        source_code = self.source_code
+        length = len(source_code)
+        find_tokens = self.TOKEN_PATTERN.finditer
+        operator_ids = {text: compact.TOKEN_IDS[token_type] for text, token_type in self.OPERATORS.items()}
+        keyword_ids = {text: compact.TOKEN_IDS[token_type] for text, token_type in self.KEYWORDS.items()}
+        identifier_id = compact.TOKEN_IDS[TokenType.IDENTIFIER]
+        number_id = compact.TOKEN_IDS[TokenType.NUMBER]
+        string_id = compact.TOKEN_IDS[TokenType.STRING]
+        slash_id = compact.TOKEN_IDS[TokenType.SLASH]
+        add_type = compact.types.append
+        add_start = compact.starts.append
+        add_end = compact.ends.append
+        add_line = compact.lines.append
+        line = self.line
+        pos = 0
+
+        while pos < length:
+            for match in find_tokens(source_code, pos):
+                kind = match.lastgroup
+                if kind == 'space':
+                    line += match.group().count('\n')
+                    continue
+                if kind == 'identifier':
+                    add_type(keyword_ids.get(match.group(), identifier_id))
+                elif kind == 'operator':
+                    add_type(operator_ids[match.group()])
+                elif kind == 'number':
+                    add_type(number_id)
+                elif kind == 'string':
+                    text = match.group()
+                    line += text.count('\n')
+                    if len(text) < 2 or text[-1] != '"':
+                        self.error_handler.error_on_line(line, "Unterminated String")
+                        continue
+                    add_type(string_id)
+                elif kind == 'slash':
+                    add_type(slash_id)
+                elif kind == 'line_comment':
+                    continue
+                elif kind == 'block_comment':
+                    pos, line = self.block_comment(match.end(), line)
+                    break
+                else:
+                    self.error_handler.error_on_line(line, "Unexpected character.")
+                    continue
+                start, end = match.span()
+                add_start(start)
+                add_end(end)
+                add_line(line)
+            else:
+                pos = length
+
+        self.start = self.current = pos
+        self.line = line
+        compact.append(TokenType.EOF, pos, pos, line)
+        return compact
+
+    def block_comment(self, pos: int, line: int):
+        """
+        Skips a (possibly nested) multiline comment whose opener ends at pos
+        :return: the position after the comment and the updated line
+        """
+        count = 1
+        search = self.COMMENT_PATTERN.search
+        while count:
+            match = search(self.source_code, pos)
+            if match is None:
+                pos = len(self.source_code)
+                break
+            pos = match.end()
+            marker = match.group()
+            if marker == '\n':
+                line += 1
+            elif marker == '/*':
+                count += 1
+            else:
+                count -= 1
+        if count:
+            self.error_handler.error_on_line(line, 'Multiline comment not closed.')
+        return pos, line
@@ -10,18 +10,43 @@ from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, Fu
 
 
 class ScopeValue:
-    def __init__(self, resolved: bool = False, used: bool = False, token: Optional[Token] = None, idx: int = -1) -> None:
+    def __init__(self, resolved: bool = False, used: bool = False, token: Optional[Token] = None, idx: int = -1,
+                 declaration: Optional[VarStmt | FunctionStmt | ClassStmt] = None) -> None:
         self.resolved = resolved
         self.used = used
         self.token = token
         self.idx = idx
+        self.declaration = declaration
+
+class Scope(dict[str, ScopeValue]):
+    """
+    The variables of one scope, by name. Functions and classes always get a
+    frame at run time. A block only gets one when a function or class
+    nested in it captures one of its variables, or when it is outermost and
+    has variables to hold; otherwise its variables get slots in the
+    enclosing frame, and blocks that are never live at the same time share
+    them. Which frame that is, and so the slots and how many frames a
+    variable is up from a use of it, is only known once the scope owning
+    the frame has ended: uses are kept in `references` until then.
+    """
+    def __init__(self, has_frame: bool, enclosing: Optional['Scope']) -> None:
+        super().__init__()
+        self.always_has_frame = has_frame
+        self.enclosing = enclosing
+        self.inner: List[Scope] = list()
+        self.captured = False
+        self.owns_frame = has_frame
+        self.references: List[Tuple[VarExpr | AssignExpr | ThisExpr | SuperExpr, List[Scope], ScopeValue]] = list()
+        if enclosing is not None:
+            enclosing.inner.append(self)
 
 class Resolver(ExprVisitor, StmtVisitor):
     def __init__(self, interpretor: Interpreter):
         self.interpretor: Interpreter = interpretor
-        self.scopes: deque[dict[str, ScopeValue]] = deque()
+        self.scopes: deque[Scope] = deque()
         self.current_function = FunctionType.NONE
         self.current_class = ClassType.NONE
+        self.loop_depth = 0
 
     def resolve(self, statements: List[Stmt] | Stmt | Expr | None):
         if isinstance(statements, List) and all(isinstance(statement, Stmt) for statement in statements):
@@ -32,16 +57,54 @@ class Resolver(ExprVisitor, StmtVisitor):
         if isinstance(statements, Expr):
             statements.accept(self)
 
-    def begin_scope(self):
-        self.scopes.append(dict())
+    def begin_scope(self, has_frame: bool = False):
+        self.scopes.append(Scope(has_frame, self.scopes[-1] if self.scopes else None))
 
-    def end_scope(self):
-        for k, v in self.scopes[-1].items():
+    def end_scope(self) -> List[str]:
+        """
+        Ends the innermost scope and returns the names of the slots of its
+        frame, in order, or no names when it has no frame of its own.
+        """
+        scope = self.scopes.pop()
+        for k, v in scope.items():
             if not v.used and v.token:
                 self.interpretor.error_handler.error_on_token(v.token, f"The variable {k} is not used.")
-        self.scopes.pop()
-
-    def declare(self, name: Token):
+        if not (scope.always_has_frame or scope.captured or scope.enclosing is None):
+            # Its variables go in the frame of an enclosing scope, once that has ended.
+            return []
+        names: List[str] = list()
+        self.allocate(scope, 0, names)
+        scope.owns_frame = scope.always_has_frame or len(names) > 0
+        self.resolve_references(scope)
+        return names
+
+    def allocate(self, scope: Scope, base: int, names: List[str]) -> None:
+        """
+        Gives the variables of scope slots from base on, then those of the
+        blocks in it without a frame of their own the slots after them, so
+        blocks side by side share slots. A slot is named after the first
+        variable given it.
+        """
+        for idx, (name, value) in enumerate(scope.items(), base):
+            value.idx = idx
+            if value.declaration is not None:
+                value.declaration.slot = idx
+            if idx == len(names):
+                names.append(name)
+        for inner in scope.inner:
+            if not inner.owns_frame:
+                self.allocate(inner, base + len(scope), names)
+
+    def resolve_references(self, scope: Scope) -> None:
+        for expr, crossed, value in scope.references:
+            depth = sum(1 for inner in crossed if inner.owns_frame)
+            self.interpretor.resolve(expr, depth, value.idx)
+        for inner in scope.inner:
+            if not inner.owns_frame:
+                self.resolve_references(inner)
+
+    def declare(self, name: Token, declaration: Optional[VarStmt | FunctionStmt | ClassStmt] = None) -> None:
+        """Declares name in the innermost scope; its slot is given when its frame is laid out."""
         if len(self.scopes) == 0:
             return None
         
@@ -49,7 +112,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         if name.lexeme in scope:
             self.interpretor.error_handler.error_on_token(name, "Already a variable with this name in this scope.")
         
-        scope[name.lexeme] = ScopeValue(False, False, name, len(scope) + 1)
+        scope[name.lexeme] = ScopeValue(False, False, name, declaration=declaration)
 
     def define(self, name: Token):
         if len(self.scopes) == 0:
@@ -58,29 +121,40 @@ class Resolver(ExprVisitor, StmtVisitor):
         scopeValue.resolved = True
         self.scopes[-1][name.lexeme] = scopeValue
 
-    def resolve_local(self, expr: Expr, name: Token):
+    def resolve_local(self, expr: VarExpr | AssignExpr | ThisExpr | SuperExpr, name: Token):
         for i, scope in enumerate(reversed(self.scopes)):
             if name.lexeme in scope:
                 scope[name.lexeme].used = True
-                self.interpretor.resolve(expr, i, scope[name.lexeme].idx)
+                crossed = [self.scopes[-1 - j] for j in range(i)]
+                if any(inner.always_has_frame for inner in crossed):
+                    # A function or class in the scope captures it.
+                    scope.captured = True
+                scope.references.append((expr, crossed, scope[name.lexeme]))
                 return None
+        self.interpretor.resolve_global(expr, name)
 
     def resolve_function(self, func: FunctionStmt, type: FunctionType):
         enclosing_function: FunctionType = self.current_function
+        enclosing_loop_depth = self.loop_depth
         self.current_function = type
-        self.begin_scope()
+        self.loop_depth = 0
+        self.begin_scope(has_frame=True)
+        if type in (FunctionType.METHOD, FunctionType.INITIALIZER):
+            # A method's receiver is the first slot of its own frame.
+            self.scopes[-1]['this'] = ScopeValue(True, False, None, 0)
         for param in func.params:
             self.declare(param)
             self.define(param)
         
         self.resolve(func.body)
-        self.end_scope()
+        func.locals = self.end_scope()
         self.current_function = enclosing_function
+        self.loop_depth = enclosing_loop_depth
 
     def visit_class_stmt(self, stmt: ClassStmt):
         enclosing_class = self.current_class
         self.current_class = ClassType.CLASS
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
         if stmt.superclass and stmt.name.lexeme == stmt.superclass.name.lexeme:
             self.interpretor.error_handler.error_on_token(stmt.superclass.name, "A class can't inherit from itself.")
@@ -89,11 +163,9 @@ class Resolver(ExprVisitor, StmtVisitor):
             self.resolve(stmt.superclass)
 
         if stmt.superclass:
-            self.begin_scope()
+            self.begin_scope(has_frame=True)
             self.scopes[-1]['super'] = ScopeValue(True, False)
 
-        self.begin_scope()
-        self.scopes[-1]['this'] = ScopeValue(True, False)
         for method in stmt.methods:
             declaration: FunctionType = FunctionType.METHOD
             if method.name.lexeme == "init":
@@ -102,7 +174,6 @@ class Resolver(ExprVisitor, StmtVisitor):
   
         if stmt.superclass:
             self.end_scope()
-        self.end_scope()
 
         self.current_class = enclosing_class
         return None
@@ -110,7 +181,8 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_block_stmt(self, stmt: BlockStmt):
         self.begin_scope()
         self.resolve(stmt.statements)
-        self.end_scope()
+        # Empty when the block has no frame of its own: it then runs in the enclosing one.
+        stmt.locals = self.end_scope()
         return None
 
     def visit_expression_stmt(self, stmt: ExpressionStmt):
@@ -118,7 +190,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
 
     def visit_var_stmt(self, stmt: VarStmt):
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         if stmt.initializer is not None:
             self.resolve(stmt.initializer)
         
@@ -126,9 +198,8 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
 
     def visit_var_expr(self, expr: VarExpr):
-        if all([len(self.scopes) != 0, 
-                self.scopes[-1].get(expr.name.lexeme), 
-                typing.cast(ScopeValue, self.scopes[-1].get(expr.name.lexeme)).resolved == False]):
+        if len(self.scopes) != 0 and expr.name.lexeme in self.scopes[-1] \
+                and typing.cast(ScopeValue, self.scopes[-1].get(expr.name.lexeme)).resolved == False:
             self.interpretor.error_handler.error_on_token(expr.name, "Can't read local variable in its own initializer.")
         
         self.resolve_local(expr, expr.name)
@@ -140,7 +211,7 @@ class Resolver(ExprVisitor, StmtVisitor):
         return None
     
     def visit_function_stmt(self, stmt: FunctionStmt):
-        self.declare(stmt.name)
+        self.declare(stmt.name, stmt)
         self.define(stmt.name)
         self.resolve_function(stmt, FunctionType.FUNCTION)
         return None
@@ -163,11 +234,17 @@ class Resolver(ExprVisitor, StmtVisitor):
             if self.current_function == FunctionType.INITIALIZER:
                 self.interpretor.error_handler.error_on_token(stmt.keyword, "Can't return a value from an initializer.")
             self.resolve(stmt.value)
+            # `return f(...)` can replace the returning function's frame with f's,
+            # unless a loop around it would catch a break that escapes f.
+            stmt.tail = (type(stmt.value) is CallExpr and self.loop_depth == 0
+                         and self.current_function != FunctionType.INITIALIZER)
         return None
 
     def visit_while_stmt(self, stmt: WhileStmt):
         self.resolve(stmt.condition)
+        self.loop_depth += 1
         self.resolve(stmt.body)
+        self.loop_depth -= 1
         return None
 
     def visit_ternary_expr(self, expr: TernaryExpr):
@@ -222,7 +299,7 @@ class Resolver(ExprVisitor, StmtVisitor):
     def visit_super_expr(self, expr: SuperExpr):
         if self.current_class == ClassType.NONE:
             self.interpretor.error_handler.error_on_token(expr.keyword, "Can't use 'super' outside of a class.")
-        elif self.current_class == ClassType.SUBCLASS:
+        elif self.current_class != ClassType.SUBCLASS:
             self.interpretor.error_handler.error_on_token(expr.keyword, "Can't use 'super' in a class with no superclass.")
         self.resolve_local(expr, expr.keyword)
         return None
@@ -1,7 +0,0 @@
-from typing import Any
-
-
-class Return(Exception):
-    def __init__(self, value: Any, *args: object) -> None:
-        super().__init__(*args)
-        self.value = value
\ No newline at end of file
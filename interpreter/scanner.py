@@ -1,5 +1,7 @@
-from typing import Any, List, Optional
+from sys import intern
+from typing import Any, Iterator, List, Optional
 
+from interpreter.compact_tokens import CompactTokens
 from interpreter.lox_error_handler import LoxErrorHandler
 from interpreter.lox_token import Token
 from interpreter.lox_token_type import TokenType
@@ -30,6 +32,7 @@ class Scanner:
         self.error_handler = error_handler
         self.source_code: str = source_code
         self.tokens: List[Token] = list()
+        self.compact: Optional[CompactTokens] = None
         self.start = 0
         self.current = 0
         self.line = 1
@@ -41,6 +44,31 @@ class Scanner:
         self.tokens.append(Token(TokenType.EOF, "", None, self.line))
         return self.tokens
 
+    def iter_tokens(self) -> Iterator[Token]:
+        """
+        Lazily scans the source, yielding each token as soon as it is complete
+        :return:
+        """
+        while not self.is_at_end():
+            self.start = self.current
+            self.scan_token()
+            if self.tokens:
+                yield from self.tokens
+                self.tokens.clear()
+        yield Token(TokenType.EOF, "", None, self.line)
+
+    def scan_compact(self) -> CompactTokens:
+        """
+        Scans the whole source into struct-of-arrays storage without creating Token objects
+        :return:
+        """
+        self.compact = CompactTokens(self.source_code)
+        while not self.is_at_end():
+            self.start = self.current
+            self.scan_token()
+        self.compact.append(TokenType.EOF, self.current, self.current, self.line)
+        return self.compact
+
     def scan_token(self) -> None:
         c = self.advance()
         match c:
@@ -126,7 +154,10 @@ class Scanner:
         token_type = self.KEYWORDS.get(text)
         if token_type is None:
             token_type = TokenType.IDENTIFIER
-        self.add_token(token_type)
+            # Interned so that every use of a name is the same str object and
+            # environment, field and method dict lookups hit the identity check.
+            text = intern(text)
+        self.add_token(token_type, lexeme=text)
 
     def number(self) -> None:
         while self.is_digit(self.peek()):
@@ -148,7 +179,7 @@ class Scanner:
             self.error_handler.error_on_line(self.line, "Unterminated String")
             return
         self.advance()
-        value = self.source_code[self.start + 1:self.current - 1]
+        value = intern(self.source_code[self.start + 1:self.current - 1])
         self.add_token(TokenType.STRING, value)
 
     def match(self, expected_char: str) -> bool:
@@ -192,14 +223,18 @@ class Scanner:
         """
         return self.current >= len(self.source_code)
 
-    def add_token(self, token_type: TokenType, literal: Optional[Any] = None) -> None:
+    def add_token(self, token_type: TokenType, literal: Optional[Any] = None, lexeme: Optional[str] = None) -> None:
         """
         Adds token to the tokens list
         :param token_type:
         :param literal:
+        :param lexeme: the token text, when the caller already sliced it
         :return:
         """
-        token_text = self.source_code[self.start: self.current]
+        if self.compact is not None:
+            self.compact.append(token_type, self.start, self.current, self.line)
+            return
+        token_text = lexeme if lexeme is not None else self.source_code[self.start: self.current]
         self.tokens.append(Token(token_type, token_text, literal, self.line))
 
     def advance(self) -> str:
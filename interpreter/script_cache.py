@@ -0,0 +1,98 @@
+import hashlib
+import os
+import pickle
+import struct
+import sys
+from typing import List, Optional
+
+import interpreter
+import interpreter.expr
+import interpreter.stmt
+from interpreter.global_environment import GlobalEnvironment
+from interpreter.stmt import Stmt
+
+
+class ScriptCache:
+    """
+    On-disk cache of a script's front-end output, in the spirit of
+    __pycache__. A .loxc file holds the parsed statements, which carry the
+    resolver's results on their nodes, and is only used when both the source hash and the
+    compiler key match, so any edit to the script simply causes a
+    recompile. The key covers the format version, the Python version the
+    pickle was made by, the package version and the fields of every AST
+    node class, so a forgotten VERSION bump after changing the AST still
+    can't load stale nodes. Since the nodes hold global slots, the file
+    also lists the global names in slot order, and an entry whose names
+    can't get the same slots again is not used either, nor is one whose
+    payload no longer matches the checksum stored with it.
+    """
+    MAGIC = b'LOXC'
+    # Bump whenever the resolver's output changes shape; the AST's fields are in the key already.
+    VERSION = 9
+    HEADER = struct.Struct('<4s32s32s32s')
+    CACHE_DIRECTORY = '__loxcache__'
+    PICKLE_PROTOCOL = 5
+
+    def __init__(self, file_path: str) -> None:
+        directory, file_name = os.path.split(os.path.abspath(file_path))
+        # The full file name, so that foo.lox and foo.txt get entries of their own.
+        self.path = os.path.join(directory, self.CACHE_DIRECTORY, file_name + '.loxc')
+
+    @staticmethod
+    def compiler_key() -> bytes:
+        node_fields = sorted((module.__name__, name, getattr(value, '__slots__', ()))
+                             for module in (interpreter.expr, interpreter.stmt)
+                             for name, value in vars(module).items()
+                             if isinstance(value, type) and value.__module__ == module.__name__)
+        key = (ScriptCache.VERSION, tuple(sys.version_info), sys.implementation.cache_tag, interpreter.__version__,
+               node_fields)
+        return hashlib.sha256(repr(key).encode('utf-8')).digest()
+
+    @staticmethod
+    def source_hash(source_code: str) -> bytes:
+        return hashlib.sha256(source_code.encode('utf-8')).digest()
+
+    def load(self, source_code: str, globals: GlobalEnvironment) -> Optional[List[Stmt]]:
+        """
+        :return: the cached, already resolved statements, or None when there is
+        no usable cache entry for this exact source and these globals
+        """
+        try:
+            with open(self.path, 'rb') as file:
+                magic, key, digest, checksum = self.HEADER.unpack(file.read(self.HEADER.size))
+                if magic != self.MAGIC or key != self.compiler_key() or digest != self.source_hash(source_code):
+                    return None
+                payload = file.read()
+                # A damaged payload can unpickle into nodes that fail only when run.
+                if hashlib.sha256(payload).digest() != checksum:
+                    return None
+                names, statements = pickle.loads(payload)
+                return statements if globals.bind(names) else None
+        except Exception:
+            # A truncated or corrupted entry can fail to unpickle in any number
+            # of ways; whatever went wrong, the script is simply compiled again.
+            return None
+
+    def store(self, source_code: str, statements: List[Stmt], globals: GlobalEnvironment) -> None:
+        """
+        Writes the cache entry atomically. Failing to cache is never an error:
+        the script simply gets compiled again next time.
+        """
+        try:
+            payload = pickle.dumps((list(globals.names), statements), protocol=self.PICKLE_PROTOCOL)
+        except RecursionError:
+            return
+        header = self.HEADER.pack(self.MAGIC, self.compiler_key(), self.source_hash(source_code),
+                                  hashlib.sha256(payload).digest())
+        temporary_path = f'{self.path}.{os.getpid()}.tmp'
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(temporary_path, 'wb') as file:
+                file.write(header)
+                file.write(payload)
+            os.replace(temporary_path, self.path)
+        except OSError:
+            try:
+                os.remove(temporary_path)
+            except OSError:
+                pass
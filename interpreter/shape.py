@@ -0,0 +1,39 @@
+from __future__ import annotations
+from typing import Dict
+
+
+class Shape:
+    """
+    Hidden class of a LoxInstance: maps each field name to its slot in the
+    instance's values list. Every class has a root shape with no fields,
+    and adding a field follows a transition to the shape with that field
+    appended, so instances of a class that get the same fields in the same
+    order share one Shape, and a shape identifies the class too.
+
+    An instance with too many fields, or whose fields branch off a shape
+    that already has too many transitions, is megamorphic: it moves to a
+    dictionary shape of its own, which is not shared and grows in place.
+    Slots never move, so a name found in any shape keeps its slot.
+    """
+    __slots__ = ('slots', 'transitions', 'shared')
+    MAX_FIELDS = 64
+    MAX_TRANSITIONS = 16
+
+    def __init__(self, slots: Dict[str, int], shared: bool = True) -> None:
+        self.slots = slots
+        self.transitions: Dict[str, Shape] = dict()
+        self.shared = shared
+
+    def add_field(self, name: str) -> Shape:
+        """The shape of an instance of this shape once it has the field name too."""
+        if not self.shared:
+            self.slots[name] = len(self.slots)
+            return self
+        shape = self.transitions.get(name)
+        if shape is None:
+            slots = dict(self.slots)
+            slots[name] = len(slots)
+            if len(slots) > Shape.MAX_FIELDS or len(self.transitions) >= Shape.MAX_TRANSITIONS:
+                return Shape(slots, shared=False)
+            shape = self.transitions[name] = Shape(slots)
+        return shape
@@ -0,0 +1,26 @@
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, GetExpr, GroupingExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.stmt import FunctionStmt, Stmt
+
+
+def first_line(expr: Expr | Stmt) -> int:
+    """The line of the first token of expr, or 0 if it has none."""
+    while True:
+        match expr:
+            case VarExpr() | AssignExpr() | FunctionStmt():
+                return expr.name.line
+            case ThisExpr() | SuperExpr():
+                return expr.keyword.line
+            case UnaryExpr():
+                return expr.operator.line
+            case BinaryExpr() | LogicalExpr():
+                expr = expr.left
+            case GetExpr() | SetExpr():
+                expr = expr.obj
+            case CallExpr():
+                expr = expr.callee
+            case GroupingExpr():
+                expr = expr.expression
+            case TernaryExpr():
+                expr = expr.condition
+            case _:
+                return 0
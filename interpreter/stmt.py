@@ -9,112 +9,120 @@ class IStmtVisitor(ABC):
 		...
 
 class Stmt(ABC):
+	__slots__ = ()
+
 	@abstractmethod
 	def accept(self, visitor: IStmtVisitor):
 		...
 
 class BlockStmt(Stmt):
+	__slots__ = ('statements', 'locals')
+
 	def __init__(self, statements: List[Stmt]):
 		self.statements = statements
+		self.locals: List[str] = list()
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_block_stmt(self)
 
 class ExpressionStmt(Stmt):
+	__slots__ = ('expression',)
+
 	def __init__(self, expression: Expr):
 		self.expression = expression
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_expression_stmt(self)
 
 class FunctionStmt(Stmt):
+	__slots__ = ('name', 'params', 'body', 'locals', 'slot')
+
 	def __init__(self, name: Token, params: List[Token], body: List[Stmt]):
 		self.name = name
 		self.params = params
 		self.body = body
+		self.locals: List[str] = list()
+		self.slot: Optional[int] = None
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_function_stmt(self)
 
 class ClassStmt(Stmt):
+	__slots__ = ('name', 'superclass', 'methods', 'slot')
+
 	def __init__(self, name: Token, superclass: Optional[VarExpr], methods: List[FunctionStmt]):
 		self.name = name
 		self.superclass = superclass
 		self.methods = methods
+		self.slot: Optional[int] = None
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_class_stmt(self)
 
 class IfStmt(Stmt):
+	__slots__ = ('condition', 'thenBranch', 'elsebranch')
+
 	def __init__(self, condition: Expr, thenBranch: Stmt, elsebranch: Optional[Stmt]):
 		self.condition = condition
 		self.thenBranch = thenBranch
 		self.elsebranch = elsebranch
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_if_stmt(self)
 
 class PrintStmt(Stmt):
+	__slots__ = ('expression',)
+
 	def __init__(self, expression: Expr):
 		self.expression = expression
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_print_stmt(self)
 
 class ReturnStmt(Stmt):
+	__slots__ = ('keyword', 'value', 'tail')
+
 	def __init__(self, keyword: Token, value: Optional[Expr]):
 		self.keyword = keyword
 		self.value = value
+		self.tail: bool = False
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_return_stmt(self)
 
 class VarStmt(Stmt):
+	__slots__ = ('name', 'initializer', 'slot')
+
 	def __init__(self, name: Token, initializer: Optional[Expr]):
 		self.name = name
 		self.initializer = initializer
+		self.slot: Optional[int] = None
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_var_stmt(self)
 
 class WhileStmt(Stmt):
+	__slots__ = ('condition', 'body')
+
 	def __init__(self, condition: Expr, body: Stmt):
 		self.condition = condition
 		self.body = body
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_while_stmt(self)
 
 class BreakStmt(Stmt):
+	__slots__ = ('keyword',)
+
 	def __init__(self, keyword: Token):
 		self.keyword = keyword
 
 	def accept(self, visitor: IStmtVisitor):
-		return visitor.visit_stmt(self)
+		return visitor.visit_break_stmt(self)
 
 class StmtVisitor(IStmtVisitor):
 	def visit_stmt(self, expr):
-		match expr:
-			case BlockStmt():
-				return self.visit_block_stmt(expr)
-			case ExpressionStmt():
-				return self.visit_expression_stmt(expr)
-			case FunctionStmt():
-				return self.visit_function_stmt(expr)
-			case ClassStmt():
-				return self.visit_class_stmt(expr)
-			case IfStmt():
-				return self.visit_if_stmt(expr)
-			case PrintStmt():
-				return self.visit_print_stmt(expr)
-			case ReturnStmt():
-				return self.visit_return_stmt(expr)
-			case VarStmt():
-				return self.visit_var_stmt(expr)
-			case WhileStmt():
-				return self.visit_while_stmt(expr)
-			case BreakStmt():
-				return self.visit_break_stmt(expr)
+		return expr.accept(self)
 
 	@abstractmethod
 	def visit_block_stmt(self, stmt: BlockStmt):
@@ -0,0 +1,161 @@
+from __future__ import annotations
+import typing
+from typing import Callable, Dict, List, Optional
+
+from interpreter.break_exception import BreakException
+from interpreter.closure_compiler import ClosureCompiler, Code
+from interpreter.completion import BREAK, RETURN, Completion
+from interpreter.environment import Environment
+from interpreter.source_line import first_line
+from interpreter.stmt import FunctionStmt, Stmt, WhileStmt
+if typing.TYPE_CHECKING:
+    from interpreter.interpreter import Interpreter
+
+
+class TierProfile:
+    """What the Tiering has counted for one function or loop."""
+    def __init__(self, kind: str, name: str, line: int) -> None:
+        self.kind = kind
+        self.name = name
+        self.line = line
+        self.calls = 0
+        self.back_edges = 0
+        self.code: Optional[Code] = None
+        self.reason = ""
+        # Set when compiling ran out of stack; the function or loop stays on the tree-walker.
+        self.failure: Optional[str] = None
+
+    def describe(self) -> str:
+        what = f"{self.kind} {self.name} [line {self.line}]" if self.name else f"{self.kind} [line {self.line}]"
+        if self.failure:
+            return f"{what}: kept on the tree-walker ({self.failure})"
+        return f"{what}: compiled after {self.reason}"
+
+
+class TierCompiler(ClosureCompiler):
+    """
+    The ClosureCompiler, compiling for a running tree-walking Interpreter:
+    compiled code reads and writes that interpreter's globals and inline
+    caches, and calls it makes into functions that are still cold go back
+    to the tree-walker.
+    """
+    def __init__(self, interpreter: Interpreter) -> None:
+        super().__init__(interpreter.error_handler)
+        self.interpreter = interpreter
+        self.globals = interpreter.globals
+        self.environment = interpreter.globals
+        self.tiering = interpreter.tiering
+        self.inline_caches = interpreter.inline_caches
+
+    def execute_block(self, statements: List[Stmt], environment: Environment) -> Optional[Completion]:
+        return self.interpreter.execute_block(statements, environment)
+
+
+class Tiering:
+    """
+    Tiered execution for the tree-walking Interpreter. LoxFunction.call and
+    visit_while_stmt hand over to it, and it counts invocations of every
+    function and back-edges of every loop, charging the back-edges to the
+    function the loop runs in too.
+
+    A function is compiled with the ClosureCompiler once it has been called
+    call_threshold times, or its loops have gone round loop_threshold
+    times, and every later call runs the compiled body. A loop that goes
+    round loop_threshold times in all is compiled on the spot and carries
+    on compiled from its current iteration, since everything a while loop
+    needs between iterations is in its environment. If compiling runs out
+    of stack, the function or loop stays on the tree-walker.
+    """
+    def __init__(self, interpreter: Interpreter, call_threshold: int, loop_threshold: int) -> None:
+        self.interpreter = interpreter
+        self.call_threshold = call_threshold
+        self.loop_threshold = loop_threshold
+        self.functions: Dict[FunctionStmt, TierProfile] = dict()
+        self.loops: Dict[WhileStmt, TierProfile] = dict()
+        self.current: Optional[TierProfile] = None
+        self.compiler: Optional[TierCompiler] = None
+
+    def compile(self, profile: TierProfile, reason: str, compile_node: Callable[[TierCompiler], Code]) -> None:
+        if self.compiler is None:
+            self.compiler = TierCompiler(self.interpreter)
+        try:
+            profile.code = compile_node(self.compiler)
+            profile.reason = reason
+        except RecursionError as error:
+            # Compiling recurses once per level of nesting, on top of the
+            # stack of the running program, so a deeply nested body can run
+            # out of stack here where the tree-walker would not.
+            profile.failure = type(error).__name__
+
+    def call(self, interpreter: Interpreter, declaration: FunctionStmt, environment: Environment) -> Optional[Completion]:
+        """Runs the body of a function call, compiling the function once it is hot."""
+        profile = self.functions.get(declaration)
+        if profile is None:
+            profile = self.functions[declaration] = TierProfile('function', declaration.name.lexeme,
+                                                                declaration.name.line)
+        code = profile.code
+        if code is None and profile.failure is None:
+            profile.calls += 1
+            if profile.calls >= self.call_threshold:
+                self.compile(profile, f"{profile.calls} calls",
+                             lambda compiler: compiler.compile_block(declaration.body))
+            elif profile.back_edges >= self.loop_threshold:
+                self.compile(profile, f"{profile.back_edges} loop back-edges",
+                             lambda compiler: compiler.compile_block(declaration.body))
+            code = profile.code
+        if code is not None:
+            return code(environment)
+
+        enclosing = self.current
+        self.current = profile
+        try:
+            return interpreter.execute_block(declaration.body, environment)
+        finally:
+            self.current = enclosing
+
+    def loop(self, interpreter: Interpreter, stmt: WhileStmt) -> Optional[Completion]:
+        """Runs a while loop, compiling it in the middle once it is hot."""
+        profile = self.loops.get(stmt)
+        if profile is None:
+            profile = self.loops[stmt] = TierProfile('loop', "", first_line(stmt.condition))
+        environment = interpreter.environment
+        if profile.code is not None:
+            return profile.code(environment)
+
+        function = self.current
+        back_edges = 0
+        hot = False
+        try:
+            while interpreter.is_truthy(interpreter.evaluate(stmt.condition)):
+                completion = interpreter.execute(stmt.body)
+                if completion is BREAK:
+                    break
+                if completion is RETURN:
+                    return completion
+                back_edges += 1
+                if profile.failure is None and profile.back_edges + back_edges >= self.loop_threshold:
+                    self.compile(profile, f"{profile.back_edges + back_edges} back-edges",
+                                 lambda compiler: compiler.compile_stmt(stmt))
+                    hot = profile.code is not None
+                    if hot:
+                        break
+        except BreakException:
+            pass
+        finally:
+            profile.back_edges += back_edges
+            if function is not None:
+                function.back_edges += back_edges
+        if hot:
+            # The rest of this execution of the loop runs compiled.
+            return typing.cast(Code, profile.code)(environment)
+        return None
+
+    def report(self) -> str:
+        profiles = list(self.functions.values()) + list(self.loops.values())
+        tiered = [profile for profile in profiles if profile.code is not None or profile.failure is not None]
+        compiled_functions = sum(1 for profile in self.functions.values() if profile.code is not None)
+        compiled_loops = sum(1 for profile in self.loops.values() if profile.code is not None)
+        lines = [f"tiered up {compiled_functions} of {len(self.functions)} functions and "
+                 f"{compiled_loops} of {len(self.loops)} loops"]
+        lines.extend('  ' + profile.describe() for profile in tiered)
+        return '\n'.join(lines)
@@ -0,0 +1,32 @@
+from typing import Iterable, Iterator, Optional
+
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+
+
+class TokenStream:
+    """
+    The parser's window onto the scanner output: the token being looked at
+    and the one consumed just before it. Tokens are pulled one at a time, so
+    a lazy scanner never has to hold the whole token list in memory.
+    """
+    def __init__(self, tokens: Iterable[Token]) -> None:
+        self.tokens: Iterator[Token] = iter(tokens)
+        self.previous_token: Optional[Token] = None
+        self.current_token: Token = next(self.tokens)
+
+    def peek(self) -> Token:
+        return self.current_token
+
+    def peek_type(self) -> TokenType:
+        return self.current_token.token_type
+
+    def previous(self) -> Token:
+        return self.previous_token
+
+    def advance(self) -> None:
+        """
+        Moves to the next token. Must not be called once EOF is reached.
+        """
+        self.previous_token = self.current_token
+        self.current_token = next(self.tokens)
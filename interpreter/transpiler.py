@@ -0,0 +1,869 @@
+import typing
+from typing import Dict, List, Optional, Set, Tuple
+
+from interpreter.expr import AssignExpr, BinaryExpr, CallExpr, Expr, ExprVisitor, GetExpr, GroupingExpr, LiteralExpr, LogicalExpr, SetExpr, SuperExpr, TernaryExpr, ThisExpr, UnaryExpr, VarExpr
+from interpreter.function_type import FunctionType
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.source_line import first_line
+from interpreter.stmt import BlockStmt, BreakStmt, ClassStmt, ExpressionStmt, FunctionStmt, IfStmt, PrintStmt, ReturnStmt, Stmt, StmtVisitor, VarStmt, WhileStmt
+
+
+class CaptureAnalysis(ExprVisitor, StmtVisitor):
+    """
+    Finds the locals that nested functions use, and for each function the
+    enclosing locals it needs passed in. Names are looked up scope by scope
+    the way the Resolver does, so every VarExpr ends up at the same
+    declaration it resolved to. `this` and `super` are never reassigned and
+    are left to Python's own closures.
+    """
+    def __init__(self) -> None:
+        self.scopes: List[Dict[str, Token]] = []
+        # The function each scope belongs to; None is top-level code.
+        self.owners: List[Optional[FunctionStmt]] = []
+        self.functions: List[Optional[FunctionStmt]] = [None]
+        self.captured: Set[Token] = set()
+        self.free: Dict[FunctionStmt, Dict[Token, None]] = dict()
+
+    def analyse(self, statements: List[Stmt]) -> None:
+        for statement in statements:
+            statement.accept(self)
+
+    def visit(self, expr: Expr | Stmt | None) -> None:
+        if expr is not None:
+            expr.accept(self)
+
+    def begin_scope(self) -> None:
+        self.scopes.append(dict())
+        self.owners.append(self.functions[-1])
+
+    def end_scope(self) -> None:
+        self.scopes.pop()
+        self.owners.pop()
+
+    def declare(self, name: Token) -> None:
+        if self.scopes:
+            self.scopes[-1][name.lexeme] = name
+
+    def use(self, name: Token) -> None:
+        for scope, owner in zip(reversed(self.scopes), reversed(self.owners)):
+            declaration = scope.get(name.lexeme)
+            if declaration is None:
+                continue
+            if owner is not self.functions[-1]:
+                self.captured.add(declaration)
+                for function in self.functions[self.functions.index(owner) + 1:]:
+                    self.free[function][declaration] = None
+            return
+
+    def function(self, stmt: FunctionStmt) -> None:
+        self.functions.append(stmt)
+        self.free[stmt] = dict()
+        self.begin_scope()
+        for param in stmt.params:
+            self.declare(param)
+        self.analyse(stmt.body)
+        self.end_scope()
+        self.functions.pop()
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self.begin_scope()
+        self.analyse(stmt.statements)
+        self.end_scope()
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        self.declare(stmt.name)
+        self.visit(stmt.superclass)
+        for method in stmt.methods:
+            self.function(method)
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        self.visit(stmt.expression)
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        self.declare(stmt.name)
+        self.function(stmt)
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        self.visit(stmt.condition)
+        self.visit(stmt.thenBranch)
+        self.visit(stmt.elsebranch)
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        self.visit(stmt.expression)
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        self.visit(stmt.value)
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        self.declare(stmt.name)
+        self.visit(stmt.initializer)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        self.visit(stmt.condition)
+        self.visit(stmt.body)
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        return None
+
+    def visit_ternary_expr(self, expr: TernaryExpr):
+        return None
+
+    def visit_assign_expr(self, expr: AssignExpr):
+        self.visit(expr.value)
+        self.use(expr.name)
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    def visit_call_expr(self, expr: CallExpr):
+        self.visit(expr.callee)
+        for argument in expr.arguments:
+            self.visit(argument)
+
+    def visit_get_expr(self, expr: GetExpr):
+        self.visit(expr.obj)
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        self.visit(expr.expression)
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        return None
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        self.visit(expr.left)
+        self.visit(expr.right)
+
+    def visit_set_expr(self, expr: SetExpr):
+        self.visit(expr.value)
+        self.visit(expr.obj)
+
+    def visit_super_expr(self, expr: SuperExpr):
+        return None
+
+    def visit_this_expr(self, expr: ThisExpr):
+        return None
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        self.visit(expr.right)
+
+    def visit_var_expr(self, expr: VarExpr):
+        self.use(expr.name)
+
+
+class Transpiler(ExprVisitor, StmtVisitor):
+    """
+    Translates a resolved program into the source of a Python module whose
+    _main() runs it. Lox functions become defs, classes become subclasses
+    of TranspiledInstance, and locals become Python locals, renamed apart
+    so block scoping survives; a local a nested function uses lives in a
+    Cell. Globals are module globals named `g_<name>`.
+
+    Expressions are translated to Python expressions that do the float,
+    attribute and call fast paths inline and fall back to the helpers in
+    transpiler_runtime otherwise. Every generated line records the Lox line
+    it came from in LOX_LINES, which is where runtime errors raised by
+    Python itself, such as a NameError for an undefined global, get their
+    line.
+    """
+    RUNTIME = ('ADDABLE', 'BreakException', 'Cell', 'TranspiledClass', 'TranspiledInstance', 'add', 'assign_global', 'call',
+               'cell_set', 'define_natives', 'divide', 'echo', 'function', 'get_error', 'greater', 'greater_equal',
+               'less', 'less_equal', 'numbers_error', 'operand_error', 'run_script', 'set_error', 'set_field',
+               'stringify', 'super_method', 'superclass_error', 'tail_calls', 'undefined_error', 'uninitialized_error')
+    COMPARISONS: Dict[TokenType, Tuple[str, str]] = {
+        TokenType.GREATER: ('>', 'greater'),
+        TokenType.GREATER_EQUAL: ('>=', 'greater_equal'),
+        TokenType.LESS: ('<', 'less'),
+        TokenType.LESS_EQUAL: ('<=', 'less_equal'),
+    }
+    INDENT = '    '
+    # How deeply an expression may nest before its subexpressions go into
+    # statement-level temporaries: every level adds a few parentheses, and
+    # CPython's parser allows 200.
+    MAX_DEPTH = 16
+
+    def __init__(self) -> None:
+        self.lines: List[str] = []
+        self.lox_lines: List[int] = []
+        self.indent = 0
+        self.line = 0
+        self.counter = 0
+        self.analysis = CaptureAnalysis()
+        self.scopes: List[Dict[str, Token]] = []
+        self.names: Dict[Token, str] = dict()
+        self.function_type = FunctionType.NONE
+        self.assigned_globals: Set[str] = set()
+        self.loops = 0
+
+    def transpile(self, statements: List[Stmt], repl: bool = False) -> str:
+        """
+        :return: the module's source; lox_lines then holds the Lox line of
+        each of its lines
+        """
+        self.analysis.analyse(statements)
+        self.emit("# Generated by pylox --transpile.")
+        self.emit(f"from interpreter.transpiler_runtime import {', '.join(self.RUNTIME)}")
+        self.emit("")
+        self.emit("_G = globals()")
+        self.emit("define_natives(_G)")
+        self.emit("")
+        self.emit("")
+        self.emit("def _main():")
+        self.indent += 1
+        start = len(self.lines)
+        for statement in statements:
+            # As in Interpreter.interpret, a break no loop caught ends the
+            # top-level statement it is in.
+            catches = self.may_break(statement)
+            if catches:
+                self.emit("try:")
+                self.indent += 1
+            if repl and isinstance(statement, ExpressionStmt):
+                self.line = first_line(statement.expression)
+                self.emit(f"echo({self.value(statement.expression)})")
+            else:
+                statement.accept(self)
+            if catches:
+                self.indent -= 1
+                self.emit("except BreakException:")
+                self.emit(f"{self.INDENT}pass")
+        self.end_function(start)
+        self.indent -= 1
+        self.line = 0
+        self.emit("")
+        self.emit("")
+        self.emit(f"LOX_LINES = {tuple(self.lox_lines)!r}")
+        self.emit("")
+        self.emit("if __name__ == '__main__':")
+        self.emit(f"{self.INDENT}run_script(_main, __file__, LOX_LINES)")
+        return '\n'.join(self.lines) + '\n'
+
+    def emit(self, text: str) -> None:
+        self.lines.append(self.INDENT * self.indent + text if text else text)
+        self.lox_lines.append(self.line)
+
+    def unique(self, prefix: str) -> str:
+        self.counter += 1
+        return f"{prefix}{self.counter}"
+
+    def temp(self) -> str:
+        return self.unique('_t')
+
+    def suite(self, stmt: Stmt) -> None:
+        self.indent += 1
+        start = len(self.lines)
+        stmt.accept(self)
+        if len(self.lines) == start:
+            self.emit("pass")
+        self.indent -= 1
+
+    def end_function(self, start: int) -> None:
+        """Finishes the body of the def whose first body line is at start."""
+        if len(self.lines) == start:
+            self.emit("pass")
+        if self.assigned_globals:
+            self.lines.insert(start, self.INDENT * self.indent + f"global {', '.join(sorted(self.assigned_globals))}")
+            self.lox_lines.insert(start, self.lox_lines[start])
+
+    # Variables
+
+    def declare(self, name: Token) -> str:
+        """
+        Declares a variable in the current scope and returns its Python
+        name. A captured local starts out as an empty Cell, which the
+        declaration's value then goes into.
+        """
+        if not self.scopes:
+            return 'g_' + name.lexeme
+        self.scopes[-1][name.lexeme] = name
+        variable = self.unique(f"v_{name.lexeme}_")
+        self.names[name] = variable
+        if name in self.analysis.captured:
+            self.emit(f"{variable} = Cell(None)")
+        return variable
+
+    def lookup(self, name: Token) -> Tuple[str, bool]:
+        """:return: the Python name a Lox name refers to here, and whether it is a Cell"""
+        for scope in reversed(self.scopes):
+            declaration = scope.get(name.lexeme)
+            if declaration is not None:
+                return self.names[declaration], declaration in self.analysis.captured
+        return 'g_' + name.lexeme, False
+
+    def define(self, name: Token, variable: str, value: str) -> None:
+        """Emits the definition of a variable declared with declare."""
+        if not self.scopes:
+            self.assigned_globals.add(variable)
+            self.emit(f"{variable} = {value}")
+        elif name in self.analysis.captured:
+            self.emit(f"{variable}.value = {value}")
+        else:
+            self.emit(f"{variable} = {value}")
+
+    def define_expression(self, name: Token, variable: str, value: str) -> str:
+        if not self.scopes:
+            self.assigned_globals.add(variable)
+            return f"({variable} := {value})"
+        if name in self.analysis.captured:
+            return f"cell_set({variable}, {value})"
+        return f"({variable} := {value})"
+
+    # Expressions
+
+    def expression(self, expr: Expr) -> str:
+        if isinstance(expr, FunctionStmt):
+            return self.function_expression(expr)
+        return expr.accept(self)
+
+    def operand(self, expr: Expr, stable: bool = True) -> Tuple[str, str]:
+        """
+        :return: code that evaluates expr, and code that reads its value
+        again afterwards, through a temporary unless expr is a plain read
+        and stable, i.e. nothing that runs in between can assign to it
+        """
+        code = self.expression(expr)
+        if stable and self.is_simple(expr):
+            return code, code
+        temp = self.temp()
+        return f"({temp} := {code})", temp
+
+    def condition(self, expr: Expr) -> str:
+        """expr as a Python condition with Lox truthiness."""
+        if self.is_boolean(expr):
+            return self.expression(expr)
+        literal = self.unwrap(expr)
+        if isinstance(literal, LiteralExpr):
+            return repr(literal.value is not None and literal.value is not False)
+        evaluate, value = self.operand(expr)
+        return f"({evaluate} is not None and {value} is not False)"
+
+    def value(self, expr: Expr) -> str:
+        """
+        expr as a Python expression, for a statement that evaluates it once
+        and first: a deeply nested expr is evaluated by the statements
+        spill emits before it.
+        """
+        if self.depth(expr) > self.MAX_DEPTH:
+            return self.spill(expr)
+        return self.expression(expr)
+
+    def test(self, expr: Expr) -> str:
+        """condition for a statement's own condition, which may spill the way value does."""
+        if self.depth(expr) > self.MAX_DEPTH:
+            value = self.spill(expr)
+            return f"({value} is not None and {value} is not False)"
+        return self.condition(expr)
+
+    def spill(self, expr: Expr) -> str:
+        """
+        Emits statements that evaluate expr into a temporary, one per level
+        of nesting past MAX_DEPTH and in the order Lox evaluates it, and
+        returns the temporary.
+        """
+        expr = self.unwrap(expr)
+        if self.depth(expr) <= self.MAX_DEPTH:
+            code = self.expression(expr)
+        else:
+            match expr:
+                case BinaryExpr():
+                    left = self.spill(expr.left)
+                    right = self.spill(expr.right)
+                    code = self.binary(expr, left, left, right, right)
+                case UnaryExpr():
+                    right = self.spill(expr.right)
+                    code = self.unary(expr, right, right)
+                case LogicalExpr():
+                    temp = self.spill(expr.left)
+                    if expr.operator.token_type == TokenType.OR:
+                        self.emit(f"if {temp} is None or {temp} is False:")
+                    else:
+                        self.emit(f"if {temp} is not None and {temp} is not False:")
+                    self.indent += 1
+                    self.emit(f"{temp} = {self.spill(expr.right)}")
+                    self.indent -= 1
+                    return temp
+                case CallExpr():
+                    callee = self.spill(expr.callee)
+                    code = self.call(expr, callee, callee, [self.spill(argument) for argument in expr.arguments])
+                case GetExpr():
+                    obj = self.spill(expr.obj)
+                    code = self.get(expr, obj, obj)
+                case SetExpr():
+                    obj = self.spill(expr.obj)
+                    code = self.set_expression(expr, obj, obj, self.spill(expr.value))
+                case AssignExpr():
+                    code = self.assign_expression(expr, self.spill(expr.value))
+                case _:
+                    code = self.expression(expr)
+        temp = self.temp()
+        self.emit(f"{temp} = {code}")
+        return temp
+
+    @staticmethod
+    def may_break(node: Expr | Stmt | None, in_loop: bool = False) -> bool:
+        """
+        Whether running node can raise BreakException: any call can, and a
+        break outside a loop does. A nested loop catches its own, and a
+        function only runs when it is called.
+        """
+        match node:
+            case CallExpr():
+                return True
+            case BreakStmt():
+                return not in_loop
+            case GroupingExpr():
+                return Transpiler.may_break(node.expression)
+            case UnaryExpr():
+                return Transpiler.may_break(node.right)
+            case BinaryExpr() | LogicalExpr():
+                return Transpiler.may_break(node.left) or Transpiler.may_break(node.right)
+            case GetExpr():
+                return Transpiler.may_break(node.obj)
+            case SetExpr():
+                return Transpiler.may_break(node.obj) or Transpiler.may_break(node.value)
+            case AssignExpr():
+                return Transpiler.may_break(node.value)
+            case ExpressionStmt() | PrintStmt():
+                return Transpiler.may_break(node.expression)
+            case VarStmt():
+                return Transpiler.may_break(node.initializer)
+            case ReturnStmt():
+                return Transpiler.may_break(node.value)
+            case BlockStmt():
+                return any(Transpiler.may_break(statement, in_loop) for statement in node.statements)
+            case IfStmt():
+                return Transpiler.may_break(node.condition) or Transpiler.may_break(node.thenBranch, in_loop) \
+                    or Transpiler.may_break(node.elsebranch, in_loop)
+        return False
+
+    @staticmethod
+    def depth(expr: Optional[Expr]) -> int:
+        """How many operations expr nests inside each other."""
+        match expr:
+            case GroupingExpr():
+                return Transpiler.depth(expr.expression)
+            case UnaryExpr():
+                return 1 + Transpiler.depth(expr.right)
+            case BinaryExpr() | LogicalExpr():
+                return 1 + max(Transpiler.depth(expr.left), Transpiler.depth(expr.right))
+            case CallExpr():
+                return 1 + max([Transpiler.depth(expr.callee)] + [Transpiler.depth(argument) for argument in expr.arguments])
+            case GetExpr():
+                return 1 + Transpiler.depth(expr.obj)
+            case SetExpr():
+                return 1 + max(Transpiler.depth(expr.obj), Transpiler.depth(expr.value))
+            case AssignExpr():
+                return 1 + Transpiler.depth(expr.value)
+        return 0
+
+    @staticmethod
+    def unwrap(expr: Expr) -> Expr:
+        while isinstance(expr, GroupingExpr):
+            expr = expr.expression
+        return expr
+
+    @staticmethod
+    def is_simple(expr: Expr) -> bool:
+        expr = Transpiler.unwrap(expr)
+        return isinstance(expr, (LiteralExpr, VarExpr, ThisExpr))
+
+    @staticmethod
+    def has_side_effects(expr: Expr) -> bool:
+        """Whether evaluating expr can assign to a variable or field, or run Lox code."""
+        match expr:
+            case AssignExpr() | CallExpr() | SetExpr() | FunctionStmt():
+                return True
+            case GroupingExpr():
+                return Transpiler.has_side_effects(expr.expression)
+            case UnaryExpr():
+                return Transpiler.has_side_effects(expr.right)
+            case BinaryExpr() | LogicalExpr():
+                return Transpiler.has_side_effects(expr.left) or Transpiler.has_side_effects(expr.right)
+            case GetExpr():
+                return Transpiler.has_side_effects(expr.obj)
+        return False
+
+    @staticmethod
+    def is_boolean(expr: Expr) -> bool:
+        """Whether expr always evaluates to a Python bool."""
+        expr = Transpiler.unwrap(expr)
+        if isinstance(expr, LiteralExpr):
+            return isinstance(expr.value, bool)
+        if isinstance(expr, BinaryExpr):
+            return expr.operator.token_type in Transpiler.COMPARISONS \
+                or expr.operator.token_type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL)
+        if isinstance(expr, UnaryExpr):
+            return expr.operator.token_type == TokenType.BANG
+        if isinstance(expr, LogicalExpr):
+            return Transpiler.is_boolean(expr.left) and Transpiler.is_boolean(expr.right)
+        return False
+
+    @staticmethod
+    def is_float(expr: Expr) -> bool:
+        expr = Transpiler.unwrap(expr)
+        return isinstance(expr, LiteralExpr) and type(expr.value) is float
+
+    @staticmethod
+    def may_be_nil(expr: Optional[Expr]) -> bool:
+        expr = Transpiler.unwrap(expr)
+        if isinstance(expr, LiteralExpr):
+            return expr.value is None
+        return not isinstance(expr, (BinaryExpr, UnaryExpr, FunctionStmt))
+
+    def visit_ternary_expr(self, expr: TernaryExpr):
+        return "None"
+
+    def visit_literal_expr(self, expr: LiteralExpr):
+        value = expr.value
+        if type(value) is float and value in (float('inf'), float('-inf')):
+            return f"float({str(value)!r})"
+        return repr(value)
+
+    def visit_grouping_expr(self, expr: GroupingExpr):
+        return self.expression(expr.expression)
+
+    def visit_var_expr(self, expr: VarExpr):
+        variable, is_cell = self.lookup(expr.name)
+        return variable + '.value' if is_cell else variable
+
+    def visit_this_expr(self, expr: ThisExpr):
+        return "self"
+
+    def visit_assign_expr(self, expr: AssignExpr):
+        return self.assign_expression(expr, self.expression(expr.value))
+
+    def assign_expression(self, expr: AssignExpr, value: str) -> str:
+        variable, is_cell = self.lookup(expr.name)
+        if is_cell:
+            return f"cell_set({variable}, {value})"
+        if variable.startswith('g_'):
+            return f"assign_global(_G, {variable!r}, {value}, {expr.name.line})"
+        return f"({variable} := {value})"
+
+    def visit_binary_expr(self, expr: BinaryExpr):
+        # The right operand runs between reading the left one and using it.
+        left_evaluate, left = self.operand(expr.left, not self.has_side_effects(expr.right))
+        right_evaluate, right = self.operand(expr.right)
+        return self.binary(expr, left_evaluate, left, right_evaluate, right)
+
+    def binary(self, expr: BinaryExpr, left_evaluate: str, left: str, right_evaluate: str, right: str) -> str:
+        line = expr.operator.line
+        operator = expr.operator.token_type
+        if operator == TokenType.EQUAL_EQUAL:
+            return f"({left_evaluate} == {right_evaluate})"
+        if operator == TokenType.BANG_EQUAL:
+            return f"({left_evaluate} != {right_evaluate})"
+
+        # Which operand types still need checking at runtime.
+        if self.is_float(expr.right):
+            check = f"type({left_evaluate}) is float"
+        elif self.is_float(expr.left):
+            check = f"type({right_evaluate}) is float"
+        elif operator == TokenType.PLUS:
+            check = f"type({left_evaluate}) is type({right_evaluate}) in ADDABLE"
+        else:
+            check = f"type({left_evaluate}) is type({right_evaluate}) is float"
+
+        match operator:
+            case TokenType.PLUS:
+                return f"({left} + {right} if {check} else add({left}, {right}, {line}))"
+            case TokenType.MINUS:
+                return f"({left} - {right} if {check} else numbers_error({line}))"
+            case TokenType.STAR:
+                return f"({left} * {right} if {check} else numbers_error({line}))"
+            case TokenType.SLASH:
+                return f"({left} / {right} if {check} and {right} else divide({left}, {right}, {line}))"
+        symbol, fallback = self.COMPARISONS[operator]
+        return f"({left} {symbol} {right} if {check} else {fallback}({left}, {right}, {line}))"
+
+    def visit_unary_expr(self, expr: UnaryExpr):
+        if expr.operator.token_type == TokenType.BANG:
+            if self.is_boolean(expr.right) or isinstance(self.unwrap(expr.right), LiteralExpr):
+                return f"(not {self.condition(expr.right)})"
+        evaluate, value = self.operand(expr.right)
+        return self.unary(expr, evaluate, value)
+
+    def unary(self, expr: UnaryExpr, evaluate: str, value: str) -> str:
+        if expr.operator.token_type == TokenType.BANG:
+            return f"({evaluate} is None or {value} is False)"
+        return f"(-{value} if type({evaluate}) is float else operand_error({expr.operator.line}))"
+
+    def visit_logical_expr(self, expr: LogicalExpr):
+        is_or = expr.operator.token_type == TokenType.OR
+        if self.is_boolean(expr.left):
+            return f"({self.expression(expr.left)} {'or' if is_or else 'and'} {self.expression(expr.right)})"
+        evaluate, value = self.operand(expr.left)
+        truthy = f"{evaluate} is not None and {value} is not False"
+        if isinstance(self.unwrap(expr.left), LiteralExpr):
+            truthy = self.condition(expr.left)
+        right = self.expression(expr.right)
+        if is_or:
+            return f"({value} if {truthy} else {right})"
+        return f"({right} if {truthy} else {value})"
+
+    def visit_call_expr(self, expr: CallExpr):
+        evaluate, callee = self.operand(expr.callee)
+        return self.call(expr, evaluate, callee, [self.expression(argument) for argument in expr.arguments])
+
+    def call(self, expr: CallExpr, evaluate: str, callee: str, arguments: List[str]) -> str:
+        listed = ', '.join(arguments)
+        return f"({callee}({listed}) if getattr({evaluate}, 'lox_arity', -1) == {len(arguments)} " \
+               f"else call({callee}, {expr.paren.line}{''.join(', ' + argument for argument in arguments)}))"
+
+    def visit_get_expr(self, expr: GetExpr):
+        if isinstance(expr.obj, ThisExpr):
+            return f"self.p_{expr.name.lexeme}"
+        evaluate, obj = self.operand(expr.obj)
+        return self.get(expr, evaluate, obj)
+
+    def get(self, expr: GetExpr, evaluate: str, obj: str) -> str:
+        return f"({obj}.p_{expr.name.lexeme} if isinstance({evaluate}, TranspiledInstance) " \
+               f"else get_error({expr.name.line}))"
+
+    def visit_set_expr(self, expr: SetExpr):
+        if isinstance(expr.obj, ThisExpr):
+            return f"set_field(self, 'p_{expr.name.lexeme}', {self.expression(expr.value)})"
+        evaluate, obj = self.operand(expr.obj)
+        return self.set_expression(expr, evaluate, obj, self.expression(expr.value))
+
+    def set_expression(self, expr: SetExpr, evaluate: str, obj: str, value: str) -> str:
+        return f"(set_field({obj}, 'p_{expr.name.lexeme}', {value}) " \
+               f"if isinstance({evaluate}, TranspiledInstance) else set_error({expr.name.line}))"
+
+    def visit_super_expr(self, expr: SuperExpr):
+        return f"super_method(_super, 'p_{expr.method.lexeme}', self, {expr.method.line})"
+
+    def function_expression(self, stmt: FunctionStmt) -> str:
+        """A function in expression position, which also defines its name."""
+        variable = self.declare(stmt.name)
+        code = self.function(stmt, FunctionType.FUNCTION)
+        return self.define_expression(stmt.name, variable, f"function({code}, {stmt.name.lexeme!r}, {len(stmt.params)})")
+
+    # Statements
+
+    def function(self, stmt: FunctionStmt, function_type: FunctionType, superclass: Optional[str] = None) -> str:
+        """Emits the def of a function or method and returns its name."""
+        line = self.line
+        self.line = stmt.name.line
+        if function_type == FunctionType.FUNCTION:
+            name = self.unique(f"_fn_{stmt.name.lexeme}_")
+            parameters = []
+        else:
+            name = f"p_{stmt.name.lexeme}"
+            parameters = ['self']
+        free = [self.names[declaration] for declaration in self.analysis.free[stmt]]
+        self.scopes.append(dict())
+        for param in stmt.params:
+            self.scopes[-1][param.lexeme] = param
+            self.names[param] = self.unique(f"v_{param.lexeme}_")
+            parameters.append(self.names[param])
+        parameters.extend(f"{variable}={variable}" for variable in free)
+        if superclass:
+            parameters.append(f"_super={superclass}")
+        self.emit(f"def {name}({', '.join(parameters)}):")
+
+        enclosing = (self.function_type, self.assigned_globals, self.loops)
+        self.function_type, self.assigned_globals, self.loops = function_type, set(), 0
+        self.indent += 1
+        start = len(self.lines)
+        for param in stmt.params:
+            if param in self.analysis.captured:
+                self.emit(f"{self.names[param]} = Cell({self.names[param]})")
+        for statement in stmt.body:
+            statement.accept(self)
+        if function_type == FunctionType.INITIALIZER:
+            self.emit("return self")
+        self.end_function(start)
+        self.indent -= 1
+        self.function_type, self.assigned_globals, self.loops = enclosing
+        self.scopes.pop()
+        if any(self.makes_tail_call(statement) for statement in stmt.body):
+            self.emit(f"{name} = tail_calls({name})")
+        self.line = line
+        return name
+
+    @staticmethod
+    def makes_tail_call(stmt: Optional[Stmt]) -> bool:
+        """Whether stmt contains a tail call of the function it is in."""
+        match stmt:
+            case ReturnStmt():
+                return stmt.tail
+            case BlockStmt():
+                return any(Transpiler.makes_tail_call(statement) for statement in stmt.statements)
+            case IfStmt():
+                return Transpiler.makes_tail_call(stmt.thenBranch) or Transpiler.makes_tail_call(stmt.elsebranch)
+            case WhileStmt():
+                return Transpiler.makes_tail_call(stmt.body)
+        return False
+
+    def visit_function_stmt(self, stmt: FunctionStmt):
+        self.line = stmt.name.line
+        variable = self.declare(stmt.name)
+        code = self.function(stmt, FunctionType.FUNCTION)
+        self.define(stmt.name, variable, f"function({code}, {stmt.name.lexeme!r}, {len(stmt.params)})")
+
+    def visit_class_stmt(self, stmt: ClassStmt):
+        self.line = stmt.name.line
+        superclass: Optional[str] = None
+        if stmt.superclass:
+            superclass = self.temp()
+            self.line = stmt.superclass.name.line
+            self.emit(f"{superclass} = {self.expression(stmt.superclass)}")
+            self.emit(f"if not isinstance({superclass}, TranspiledClass): superclass_error({self.line})")
+            self.line = stmt.name.line
+        variable = self.declare(stmt.name)
+        klass = self.unique(f"_class_{stmt.name.lexeme}_")
+        self.emit(f"class {klass}({superclass or 'TranspiledInstance'}):")
+        self.indent += 1
+        self.emit(f"lox_name = {stmt.name.lexeme!r}")
+        for method in stmt.methods:
+            function_type = FunctionType.INITIALIZER if method.name.lexeme == "init" else FunctionType.METHOD
+            code = self.function(method, function_type, superclass)
+            self.emit(f"function({code}, {method.name.lexeme!r}, {len(method.params)})")
+        self.indent -= 1
+        self.define(stmt.name, variable, klass)
+
+    def visit_block_stmt(self, stmt: BlockStmt):
+        self.scopes.append(dict())
+        for statement in stmt.statements:
+            statement.accept(self)
+        self.scopes.pop()
+
+    def visit_expression_stmt(self, stmt: ExpressionStmt):
+        expr = stmt.expression
+        self.line = first_line(expr) or self.line
+        if type(expr) is AssignExpr:
+            self.assign(expr)
+        elif type(expr) is SetExpr:
+            self.set(expr)
+        else:
+            self.emit(self.value(expr))
+
+    def assign(self, expr: AssignExpr) -> None:
+        """An assignment used as a statement."""
+        variable, is_cell = self.lookup(expr.name)
+        value = self.value(expr.value)
+        if is_cell:
+            self.emit(f"{variable}.value = {value}")
+        elif variable.startswith('g_'):
+            temp = self.temp()
+            self.assigned_globals.add(variable)
+            self.emit(f"{temp} = {value}")
+            self.emit(f"if {variable!r} not in _G: undefined_error({variable!r}, {expr.name.line})")
+            self.emit(f"{variable} = {temp}")
+        else:
+            self.emit(f"{variable} = {value}")
+
+    def set(self, expr: SetExpr) -> None:
+        """A property assignment used as a statement."""
+        if isinstance(expr.obj, ThisExpr):
+            self.emit(f"self.p_{expr.name.lexeme} = {self.value(expr.value)}")
+            return
+        # Python evaluates the value before the target, Lox the object first.
+        if self.is_simple(expr.obj) and not self.has_side_effects(expr.value) \
+                and self.depth(expr.value) <= self.MAX_DEPTH:
+            obj = self.expression(expr.obj)
+        else:
+            obj = self.spill(expr.obj)
+        self.emit(f"if not isinstance({obj}, TranspiledInstance): set_error({expr.name.line})")
+        self.emit(f"{obj}.p_{expr.name.lexeme} = {self.value(expr.value)}")
+
+    def visit_if_stmt(self, stmt: IfStmt):
+        self.line = first_line(stmt.condition) or self.line
+        self.emit(f"if {self.test(stmt.condition)}:")
+        self.suite(stmt.thenBranch)
+        branch = stmt.elsebranch
+        while isinstance(branch, IfStmt):
+            start = len(self.lines)
+            self.line = first_line(branch.condition) or self.line
+            condition = self.test(branch.condition)
+            if len(self.lines) != start:
+                # The condition needs lines of its own, for a function it
+                # defines or to spill.
+                del self.lines[start:]
+                del self.lox_lines[start:]
+                break
+            self.emit(f"elif {condition}:")
+            self.suite(branch.thenBranch)
+            branch = branch.elsebranch
+        if branch is not None:
+            self.emit("else:")
+            self.suite(branch)
+
+    def visit_while_stmt(self, stmt: WhileStmt):
+        self.line = first_line(stmt.condition) or self.line
+        # Like Interpreter.visit_while_stmt, the loop also ends on a break
+        # in a function it calls, outside any loop of that function's own.
+        # Each try counts against CPython's limit of 20 nested blocks, so
+        # only loops that make calls get one.
+        catches = self.may_break(stmt.condition, True) or self.may_break(stmt.body, True)
+        if catches:
+            self.emit("try:")
+            self.indent += 1
+        start = len(self.lines)
+        condition = self.test(stmt.condition)
+        if len(self.lines) == start:
+            self.emit(f"while {condition}:")
+        else:
+            # The condition needs lines of its own, which run before every test.
+            lines, lox_lines = self.lines[start:], self.lox_lines[start:]
+            del self.lines[start:]
+            del self.lox_lines[start:]
+            self.emit("while True:")
+            self.lines.extend(self.INDENT + line for line in lines)
+            self.lox_lines.extend(lox_lines)
+            self.emit(f"{self.INDENT}if not {condition}: break")
+        self.loops += 1
+        self.suite(stmt.body)
+        self.loops -= 1
+        if catches:
+            self.indent -= 1
+            self.emit("except BreakException:")
+            self.emit(f"{self.INDENT}pass")
+
+    def visit_print_stmt(self, stmt: PrintStmt):
+        self.line = first_line(stmt.expression) or self.line
+        self.emit(f"print(stringify({self.value(stmt.expression)}))")
+
+    def visit_return_stmt(self, stmt: ReturnStmt):
+        self.line = stmt.keyword.line
+        if self.function_type == FunctionType.INITIALIZER:
+            self.emit("return self")
+        elif stmt.value is None:
+            self.emit("return None")
+        elif stmt.tail:
+            # A callee that makes tail calls itself is left to tail_calls to
+            # call once this function has returned.
+            call = typing.cast(CallExpr, stmt.value)
+            if self.depth(call) > self.MAX_DEPTH:
+                evaluate = callee = self.spill(call.callee)
+                arguments = [self.spill(argument) for argument in call.arguments]
+            else:
+                evaluate, callee = self.operand(call.callee)
+                arguments = [self.expression(argument) for argument in call.arguments]
+            listed = ''.join(', ' + argument for argument in arguments)
+            self.emit(f"return (({callee}, {call.paren.line}{listed}) if hasattr({evaluate}, 'lox_body') "
+                      f"else {self.call(call, callee, callee, arguments)})")
+        else:
+            self.emit(f"return {self.value(stmt.value)}")
+
+    def visit_break_stmt(self, stmt: BreakStmt):
+        self.line = stmt.keyword.line
+        # Outside a loop a Lox break unwinds into whatever loop is running.
+        self.emit("break" if self.loops else "raise BreakException()")
+
+    def visit_var_stmt(self, stmt: VarStmt):
+        self.line = stmt.name.line
+        variable = self.declare(stmt.name)
+        value = self.value(stmt.initializer) if stmt.initializer is not None else "None"
+        if not self.may_be_nil(stmt.initializer):
+            self.define(stmt.name, variable, value)
+        elif self.scopes and stmt.name not in self.analysis.captured:
+            self.emit(f"{variable} = {value}")
+            self.emit(f"if {variable} is None: uninitialized_error({self.line})")
+        else:
+            temp = self.temp()
+            self.emit(f"{temp} = {value}")
+            self.emit(f"if {temp} is None: uninitialized_error({self.line})")
+            self.define(stmt.name, variable, temp)
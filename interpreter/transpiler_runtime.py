@@ -0,0 +1,283 @@
+"""
+Runtime support imported by the Python modules the Transpiler generates.
+
+Generated code does the common case inline (float arithmetic, attribute
+access, direct calls) and calls into this module for everything else, so
+the slow paths here carry the same semantics and error messages as the
+tree-walking Interpreter.
+"""
+import sys
+from types import FunctionType, MethodType
+from typing import Any, Callable, Dict, NoReturn, Optional, Sequence
+
+from interpreter.break_exception import BreakException
+from interpreter.clock import Clock
+from interpreter.lox_callable import LoxCallable
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+
+# Types `+` works on without a conversion.
+ADDABLE = (float, str)
+
+
+class Cell:
+    """
+    A local captured by a nested function. Closures receive the cell itself
+    as a default argument, so every execution of a declaration, such as one
+    in a loop body, gets a variable of its own.
+    """
+    __slots__ = ('value',)
+
+    def __init__(self, value: Any) -> None:
+        self.value = value
+
+
+class TranspiledClass(type):
+    """Metaclass of transpiled Lox classes, which print as their Lox name."""
+    lox_name: str
+
+    def __repr__(cls) -> str:
+        return cls.lox_name
+
+
+class TranspiledInstance(metaclass=TranspiledClass):
+    """
+    Base of every transpiled Lox class. Methods are `p_`-prefixed Python
+    methods and fields `p_`-prefixed instance attributes, so a field shadows
+    a method of the same name, as in LoxInstance.get.
+    """
+    lox_name = 'TranspiledInstance'
+
+    def __repr__(self) -> str:
+        return type(self).lox_name + " instance"
+
+
+def error(line: int, message: str) -> LoxRuntimeError:
+    return LoxRuntimeError(Token(TokenType.IDENTIFIER, "", None, line), message)
+
+
+def function(code: FunctionType, name: str, arity: int) -> FunctionType:
+    """Marks a generated def as a Lox function; calls check lox_arity."""
+    code.lox_name = name
+    code.lox_arity = arity
+    return code
+
+
+def tail_calls(body: FunctionType) -> FunctionType:
+    """
+    Wraps the def of a function that makes tail calls. A tail call to
+    another function wrapped like this one comes back from the def as a
+    tuple, (callee, line, *arguments), which no Lox value is, and the
+    wrapper runs the callee's def in its place, so a chain of such calls
+    runs in constant Python stack. Tail calls to anything else are made
+    directly: they end the chain.
+    """
+    def run(*arguments: Any) -> Any:
+        result = body(*arguments)
+        while type(result) is tuple:
+            callee = result[0]
+            arguments = result[2:]
+            if getattr(callee, 'lox_arity', -1) != len(arguments):
+                return call(callee, result[1], *arguments)
+            if type(callee) is MethodType:
+                result = callee.lox_body(callee.__self__, *arguments)
+            else:
+                result = callee.lox_body(*arguments)
+        return result
+    run.lox_body = body
+    return run
+
+
+def stringify(value: Any) -> str:
+    if value is None:
+        return "nil"
+    if type(value) is float:
+        text = str(value)
+        if text.endswith(".0"):
+            text = text[:-2]
+        return text
+    if isinstance(value, (FunctionType, MethodType)):
+        return f"<fn {value.lox_name}>"
+    return str(value)
+
+
+def echo(value: Any) -> None:
+    """What the REPL prints for an expression statement."""
+    print(stringify(value) if isinstance(value, (FunctionType, MethodType)) else value)
+
+
+def add(left: Any, right: Any, line: int) -> Any:
+    if isinstance(left, float) and isinstance(right, float):
+        return left + right
+    if isinstance(left, str) and isinstance(right, str):
+        return left + right
+    if (isinstance(left, str) and isinstance(right, float)) or (isinstance(left, float) and isinstance(right, str)):
+        return str(left) + str(right)
+    raise error(line, "Operands must be two numbers or two strings.")
+
+
+def numbers_error(line: int) -> NoReturn:
+    raise error(line, "Operands must be numbers.")
+
+
+def operand_error(line: int) -> NoReturn:
+    raise error(line, "Operand must be a number.")
+
+
+def divide(left: Any, right: Any, line: int) -> float:
+    if not (isinstance(left, float) and isinstance(right, float)):
+        numbers_error(line)
+    if right == 0:
+        raise error(line, "Cannot divide by zero.")
+    return left / right
+
+
+def greater(left: Any, right: Any, line: int) -> bool:
+    if isinstance(left, str) and isinstance(right, str):
+        return len(left) > len(right)
+    if not (isinstance(left, float) and isinstance(right, float)):
+        numbers_error(line)
+    return left > right
+
+
+def greater_equal(left: Any, right: Any, line: int) -> bool:
+    if isinstance(left, str) and isinstance(right, str):
+        return len(left) >= len(right)
+    if not (isinstance(left, float) and isinstance(right, float)):
+        numbers_error(line)
+    return left >= right
+
+
+def less(left: Any, right: Any, line: int) -> bool:
+    if isinstance(left, str) and isinstance(right, str):
+        return len(left) < len(right)
+    if not (isinstance(left, float) and isinstance(right, float)):
+        numbers_error(line)
+    return left < right
+
+
+def less_equal(left: Any, right: Any, line: int) -> bool:
+    if isinstance(left, str) and isinstance(right, str):
+        return len(left) <= len(right)
+    if not (isinstance(left, float) and isinstance(right, float)):
+        numbers_error(line)
+    return left <= right
+
+
+def call(callee: Any, line: int, *arguments: Any) -> Any:
+    """Calls that are not a Lox function of the right arity."""
+    if isinstance(callee, TranspiledClass):
+        initializer: Optional[FunctionType] = getattr(callee, 'p_init', None)
+        arity = initializer.lox_arity if initializer else 0
+        if len(arguments) != arity:
+            raise error(line, f"Expected {arity} arguments but got {len(arguments)}.")
+        instance = object.__new__(callee)
+        if initializer:
+            initializer(instance, *arguments)
+        return instance
+    if isinstance(callee, (FunctionType, MethodType)) and hasattr(callee, 'lox_arity'):
+        raise error(line, f"Expected {callee.lox_arity} arguments but got {len(arguments)}.")
+    if isinstance(callee, LoxCallable):
+        if len(arguments) != callee.arity():
+            raise error(line, f"Expected {callee.arity()} arguments but got {len(arguments)}.")
+        return callee.call(None, list(arguments))
+    raise error(line, "Can only call functions and classes.")
+
+
+def get_error(line: int) -> NoReturn:
+    raise error(line, "Only instances have properties.")
+
+
+def set_error(line: int) -> NoReturn:
+    raise error(line, "Only instances have fields.")
+
+
+def set_field(instance: TranspiledInstance, name: str, value: Any) -> Any:
+    setattr(instance, name, value)
+    return value
+
+
+def super_method(superclass: TranspiledClass, name: str, instance: TranspiledInstance, line: int) -> MethodType:
+    method: Optional[FunctionType] = getattr(superclass, name, None)
+    if method is None:
+        raise error(line, f"Undefined property '{name[2:]}'.")
+    return MethodType(method, instance)
+
+
+def superclass_error(line: int) -> NoReturn:
+    raise error(line, "Superclass must be a class.")
+
+
+def uninitialized_error(line: int) -> NoReturn:
+    raise error(line, "A variable must be initialized before it can be used.")
+
+
+def undefined_error(name: str, line: int) -> NoReturn:
+    raise error(line, f"Undefined variable '{name[2:]}'.")
+
+
+def cell_set(cell: Cell, value: Any) -> Any:
+    cell.value = value
+    return value
+
+
+def assign_global(namespace: Dict[str, Any], name: str, value: Any, line: int) -> Any:
+    if name not in namespace:
+        undefined_error(name, line)
+    namespace[name] = value
+    return value
+
+
+def define_natives(namespace: Dict[str, Any]) -> None:
+    namespace.setdefault('g_clock', Clock())
+
+
+def source_line(exception: BaseException, lines_by_file: Dict[str, Sequence[int]]) -> Optional[int]:
+    """The Lox line of the innermost generated code the exception passed through."""
+    line: Optional[int] = None
+    traceback = exception.__traceback__
+    while traceback is not None:
+        lines = lines_by_file.get(traceback.tb_frame.f_code.co_filename)
+        if lines is not None and traceback.tb_lineno <= len(lines):
+            line = lines[traceback.tb_lineno - 1]
+        traceback = traceback.tb_next
+    return line
+
+
+def run(main: Callable[[], None], lines_by_file: Dict[str, Sequence[int]]) -> None:
+    """
+    Runs a generated module's _main. Reads of undefined globals and
+    properties are plain Python lookups in the generated code; their
+    NameError and AttributeError become the Interpreter's runtime errors
+    here, at the line the module's line table gives, and so does running
+    out of Python stack.
+    """
+    try:
+        main()
+    except RecursionError as exception:
+        line = source_line(exception, lines_by_file)
+        if line is None:
+            raise
+        raise error(line, "Stack overflow.") from None
+    except (NameError, AttributeError) as exception:
+        name: Optional[str] = getattr(exception, 'name', None)
+        line = source_line(exception, lines_by_file)
+        if name is None or line is None:
+            raise
+        if isinstance(exception, NameError) and name.startswith('g_'):
+            raise error(line, f"Undefined variable '{name[2:]}'.") from None
+        if isinstance(exception, AttributeError) and name.startswith('p_'):
+            raise error(line, f"Undefined property '{name[2:]}'.") from None
+        raise
+
+
+def run_script(main: Callable[[], None], file_name: str, lox_lines: Sequence[int]) -> None:
+    """Entry point of a generated module run on its own with python."""
+    error_handler = LoxErrorHandler()
+    try:
+        run(main, {file_name: lox_lines})
+    except LoxRuntimeError as runtime_error:
+        error_handler.runtime_error(runtime_error)
+        sys.exit(70)
@@ -0,0 +1,59 @@
+import warnings
+from typing import Any, Dict, List, Optional, Sequence
+
+from interpreter.interpreter import Interpreter
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.stmt import Stmt
+from interpreter.transpiler import Transpiler
+from interpreter.transpiler_runtime import run
+
+
+class TranspilingInterpreter(Interpreter):
+    """
+    Execution engine that translates the resolved program to Python source
+    with the Transpiler, compiles it with compile() and runs the module, so
+    Lox code executes as CPython bytecode. Every program run by one
+    instance shares a module namespace, which holds the Lox globals, so the
+    REPL keeps its definitions between lines.
+
+    With an output path the generated module is also written there; it
+    runs on its own with `python <path>` as long as the interpreter package
+    can be imported.
+    """
+    def __init__(self, error_handler: LoxErrorHandler, output_path: Optional[str] = None):
+        super().__init__(error_handler)
+        self.output_path = output_path
+        self.namespace: Dict[str, Any] = {'__name__': 'lox_transpiled'}
+        self.lines_by_file: Dict[str, Sequence[int]] = dict()
+
+    def interpret(self, statements: List[Stmt], repl: bool = False) -> None:
+        transpiler = Transpiler()
+        file_name = self.output_path or f"<lox transpiled {len(self.lines_by_file) + 1}>"
+        try:
+            source = transpiler.transpile(statements, repl)
+            if self.output_path:
+                with open(self.output_path, 'w') as file:
+                    file.write(source)
+            with warnings.catch_warnings():
+                # Calling a literal is a Lox runtime error, reported when the
+                # call runs; CPython's compile-time hint about it is noise.
+                warnings.simplefilter('ignore', SyntaxWarning)
+                code = compile(source, file_name, 'exec')
+        except (SyntaxError, RecursionError, MemoryError) as error:
+            # Past CPython's limits on how deeply source may nest. A script
+            # runs on the tree-walker instead; the REPL can't, since its
+            # globals live in the module namespace.
+            if not repl:
+                super().interpret(statements)
+                return
+            line = getattr(error, 'lineno', None)
+            self.error_handler.error_on_line(transpiler.lox_lines[line - 1] if line else 0,
+                                             f"Too deeply nested to transpile ({type(error).__name__}).")
+            return
+        exec(code, self.namespace)
+        self.lines_by_file[file_name] = transpiler.lox_lines
+        try:
+            run(self.namespace['_main'], self.lines_by_file)
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error)
@@ -0,0 +1,412 @@
+from __future__ import annotations
+from typing import Any, Dict, List
+
+from interpreter.bytecode_compiler import BytecodeCompiler
+from interpreter.clock import Clock
+from interpreter.interpreter import Interpreter
+from interpreter.lox_callable import LoxCallable
+from interpreter.lox_class import LoxClass
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_instance import LoxInstance
+from interpreter.lox_runtime_error import LoxRuntimeError
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.op_code import OpCode
+from interpreter.stmt import Stmt
+from interpreter.vm_objects import VMBoundMethod, VMClosure, VMFrame, VMFunction, VMUpvalue
+
+
+class VM(Interpreter):
+    """
+    Stack-based virtual machine in the style of clox. Statements are compiled
+    to bytecode by the BytecodeCompiler and run by a single dispatch loop
+    over an explicit value stack and call frame list, so a Lox call costs a
+    VMFrame rather than a chain of Python calls, and recursion goes as deep
+    as stack_size frames, whatever Python's recursion limit.
+
+    Classes and instances are the Interpreter's LoxClass and LoxInstance;
+    functions are VMClosures over compiled VMFunctions.
+    """
+    FRAMES_MAX = 1024
+
+    def __init__(self, error_handler: LoxErrorHandler, stack_size: int = FRAMES_MAX):
+        super().__init__(error_handler)
+        self.stack_size = stack_size
+        self.global_values: Dict[str, Any] = {"clock": Clock()}
+        self.stack: List[Any] = list()
+        self.frames: List[VMFrame] = list()
+        self.open_upvalues: Dict[int, VMUpvalue] = dict()
+
+    def interpret(self, statements: List[Stmt], repl: bool = False) -> None:
+        compiler = BytecodeCompiler(self.error_handler, repl)
+        function: VMFunction = compiler.compile(statements)
+        if self.error_handler.HAS_ERROR:
+            return
+        closure = VMClosure(function, [])
+        self.stack.append(closure)
+        self.frames.append(VMFrame(closure, 0, 0))
+        try:
+            self.run()
+        except LoxRuntimeError as error:
+            self.error_handler.runtime_error(error)
+        finally:
+            self.stack.clear()
+            self.frames.clear()
+            self.open_upvalues.clear()
+
+    @staticmethod
+    def error(line: int, message: str) -> LoxRuntimeError:
+        return LoxRuntimeError(Token(TokenType.IDENTIFIER, "", None, line), message)
+
+    def capture_upvalue(self, location: int) -> VMUpvalue:
+        upvalue = self.open_upvalues.get(location)
+        if upvalue is None:
+            upvalue = VMUpvalue(location)
+            self.open_upvalues[location] = upvalue
+        return upvalue
+
+    def close_upvalues(self, last: int) -> None:
+        """
+        Moves every captured stack slot at or above last into its upvalue
+        """
+        stack = self.stack
+        for location in [location for location in self.open_upvalues if location >= last]:
+            upvalue = self.open_upvalues.pop(location)
+            upvalue.value = stack[location]
+            upvalue.location = -1
+
+    def run(self) -> None:
+        stack = self.stack
+        frames = self.frames
+        global_values = self.global_values
+        open_upvalues = self.open_upvalues
+        stringify = self.stringify
+        frames_max = self.stack_size
+
+        frame = frames[-1]
+        closure = frame.closure
+        chunk = closure.function.chunk
+        code, constants, lines = chunk.code, chunk.constants, chunk.lines
+        ip = frame.ip
+        base = frame.base
+
+        # Opcodes as locals, most frequent first in the dispatch chain below.
+        CONSTANT, NIL, TRUE, FALSE = OpCode.CONSTANT, OpCode.NIL, OpCode.TRUE, OpCode.FALSE
+        POP, DUP = OpCode.POP, OpCode.DUP
+        GET_LOCAL, SET_LOCAL = OpCode.GET_LOCAL, OpCode.SET_LOCAL
+        GET_GLOBAL, DEFINE_GLOBAL, SET_GLOBAL = OpCode.GET_GLOBAL, OpCode.DEFINE_GLOBAL, OpCode.SET_GLOBAL
+        GET_UPVALUE, SET_UPVALUE = OpCode.GET_UPVALUE, OpCode.SET_UPVALUE
+        GET_PROPERTY, SET_PROPERTY, CHECK_INSTANCE = OpCode.GET_PROPERTY, OpCode.SET_PROPERTY, OpCode.CHECK_INSTANCE
+        GET_SUPER, CHECK_INITIALIZED = OpCode.GET_SUPER, OpCode.CHECK_INITIALIZED
+        EQUAL, NOT_EQUAL = OpCode.EQUAL, OpCode.NOT_EQUAL
+        GREATER, GREATER_EQUAL, LESS, LESS_EQUAL = OpCode.GREATER, OpCode.GREATER_EQUAL, OpCode.LESS, OpCode.LESS_EQUAL
+        ADD, SUBTRACT, MULTIPLY, DIVIDE = OpCode.ADD, OpCode.SUBTRACT, OpCode.MULTIPLY, OpCode.DIVIDE
+        NOT, NEGATE, PRINT, ECHO = OpCode.NOT, OpCode.NEGATE, OpCode.PRINT, OpCode.ECHO
+        JUMP, JUMP_IF_FALSE, JUMP_IF_TRUE = OpCode.JUMP, OpCode.JUMP_IF_FALSE, OpCode.JUMP_IF_TRUE
+        POP_JUMP_IF_FALSE, LOOP = OpCode.POP_JUMP_IF_FALSE, OpCode.LOOP
+        CALL, CLOSURE, CLOSE_UPVALUE, RETURN = OpCode.CALL, OpCode.CLOSURE, OpCode.CLOSE_UPVALUE, OpCode.RETURN
+        CLASS, INHERIT, METHOD, BREAK, TAIL_CALL = OpCode.CLASS, OpCode.INHERIT, OpCode.METHOD, OpCode.BREAK, OpCode.TAIL_CALL
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                stack.append(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                stack.append(constants[code[ip]])
+                ip += 1
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == POP:
+                stack.pop()
+            elif op == POP_JUMP_IF_FALSE:
+                value = stack.pop()
+                if value is None or value is False:
+                    ip += code[ip]
+                ip += 1
+            elif op == LOOP:
+                ip -= code[ip] - 1
+            elif op == ADD:
+                b = stack.pop()
+                a = stack[-1]
+                if isinstance(a, float) and isinstance(b, float):
+                    stack[-1] = a + b
+                elif isinstance(a, str) and isinstance(b, str):
+                    stack[-1] = a + b
+                elif (isinstance(a, str) and isinstance(b, float)) or (isinstance(a, float) and isinstance(b, str)):
+                    stack[-1] = str(a) + str(b)
+                else:
+                    raise self.error(lines[ip - 1], "Operands must be two numbers or two strings.")
+            elif op == LESS or op == LESS_EQUAL or op == GREATER or op == GREATER_EQUAL:
+                b = stack.pop()
+                a = stack[-1]
+                if isinstance(a, str) and isinstance(b, str):
+                    a = len(a)
+                    b = len(b)
+                elif not (isinstance(a, float) and isinstance(b, float)):
+                    raise self.error(lines[ip - 1], "Operands must be numbers.")
+                if op == LESS:
+                    stack[-1] = a < b
+                elif op == LESS_EQUAL:
+                    stack[-1] = a <= b
+                elif op == GREATER:
+                    stack[-1] = a > b
+                else:
+                    stack[-1] = a >= b
+            elif op == SUBTRACT or op == MULTIPLY or op == DIVIDE:
+                b = stack.pop()
+                a = stack[-1]
+                if not (isinstance(a, float) and isinstance(b, float)):
+                    raise self.error(lines[ip - 1], "Operands must be numbers.")
+                if op == SUBTRACT:
+                    stack[-1] = a - b
+                elif op == MULTIPLY:
+                    stack[-1] = a * b
+                elif b == 0:
+                    raise self.error(lines[ip - 1], "Cannot divide by zero.")
+                else:
+                    stack[-1] = a / b
+            elif op == GET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                try:
+                    stack.append(global_values[name])
+                except KeyError:
+                    raise self.error(lines[ip - 1], f"Undefined variable '{name}'.") from None
+            elif op == CALL:
+                argument_count = code[ip]
+                ip += 1
+                callee = stack[-1 - argument_count]
+                if type(callee) is VMBoundMethod:
+                    stack[-1 - argument_count] = callee.receiver
+                    callee = callee.method
+                elif type(callee) is LoxClass:
+                    stack[-1 - argument_count] = LoxInstance(callee)
+                    initializer = callee.initializer
+                    if initializer is None:
+                        if argument_count != 0:
+                            raise self.error(lines[ip - 1], f"Expected 0 arguments but got {argument_count}.")
+                        continue
+                    callee = initializer
+
+                if type(callee) is VMClosure:
+                    function = callee.function
+                    if argument_count != function.arity:
+                        raise self.error(lines[ip - 1], f"Expected {function.arity} arguments but got {argument_count}.")
+                    if len(frames) == frames_max:
+                        raise self.error(lines[ip - 1], "Stack overflow.")
+                    frame.ip = ip
+                    frame = VMFrame(callee, 0, len(stack) - argument_count - 1)
+                    frames.append(frame)
+                    closure = callee
+                    chunk = function.chunk
+                    code, constants, lines = chunk.code, chunk.constants, chunk.lines
+                    ip = 0
+                    base = frame.base
+                elif isinstance(callee, LoxCallable):
+                    if argument_count != callee.arity():
+                        raise self.error(lines[ip - 1], f"Expected {callee.arity()} arguments but got {argument_count}.")
+                    arguments = stack[len(stack) - argument_count:]
+                    del stack[len(stack) - argument_count - 1:]
+                    stack.append(callee.call(self, arguments))
+                else:
+                    raise self.error(lines[ip - 1], "Can only call functions and classes.")
+            elif op == RETURN:
+                result = stack.pop()
+                if open_upvalues:
+                    self.close_upvalues(base)
+                frames.pop()
+                del stack[base:]
+                if not frames:
+                    return
+                stack.append(result)
+                frame = frames[-1]
+                closure = frame.closure
+                chunk = closure.function.chunk
+                code, constants, lines = chunk.code, chunk.constants, chunk.lines
+                ip = frame.ip
+                base = frame.base
+            elif op == JUMP:
+                ip += code[ip] + 1
+            elif op == GET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                stack.append(stack[upvalue.location] if upvalue.location >= 0 else upvalue.value)
+            elif op == SET_UPVALUE:
+                upvalue = closure.upvalues[code[ip]]
+                ip += 1
+                if upvalue.location >= 0:
+                    stack[upvalue.location] = stack[-1]
+                else:
+                    upvalue.value = stack[-1]
+            elif op == GET_PROPERTY:
+                instance = stack[-1]
+                if not isinstance(instance, LoxInstance):
+                    raise self.error(lines[ip], "Only instances have properties.")
+                name = constants[code[ip]]
+                ip += 1
+                slot = instance.shape.slots.get(name)
+                if slot is not None:
+                    stack[-1] = instance.values[slot]
+                else:
+                    method = instance.klass.find_method(name)
+                    if method is None:
+                        raise self.error(lines[ip - 1], f"Undefined property '{name}'.")
+                    stack[-1] = VMBoundMethod(instance, method)
+            elif op == SET_PROPERTY:
+                instance = stack[-2]
+                if not isinstance(instance, LoxInstance):
+                    raise self.error(lines[ip], "Only instances have fields.")
+                value = stack.pop()
+                instance.set_field(constants[code[ip]], value)
+                ip += 1
+                stack[-1] = value
+            elif op == CHECK_INSTANCE:
+                if not isinstance(stack[-1], LoxInstance):
+                    raise self.error(lines[ip - 1], "Only instances have fields.")
+            elif op == EQUAL:
+                b = stack.pop()
+                stack[-1] = stack[-1] == b
+            elif op == NOT_EQUAL:
+                b = stack.pop()
+                stack[-1] = not stack[-1] == b
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += code[ip]
+                ip += 1
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if not (value is None or value is False):
+                    ip += code[ip]
+                ip += 1
+            elif op == NIL:
+                stack.append(None)
+            elif op == TRUE:
+                stack.append(True)
+            elif op == FALSE:
+                stack.append(False)
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                value = stack[-1]
+                if not isinstance(value, float):
+                    raise self.error(lines[ip - 1], "Operand must be a number.")
+                stack[-1] = -value
+            elif op == SET_GLOBAL:
+                name = constants[code[ip]]
+                ip += 1
+                if name not in global_values:
+                    raise self.error(lines[ip - 1], f"Undefined variable '{name}'.")
+                global_values[name] = stack[-1]
+            elif op == DEFINE_GLOBAL:
+                global_values[constants[code[ip]]] = stack.pop()
+                ip += 1
+            elif op == CHECK_INITIALIZED:
+                if stack[-1] is None:
+                    raise self.error(lines[ip - 1], "A variable must be initialized before it can be used.")
+            elif op == PRINT:
+                print(stringify(stack.pop()))
+            elif op == ECHO:
+                print(stack.pop())
+            elif op == DUP:
+                stack.append(stack[-1])
+            elif op == CLOSURE:
+                function = constants[code[ip]]
+                ip += 1
+                upvalues: List[VMUpvalue] = list()
+                for _ in range(function.upvalue_count):
+                    is_local, index = code[ip], code[ip + 1]
+                    ip += 2
+                    upvalues.append(self.capture_upvalue(base + index) if is_local else closure.upvalues[index])
+                stack.append(VMClosure(function, upvalues))
+            elif op == CLOSE_UPVALUE:
+                self.close_upvalues(len(stack) - 1)
+                stack.pop()
+            elif op == GET_SUPER:
+                superclass = stack.pop()
+                receiver = stack[-1]
+                name = constants[code[ip]]
+                ip += 1
+                method = superclass.find_method(name)
+                if method is None:
+                    raise self.error(lines[ip - 1], f"Undefined property '{name}'.")
+                stack[-1] = VMBoundMethod(receiver, method)
+            elif op == CLASS:
+                stack.append(LoxClass(constants[code[ip]], None, dict()))
+                ip += 1
+            elif op == INHERIT:
+                klass = stack.pop()
+                superclass = stack[-1]
+                if not isinstance(superclass, LoxClass):
+                    raise self.error(lines[ip - 1], "Superclass must be a class.")
+                klass.inherit(superclass)
+            elif op == METHOD:
+                method = stack.pop()
+                stack[-1].add_method(constants[code[ip]], method)
+                ip += 1
+            elif op == TAIL_CALL:
+                argument_count = code[ip]
+                ip += 1
+                callee = stack[-1 - argument_count]
+                if type(callee) is VMBoundMethod:
+                    stack[-1 - argument_count] = callee.receiver
+                    callee = callee.method
+                elif type(callee) is LoxClass:
+                    stack[-1 - argument_count] = LoxInstance(callee)
+                    initializer = callee.initializer
+                    if initializer is None:
+                        if argument_count != 0:
+                            raise self.error(lines[ip - 1], f"Expected 0 arguments but got {argument_count}.")
+                        continue
+                    callee = initializer
+
+                if type(callee) is VMClosure:
+                    function = callee.function
+                    if argument_count != function.arity:
+                        raise self.error(lines[ip - 1], f"Expected {function.arity} arguments but got {argument_count}.")
+                    # The callee takes over the returning function's frame, so a
+                    # chain of tail calls runs in one frame and never gets back
+                    # to the RETURN after this instruction.
+                    if open_upvalues:
+                        self.close_upvalues(base)
+                    stack[base:] = stack[len(stack) - argument_count - 1:]
+                    frame.closure = closure = callee
+                    chunk = function.chunk
+                    code, constants, lines = chunk.code, chunk.constants, chunk.lines
+                    ip = 0
+                elif isinstance(callee, LoxCallable):
+                    if argument_count != callee.arity():
+                        raise self.error(lines[ip - 1], f"Expected {callee.arity()} arguments but got {argument_count}.")
+                    arguments = stack[len(stack) - argument_count:]
+                    del stack[len(stack) - argument_count - 1:]
+                    stack.append(callee.call(self, arguments))
+                else:
+                    raise self.error(lines[ip - 1], "Can only call functions and classes.")
+            elif op == BREAK:
+                # Leave frames until one is calling from inside a loop or, at
+                # the latest, a top-level statement, and end that.
+                while True:
+                    if open_upvalues:
+                        self.close_upvalues(base)
+                    frames.pop()
+                    del stack[base:]
+                    frame = frames[-1]
+                    closure = frame.closure
+                    chunk = closure.function.chunk
+                    code, constants, lines = chunk.code, chunk.constants, chunk.lines
+                    ip = frame.ip
+                    base = frame.base
+                    target = chunk.break_target(ip - 1)
+                    if target is not None:
+                        break
+                _, ip, local_count = target
+                if open_upvalues:
+                    self.close_upvalues(base + local_count)
+                del stack[base + local_count:]
+            else:
+                raise self.error(lines[ip - 1], f"Unknown opcode {op}.")
@@ -0,0 +1,84 @@
+from typing import Any, List
+
+from interpreter.chunk import Chunk
+from interpreter.lox_instance import LoxInstance
+
+
+class VMFunction:
+    """
+    A compiled function: its chunk plus what the VM needs to call it. Shared
+    by every closure created from the same declaration.
+    """
+    __slots__ = ('name', 'arity', 'upvalue_count', 'chunk')
+
+    def __init__(self, name: str, arity: int = 0) -> None:
+        self.name = name
+        self.arity = arity
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __str__(self) -> str:
+        return f"<fn {self.name}>" if self.name else "<script>"
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class VMUpvalue:
+    """
+    A captured variable. While open it refers to a slot on the VM stack
+    (location); once that slot goes away the value moves into the upvalue
+    and location becomes -1.
+    """
+    __slots__ = ('location', 'value')
+
+    def __init__(self, location: int) -> None:
+        self.location = location
+        self.value: Any = None
+
+
+class VMClosure:
+    __slots__ = ('function', 'upvalues')
+
+    def __init__(self, function: VMFunction, upvalues: List[VMUpvalue]) -> None:
+        self.function = function
+        self.upvalues = upvalues
+
+    def arity(self) -> int:
+        return self.function.arity
+
+    def __str__(self) -> str:
+        return str(self.function)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class VMBoundMethod:
+    __slots__ = ('receiver', 'method')
+
+    def __init__(self, receiver: LoxInstance, method: VMClosure) -> None:
+        self.receiver = receiver
+        self.method = method
+
+    def arity(self) -> int:
+        return self.method.arity()
+
+    def __str__(self) -> str:
+        return str(self.method)
+
+    def __repr__(self) -> str:
+        return self.__str__()
+
+
+class VMFrame:
+    """
+    A call in progress: the closure being run, the index of its next
+    instruction and the stack index of its slot 0.
+    """
+    __slots__ = ('closure', 'ip', 'base')
+
+    def __init__(self, closure: VMClosure, ip: int, base: int) -> None:
+        self.closure = closure
+        self.ip = ip
+        self.base = base
@@ -0,0 +1,915 @@
+import argparse
+import contextlib
+import io
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+import tracemalloc
+import typing
+from sys import intern
+from typing import Callable, Iterator, List, Optional
+from unittest import mock
+
+import interpreter.compact_tokens
+import interpreter.regex_scanner
+import interpreter.scanner
+from interpreter.environment import Environment
+from interpreter.global_environment import GlobalEnvironment
+from interpreter.interpreter import Interpreter
+from interpreter.lox_class import LoxClass
+from interpreter.lox_function import LoxFunction
+from interpreter.lox_instance import LoxInstance
+from interpreter.lox_token import Token
+from interpreter.lox_token_type import TokenType
+from interpreter.lox import Lox
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_options import LoxOptions
+from interpreter.node_fuser import NodeFuser
+from interpreter.parser import Parser
+from interpreter.pratt_parser import PrattParser
+from interpreter.regex_scanner import RegexScanner
+from interpreter.resolver import Resolver
+from interpreter.scanner import Scanner
+
+# A chunk of representative Lox code, repeated to build large inputs.
+SAMPLE_SOURCE = '''
+// Computes a few values the slow way.
+class Point {
+    init(x, y) {
+        this.x = x;
+        this.y = y;
+    }
+
+    add(other) {
+        return Point(this.x + other.x, this.y + other.y);
+    }
+}
+
+/* A block comment /* with a nested one */ spanning
+   more than one line. */
+fun fib(n) {
+    if (n <= 1) return n;
+    return fib(n - 2) + fib(n - 1);
+}
+
+var greeting = "hello" + " " + "world";
+for (var i = 0; i < 10; i = i + 1) {
+    var p = Point(i, i * 2.5);
+    if (p.x >= 3 and p.y != 7 or !false) print greeting;
+}
+'''
+
+FIELD_HEAVY_SOURCE = '''
+class Vector {
+    init(x, y, z) {
+        this.x = x;
+        this.y = y;
+        this.z = z;
+    }
+}
+
+var v = Vector(1, 2, 3);
+var total = 0;
+for (var i = 0; i < 30000; i = i + 1) {
+    v.x = v.y + v.z;
+    v.y = v.z - v.x;
+    v.z = v.x * 0.5;
+    total = total + v.x + v.y + v.z;
+}
+print total;
+'''
+
+METHOD_HEAVY_SOURCE = '''
+class Counter {
+    init() {
+        this.count = 0;
+    }
+
+    increment() {
+        this.count = this.count + 1;
+        return this;
+    }
+
+    value() {
+        return this.count;
+    }
+}
+
+var counter = Counter();
+for (var i = 0; i < 20000; i = i + 1) {
+    counter.increment().increment().value();
+}
+print counter.value();
+'''
+
+# Many distinct fields with realistically long names, each read and written
+# once per iteration.
+LONG_NAMES = [f"running_total_of_column_{idx:02d}" for idx in range(24)]
+LONG_NAMES_SOURCE = (
+    "class Ledger {\n    init() {\n"
+    + "".join(f"        this.{name} = 0;\n" for name in LONG_NAMES)
+    + "    }\n}\n\nvar ledger = Ledger();\nfor (var i = 0; i < 2000; i = i + 1) {\n"
+    + "".join(f"    ledger.{name} = ledger.{name} + i;\n" for name in LONG_NAMES)
+    + f"}}\nprint ledger.{LONG_NAMES[-1]};\n"
+)
+
+LOOP_SOURCE = '''
+var total = 0;
+for (var i = 0; i < 100000; i = i + 1) {
+    var odd = i - (i / 2);
+    if (odd > 10 and total < 1000000000) {
+        total = total + odd * 2;
+    } else {
+        total = total - 1;
+    }
+}
+print total;
+'''
+
+FIB_SOURCE = '''
+fun fib(n) {
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+print fib(20);
+'''
+
+TAIL_CALL_SOURCE = '''
+fun count(i, total) {
+    if (i == 0) return total;
+    return count(i - 1, total + 1);
+}
+print count(1000000, 0);
+fun isEven(n) {
+    if (n == 0) return true;
+    return isOdd(n - 1);
+}
+fun isOdd(n) {
+    if (n == 0) return false;
+    return isEven(n - 1);
+}
+print isEven(1000000);
+class Counter {
+    init(limit) { this.limit = limit; }
+    up(i) {
+        if (i == this.limit) return i;
+        return this.up(i + 1);
+    }
+}
+print Counter(1000000).up(0);
+'''
+
+# Locals, an enclosing function's variables read through a closure, and
+# blocks with and without declarations of their own, in a hot loop.
+VARIABLE_SOURCE = '''
+fun run() {
+    var scale = 2;
+    var offset = 1;
+    var total = 0;
+    fun weigh(x) { return x * scale + offset; }
+    for (var i = 0; i < 20000; i = i + 1) {
+        {
+            total = total + weigh(i) - scale * offset;
+        }
+        if (total > 1000000) {
+            var excess = total - 1000000;
+            total = excess;
+        }
+    }
+    return total;
+}
+print run();
+'''
+
+# Nested loops whose bodies declare locals, and one whose body a closure
+# captures, which needs a frame per iteration however blocks are laid out.
+NESTED_LOOP_SOURCE = '''
+fun grid(size) {
+    var total = 0;
+    for (var row = 0; row < size; row = row + 1) {
+        var offset = row * size;
+        for (var column = 0; column < size; column = column + 1) {
+            var cell = offset + column;
+            if (cell > 10) {
+                var scaled = cell / 2;
+                total = total + scaled;
+            }
+        }
+    }
+    return total;
+}
+print grid(150);
+fun capture() {
+    var last = 0;
+    for (var i = 0; i < 1000; i = i + 1) {
+        var square = i * i;
+        fun get() { return square; }
+        last = get;
+    }
+    return last();
+}
+print capture();
+'''
+
+# Recursive top-level functions, mutually recursive ones declared after
+# their first use, and a global counter: every call reads a global.
+GLOBAL_SOURCE = '''
+var calls = 0;
+fun fib(n) {
+    calls = calls + 1;
+    if (n < 2) return n;
+    return fib(n - 1) + fib(n - 2);
+}
+fun female(n) {
+    calls = calls + 1;
+    if (n == 0) return 1;
+    return n - male(female(n - 1));
+}
+fun male(n) {
+    calls = calls + 1;
+    if (n == 0) return 0;
+    return n - female(male(n - 1));
+}
+print fib(18);
+var total = 0;
+for (var i = 0; i < 30; i = i + 1) total = total + female(i) + male(i);
+print total;
+print calls;
+'''
+
+CONSTANT_SOURCE = '''
+fun seconds() {
+    var day = 60 * 60 * 24;
+    var total = 0;
+    for (var i = 0; i < 50000; i = i + 1) {
+        total = total + day * (7 - 2) + (1 + 2) * -3;
+    }
+    return total;
+}
+print seconds();
+'''
+
+INSTANCE_SOURCE = '''
+class Particle {
+    init(x, y) {
+        this.x = x;
+        this.y = y;
+        this.alive = true;
+    }
+}
+
+var total = 0;
+for (var i = 0; i < 20000; i = i + 1) {
+    var p = Particle(i, i * 2);
+    p.x = p.x + p.y;
+    total = total + p.x;
+}
+print total;
+'''
+
+# Ten classes deep: calls to methods declared at the root, super calls that
+# go up every level, and instances created through an inherited initializer.
+HIERARCHY_SOURCE = '''
+class Level0 {
+    init(n) { this.n = n; }
+    base() { return this.n; }
+    depth() { return 0; }
+}
+''' + ''.join(f'''
+class Level{level} < Level{level - 1} {{
+    depth() {{ return super.depth() + 1; }}
+}}
+''' for level in range(1, 10)) + '''
+var total = 0;
+for (var i = 0; i < 3000; i = i + 1) {
+    var leaf = Level9(i);
+    total = total + leaf.base() + leaf.depth();
+}
+print total;
+'''
+
+
+class BoundMethodCalls(Interpreter):
+    """
+    Interpreter calling methods the way other calls are made: the GetExpr
+    binds the method, and the call runs the bound method
+    """
+    def invoke(self, expr, get):
+        return self.call_value(expr, self.evaluate(get))
+
+
+class GenericOperators(Interpreter):
+    """
+    Interpreter that never quickens: every BinaryExpr and UnaryExpr takes
+    the generic path
+    """
+    def visit_binary_expr(self, expr):
+        return self.visit_generic_binary_expr(expr)
+
+    def visit_unary_expr(self, expr):
+        return self.visit_generic_unary_expr(expr)
+
+
+class FramePerBlock(Resolver):
+    """
+    Resolver giving every block that declares variables a frame of its
+    own, as if a closure captured each of them
+    """
+    def end_scope(self):
+        if len(self.scopes[-1]) > 0:
+            self.scopes[-1].captured = True
+        return super().end_scope()
+
+
+class NamedGlobals(Interpreter):
+    """
+    Interpreter looking every global up by name, ignoring the slot the
+    resolver gave it
+    """
+    def look_up_variable(self, name, expr):
+        if expr.depth is None:
+            return self.globals.get(name)
+        return super().look_up_variable(name, expr)
+
+    def visit_assign_expr(self, expr):
+        if expr.depth is None:
+            value = self.evaluate(expr.value)
+            self.globals.assign(expr.name, value)
+            return value
+        return super().visit_assign_expr(expr)
+
+
+class DispatchCounter(Interpreter):
+    """
+    Interpreter counting every evaluate/execute, i.e. every visitor dispatch
+    """
+    def __init__(self, error_handler: LoxErrorHandler):
+        super().__init__(error_handler)
+        self.dispatches = 0
+
+    def evaluate(self, expr):
+        self.dispatches += 1
+        return expr.accept(self)
+
+    def execute(self, stmt):
+        self.dispatches += 1
+        return stmt.accept(self)
+
+
+class Benchmark:
+    BENCHMARKS = ('scanner', 'memory', 'tokens', 'interning', 'parser', 'startup', 'loops', 'optimize', 'engines', 'fusion', 'tiering',
+                  'classes', 'invoke', 'shapes',
+                  'caches', 'calls', 'tailcalls', 'quickening', 'frames', 'globals', 'escapes')
+    TOKEN_MODES = ('list', 'stream', 'compact')
+
+    @staticmethod
+    def main(args: List[str], mode: Optional[str] = None):
+        if len(args) != 1 or args[0] not in Benchmark.BENCHMARKS:
+            print(f"Usage: benchmark [{'|'.join(Benchmark.BENCHMARKS)}]")
+            exit(64)
+        if mode:
+            getattr(Benchmark, args[0])(mode=mode)
+        else:
+            getattr(Benchmark, args[0])()
+
+    @staticmethod
+    def generate_source(lines: int) -> str:
+        sample_lines = SAMPLE_SOURCE.count('\n')
+        return SAMPLE_SOURCE * max(1, lines // sample_lines)
+
+    @staticmethod
+    def best_of(repeat: int, function: Callable[[], object]) -> float:
+        best = float('inf')
+        for _ in range(repeat):
+            start = time.perf_counter()
+            function()
+            best = min(best, time.perf_counter() - start)
+        return best
+
+    @staticmethod
+    def run_lox(source_code: str, options: Optional[LoxOptions] = None) -> str:
+        """
+        Runs a whole program through Lox.run and returns what it printed
+        """
+        error_handler = LoxErrorHandler()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            options = options or LoxOptions()
+            Lox.run(error_handler, Lox.make_interpreter(error_handler, options), source_code, options=options)
+        if error_handler.HAS_ERROR or error_handler.HAS_RUNTIME_ERROR:
+            raise RuntimeError(f"Benchmark program failed:\n{output.getvalue()}")
+        return output.getvalue()
+
+    @staticmethod
+    def scanner(lines: int = 50000, repeat: int = 3):
+        source_code = Benchmark.generate_source(lines)
+        print(f"Scanning {source_code.count(chr(10))} lines, best of {repeat}")
+        for scanner_class in (Scanner, RegexScanner):
+            tokens = len(scanner_class(LoxErrorHandler(), source_code).scan_tokens())
+            elapsed = Benchmark.best_of(repeat, lambda: scanner_class(LoxErrorHandler(), source_code).scan_tokens())
+            print(f"{scanner_class.__name__:>14}: {tokens} tokens in {elapsed:.3f}s "
+                  f"({tokens / elapsed:,.0f} tokens/s)")
+
+    @staticmethod
+    def memory(lines: int = 50000, mode: Optional[str] = None):
+        """
+        Peak RSS of scanning and parsing a large script. Each token mode runs in
+        a fresh process so that one mode's peak cannot hide the other's.
+        """
+        if mode is None:
+            print(f"Peak RSS scanning and parsing {lines} lines")
+            for token_mode in Benchmark.TOKEN_MODES:
+                subprocess.run([sys.executable, '-m', 'tools.benchmark', 'memory', '--mode', token_mode], check=True)
+            return
+
+        source_code = Benchmark.generate_source(lines)
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        scanner = RegexScanner(LoxErrorHandler(), source_code)
+        if mode == 'list':
+            tokens = scanner.scan_tokens()
+        elif mode == 'compact':
+            tokens = scanner.scan_compact().stream()
+        else:
+            tokens = scanner.iter_tokens()
+        statements = Parser(LoxErrorHandler(), tokens).parse()
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        print(f"{mode:>14}: {len(statements)} statements, peak RSS {peak / 1024:.1f} MiB "
+              f"({(peak - baseline) / 1024:.1f} MiB above the loaded source)")
+
+    @staticmethod
+    def tokens(lines: int = 50000):
+        """
+        Memory held by the scanned token stream: a list of Token objects against
+        the struct-of-arrays CompactTokens.
+        """
+        source_code = Benchmark.generate_source(lines)
+        print(f"Token storage for {lines} lines")
+        for name, scan in (('List[Token]', lambda scanner: scanner.scan_tokens()),
+                           ('CompactTokens', lambda scanner: scanner.scan_compact())):
+            tracemalloc.start()
+            tokens = scan(RegexScanner(LoxErrorHandler(), source_code))
+            size, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(f"{name:>14}: {len(tokens)} tokens, {size / 2 ** 20:.1f} MiB ({size / len(tokens):.1f} bytes/token)")
+
+    @staticmethod
+    def interning(repeat: int = 15):
+        """
+        Identifier interning on and off, in every scanner. Runs alternate
+        between the two and each pair gives one relative difference, so that
+        drift in machine speed hits both alike; the median and range of the
+        differences are reported. The lookups are then timed on their own
+        over many distinct, long names, where a key that is equal but not
+        identical costs a full character comparison.
+        """
+        print(f"Gain from interning, median and range over {repeat} alternating pairs")
+        for name, source_code in (('fields', FIELD_HEAVY_SOURCE), ('methods', METHOD_HEAVY_SOURCE),
+                                  ('long names', LONG_NAMES_SOURCE)):
+            def plain() -> None:
+                with Benchmark.without_interning():
+                    Benchmark.run_lox(source_code)
+            Benchmark.report_gain(name, Benchmark.paired_gains(repeat, plain, lambda: Benchmark.run_lox(source_code)))
+
+        # The lookups themselves, with lexemes sliced out of a source the way
+        # a scanner that does not intern leaves them.
+        source_code = ' '.join(LONG_NAMES)
+        sliced = [Token(TokenType.IDENTIFIER, source_code[start:start + len(name)], None, 1)
+                  for name, start in ((name, source_code.index(name)) for name in LONG_NAMES)]
+        interned = [Token(TokenType.IDENTIFIER, intern(name), None, 1) for name in LONG_NAMES]
+        klass = LoxClass("Ledger", None, {})
+        instance = LoxInstance(klass)
+        for token in interned:
+            instance.set(token, 0.0)
+            klass.method_table[token.lexeme] = typing.cast(LoxFunction, None)
+
+        def field_lookups(tokens: List[Token]) -> Callable[[], None]:
+            def run() -> None:
+                for _ in range(5000):
+                    for token in tokens:
+                        instance.get(token)
+            return run
+
+        def method_lookups(tokens: List[Token]) -> Callable[[], None]:
+            def run() -> None:
+                for _ in range(5000):
+                    for token in tokens:
+                        klass.find_method(token.lexeme)
+            return run
+
+        for name, lookups in (('field lookups', field_lookups), ('method lookups', method_lookups)):
+            Benchmark.report_gain(name, Benchmark.paired_gains(repeat, lookups(sliced), lookups(interned)))
+
+    @staticmethod
+    @contextlib.contextmanager
+    def without_interning() -> Iterator[None]:
+        """Makes every scanner leave lexemes and string values uninterned."""
+        with contextlib.ExitStack() as stack:
+            for module in (interpreter.scanner, interpreter.regex_scanner, interpreter.compact_tokens):
+                stack.enter_context(mock.patch.object(module, 'intern', str))
+            yield
+
+    @staticmethod
+    def paired_gains(repeat: int, baseline: Callable[[], object], candidate: Callable[[], object]) -> List[float]:
+        """
+        How much faster candidate ran than baseline, best of three runs each,
+        for each of repeat alternating pairs.
+        """
+        gains = []
+        for _ in range(repeat):
+            before = Benchmark.best_of(3, baseline)
+            after = Benchmark.best_of(3, candidate)
+            gains.append((before - after) / before)
+        return gains
+
+    @staticmethod
+    def report_gain(name: str, gains: List[float]) -> None:
+        print(f"{name:>14}: {statistics.median(gains):+.1%} (range {min(gains):+.1%} to {max(gains):+.1%})")
+
+    @staticmethod
+    def parser(lines: int = 20000, repeat: int = 3):
+        """
+        Parse throughput of the recursive descent and Pratt parsers over the same
+        pre-scanned tokens, the deepest parenthesized and negated expressions
+        each survives (probed up to 10,000), and whether each parses a
+        500-deep mix of both.
+        """
+        source_code = Benchmark.generate_source(lines)
+        tokens = RegexScanner(LoxErrorHandler(), source_code).scan_tokens()
+        deep_source = 'print ' + '-(' * 500 + '1' + ')' * 500 + ';'
+        print(f"Parsing {len(tokens)} tokens, best of {repeat}")
+        for parser_class in (Parser, PrattParser):
+            elapsed = Benchmark.best_of(repeat, lambda: parser_class(LoxErrorHandler(), tokens).parse())
+            parentheses = Benchmark.max_nesting(parser_class, '(', ')')
+            negations = Benchmark.max_nesting(parser_class, '-', '')
+            deep = 'parses' if Benchmark.parses(parser_class, deep_source) else 'fails on'
+            print(f"{parser_class.__name__:>14}: {elapsed:.3f}s ({len(tokens) / elapsed:,.0f} tokens/s), "
+                  f"parses nesting up to {parentheses:,} parentheses and {negations:,} negations, "
+                  f"{deep} 500 nested -( )")
+
+    @staticmethod
+    def max_nesting(parser_class, opening: str, closing: str, limit: int = 10000) -> int:
+        low, high = 1, limit
+        while low < high:
+            depth = (low + high + 1) // 2
+            if Benchmark.parses(parser_class, opening * depth + '1' + closing * depth + ';'):
+                low = depth
+            else:
+                high = depth - 1
+        return low
+
+    @staticmethod
+    def parses(parser_class, source_code: str) -> bool:
+        """Whether parser_class parses source_code without running out of Python stack."""
+        try:
+            parser_class(LoxErrorHandler(), RegexScanner(LoxErrorHandler(), source_code).iter_tokens()).parse()
+        except RecursionError:
+            return False
+        return True
+
+    @staticmethod
+    def startup(lines: int = 20000, repeat: int = 3):
+        """
+        Wall-clock time of `lox -f script` for a large script that mostly
+        declares things, so that the front end dominates: without the cache,
+        and with a warm __loxcache__.
+        """
+        units = max(1, lines // SAMPLE_SOURCE.count('\n'))
+        source_code = ''.join(f'fun unit{idx}() {{{SAMPLE_SOURCE}}}\n' for idx in range(units))
+        with tempfile.TemporaryDirectory() as directory:
+            script = os.path.join(directory, 'startup.lox')
+            with open(script, 'w') as file:
+                file.write(source_code)
+            command = [sys.executable, '-m', 'interpreter.lox', '-f', script]
+            cold = Benchmark.best_of(repeat, lambda: subprocess.run(command + ['--no-cache'], check=True))
+            subprocess.run(command, check=True)
+            warm = Benchmark.best_of(repeat, lambda: subprocess.run(command, check=True))
+        print(f"Startup for {source_code.count(chr(10))} lines, best of {repeat}")
+        print(f"{'cold':>14}: {cold:.3f}s")
+        print(f"{'warm':>14}: {warm:.3f}s ({cold / warm:.1f}x faster)")
+
+    @staticmethod
+    def loops(repeat: int = 3):
+        """
+        A loop-heavy program where almost all time goes into visitor dispatch
+        """
+        elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(LOOP_SOURCE))
+        print(f"{'loops':>14}: {elapsed:.3f}s")
+
+    @staticmethod
+    def optimize(repeat: int = 3):
+        """
+        A loop over constant arithmetic at each -O level
+        """
+        for level in range(3):
+            options = LoxOptions(optimize=level)
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(CONSTANT_SOURCE, options))
+            print(f"{'-' + 'O' * level if level else 'no -O':>14}: {elapsed:.3f}s")
+
+    @staticmethod
+    def engines(repeat: int = 3):
+        """
+        Every execution engine on calls, loops and method calls, with its
+        speedup over the tree-walking interpreter
+        """
+        for name, source_code in (('fib', FIB_SOURCE), ('loops', LOOP_SOURCE), ('methods', METHOD_HEAVY_SOURCE)):
+            timings = [Benchmark.best_of(repeat, lambda: Benchmark.run_lox(source_code, LoxOptions(engine=engine)))
+                       for engine in LoxOptions.ENGINES]
+            print(f"{name:>14}: " + ', '.join(f"{engine} {elapsed:.3f}s ({timings[0] / elapsed:.1f}x)"
+                                             for engine, elapsed in zip(LoxOptions.ENGINES, timings)))
+
+    @staticmethod
+    def fusion(repeat: int = 3):
+        """
+        Visitor dispatches per loop iteration and run time of the tree-walker,
+        without and with the NodeFuser superinstruction pass
+        """
+        def run(source_code: str, fuse: bool, interpreter_class=Interpreter) -> Interpreter:
+            error_handler = LoxErrorHandler()
+            interpreter = interpreter_class(error_handler)
+            statements = Lox.compile(error_handler, interpreter, source_code, LoxOptions())
+            if fuse:
+                NodeFuser().fuse(statements)
+            with contextlib.redirect_stdout(io.StringIO()):
+                interpreter.interpret(statements)
+            return interpreter
+
+        for name, source_code, iterations in (('loops', LOOP_SOURCE, 100000), ('fields', METHOD_HEAVY_SOURCE, 20000)):
+            # Alternate the two so that machine noise hits both alike.
+            elapsed = {False: float('inf'), True: float('inf')}
+            for _ in range(repeat):
+                for fuse in elapsed:
+                    elapsed[fuse] = min(elapsed[fuse], Benchmark.best_of(1, lambda: run(source_code, fuse)))
+            for fuse in elapsed:
+                dispatches = run(source_code, fuse, DispatchCounter).dispatches
+                print(f"{name + (' fused' if fuse else ''):>14}: {dispatches / iterations:.1f} dispatches/iteration, "
+                      f"{elapsed[fuse]:.3f}s")
+
+
+    @staticmethod
+    def tiering(repeat: int = 3):
+        """
+        The tree-walker without and with tiered execution at the default
+        thresholds, and what got compiled
+        """
+        for name, source_code in (('fib', FIB_SOURCE), ('loops', LOOP_SOURCE), ('methods', METHOD_HEAVY_SOURCE)):
+            tree = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(source_code, LoxOptions()))
+            tiered = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(source_code, LoxOptions(tier=True)))
+            error_handler = LoxErrorHandler()
+            interpreter = Lox.make_interpreter(error_handler, LoxOptions(tier=True))
+            with contextlib.redirect_stdout(io.StringIO()):
+                Lox.run(error_handler, interpreter, source_code)
+            print(f"{name:>14}: tree {tree:.3f}s, tiered {tiered:.3f}s ({tree / tiered:.1f}x)")
+            print(interpreter.tiering.report())
+
+    @staticmethod
+    def classes(repeat: int = 3):
+        """
+        Method lookup in a ten-level class hierarchy: the flattened
+        method table against walking the superclass chain, and the
+        hierarchy program on each engine
+        """
+        def walk_chain(klass: LoxClass, name: str):
+            while klass is not None:
+                if name in klass.methods:
+                    return klass.methods[name]
+                klass = klass.superclass
+            return None
+
+        leaf = LoxClass("Level0", None, {"base": None})
+        for level in range(1, 10):
+            leaf = LoxClass(f"Level{level}", leaf, dict())
+        lookups = 100000
+        walked = Benchmark.best_of(repeat, lambda: [walk_chain(leaf, "base") for _ in range(lookups)])
+        flat = Benchmark.best_of(repeat, lambda: [leaf.find_method("base") for _ in range(lookups)])
+        print(f"{'lookup':>14}: chain walk {walked / lookups * 1e9:.0f}ns, method table "
+              f"{flat / lookups * 1e9:.0f}ns ({walked / flat:.1f}x)")
+        for engine in LoxOptions.ENGINES:
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(HIERARCHY_SOURCE, LoxOptions(engine=engine)))
+            print(f"{engine:>14}: {elapsed:.3f}s")
+
+    @staticmethod
+    def invoke(repeat: int = 3):
+        """
+        Environments and functions allocated per method call, and run time,
+        with methods bound on every call and with calls made as invokes
+        """
+        def run(interpreter_class) -> Interpreter:
+            error_handler = LoxErrorHandler()
+            interpreter = interpreter_class(error_handler)
+            statements = Lox.compile(error_handler, interpreter, METHOD_HEAVY_SOURCE, LoxOptions())
+            with contextlib.redirect_stdout(io.StringIO()):
+                interpreter.interpret(statements)
+            return interpreter
+
+        # Three method calls per loop iteration.
+        calls = 20000 * 3
+        for name, interpreter_class in (('bound', BoundMethodCalls), ('invoke', Interpreter)):
+            with mock.patch.object(Environment, '__init__', autospec=True, side_effect=Environment.__init__) as environments, \
+                    mock.patch.object(LoxFunction, '__init__', autospec=True, side_effect=LoxFunction.__init__) as functions:
+                run(interpreter_class)
+            elapsed = Benchmark.best_of(repeat, lambda: run(interpreter_class))
+            print(f"{name:>14}: {environments.call_count / calls:.2f} environments and "
+                  f"{functions.call_count / calls:.2f} functions per call, {elapsed:.3f}s")
+
+    @staticmethod
+    def shapes(instances: int = 20000, repeat: int = 3):
+        """
+        Memory per instance with three fields, field get and set throughput,
+        and an instantiation-heavy program on each engine that uses LoxInstance
+        """
+        klass = LoxClass("Particle", None, {})
+        names = [Token(TokenType.IDENTIFIER, intern(name), None, 1) for name in ("x", "y", "alive")]
+        tracemalloc.start()
+        objects = []
+        for i in range(instances):
+            instance = LoxInstance(klass)
+            for name in names:
+                instance.set(name, float(i))
+            objects.append(instance)
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        # The list holding them is not part of any instance.
+        size -= sys.getsizeof(objects)
+        print(f"{'memory':>14}: {size / instances:.0f} bytes per instance with 3 fields")
+
+        instance, name = objects[0], names[1]
+        lookups = 200000
+        get = min(timeit.repeat(lambda: instance.get(name), number=lookups, repeat=repeat))
+        set_ = min(timeit.repeat(lambda: instance.set(name, 1.0), number=lookups, repeat=repeat))
+        print(f"{'get / set':>14}: {lookups / get / 1e6:.1f}M gets/s, {lookups / set_ / 1e6:.1f}M sets/s")
+        for engine in ('tree', 'closure', 'vm'):
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(INSTANCE_SOURCE, LoxOptions(engine=engine)))
+            print(f"{engine:>14}: {elapsed:.3f}s")
+
+    @staticmethod
+    def caches(repeat: int = 3):
+        """
+        Property-heavy programs on the engines with inline caches, and how
+        their caches did
+        """
+        for name, source_code in (('fields', FIELD_HEAVY_SOURCE), ('methods', METHOD_HEAVY_SOURCE),
+                                  ('instances', INSTANCE_SOURCE), ('hierarchy', HIERARCHY_SOURCE)):
+            for engine in ('tree', 'closure'):
+                options = LoxOptions(engine=engine)
+                elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(source_code, options))
+                error_handler = LoxErrorHandler()
+                interpreter = Lox.make_interpreter(error_handler, options)
+                with contextlib.redirect_stdout(io.StringIO()):
+                    Lox.run(error_handler, interpreter, source_code, options=options)
+                hits = sum(cache.hits for cache in interpreter.inline_caches)
+                misses = sum(cache.misses for cache in interpreter.inline_caches)
+                print(f"{name + ' ' + engine:>18}: {elapsed:.3f}s, {hits} hits, {misses} misses")
+
+    @staticmethod
+    def calls(repeat: int = 3):
+        """
+        Time per Lox call in fib(20), where every call returns, on the engines
+        that run returns as Completion signals
+        """
+        # fib(20) makes 21891 calls.
+        calls = 21891
+        for name, options in (('tree', LoxOptions()), ('closure', LoxOptions(engine='closure')),
+                              ('tree --tier', LoxOptions(tier=True)), ('vm', LoxOptions(engine='vm')),
+                              ('transpile', LoxOptions(engine='transpile'))):
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(FIB_SOURCE, options))
+            print(f"{name:>14}: {elapsed:.3f}s, {elapsed / calls * 1e6:.1f}us per call")
+
+    @staticmethod
+    def tailcalls():
+        """
+        Million-iteration tail-recursive loops, self-recursive, mutually
+        recursive and through a method, which only finish because tail calls
+        run in constant Python stack
+        """
+        # Each loop makes a million tail calls.
+        calls = 3 * 1000000
+        for name, options in (('tree', LoxOptions()), ('closure', LoxOptions(engine='closure')),
+                              ('tree --tier', LoxOptions(tier=True)), ('vm', LoxOptions(engine='vm')),
+                              ('transpile', LoxOptions(engine='transpile'))):
+            start = time.perf_counter()
+            output = Benchmark.run_lox(TAIL_CALL_SOURCE, options)
+            elapsed = time.perf_counter() - start
+            if output.split() != ['1000000', 'True', '1000000']:
+                print(f"{name:>14}: wrong output {output!r}")
+                continue
+            print(f"{name:>14}: {elapsed:.3f}s, {elapsed / calls * 1e6:.2f}us per tail call")
+
+    @staticmethod
+    def quickening(repeat: int = 3):
+        """
+        Numeric programs on the tree-walker with generic operators and with
+        quickened ones, and what got quickened
+        """
+        def run(source_code: str, interpreter_class) -> Interpreter:
+            error_handler = LoxErrorHandler()
+            interpreter = interpreter_class(error_handler)
+            statements = Lox.compile(error_handler, interpreter, source_code, LoxOptions())
+            with contextlib.redirect_stdout(io.StringIO()):
+                interpreter.interpret(statements)
+            return interpreter
+
+        for name, source_code in (('loops', LOOP_SOURCE), ('fib', FIB_SOURCE)):
+            # Alternate the two so that machine noise hits both alike.
+            elapsed = {GenericOperators: float('inf'), Interpreter: float('inf')}
+            for _ in range(repeat):
+                for interpreter_class in elapsed:
+                    elapsed[interpreter_class] = min(elapsed[interpreter_class],
+                                                     Benchmark.best_of(1, lambda: run(source_code, interpreter_class)))
+            generic, quickened = elapsed[GenericOperators], elapsed[Interpreter]
+            print(f"{name:>14}: generic {generic:.3f}s, quickened {quickened:.3f}s ({generic / quickened:.2f}x)")
+            print(run(source_code, Interpreter).quickening.report())
+
+    @staticmethod
+    def frames(repeat: int = 3):
+        """
+        Frames allocated per loop iteration and run time of a variable- and
+        closure-heavy program, on the engines that use Environment frames
+        """
+        iterations = 20000
+        for name, options in (('tree', LoxOptions()), ('closure', LoxOptions(engine='closure')),
+                              ('tree --tier', LoxOptions(tier=True)), ('vm', LoxOptions(engine='vm')),
+                              ('transpile', LoxOptions(engine='transpile'))):
+            with mock.patch.object(Environment, '__init__', autospec=True, side_effect=Environment.__init__) as frames:
+                Benchmark.run_lox(VARIABLE_SOURCE, options)
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(VARIABLE_SOURCE, options))
+            print(f"{name:>14}: {frames.call_count / iterations:.2f} frames per iteration, {elapsed:.3f}s")
+
+    @staticmethod
+    def globals(repeat: int = 3):
+        """
+        Recursive top-level functions with globals looked up by name and by
+        slot on the tree-walker, and by slot on the other frame-based engines
+        """
+        def run(interpreter_class) -> str:
+            error_handler = LoxErrorHandler()
+            interpreter = interpreter_class(error_handler)
+            statements = Lox.compile(error_handler, interpreter, GLOBAL_SOURCE, LoxOptions())
+            output = io.StringIO()
+            with contextlib.redirect_stdout(output):
+                interpreter.interpret(statements)
+            return output.getvalue()
+
+        if run(NamedGlobals) != run(Interpreter):
+            print("named and slot-indexed globals disagree")
+            return
+        # Alternate the two so that machine noise hits both alike.
+        elapsed = {NamedGlobals: float('inf'), Interpreter: float('inf')}
+        for _ in range(repeat):
+            for interpreter_class in elapsed:
+                elapsed[interpreter_class] = min(elapsed[interpreter_class],
+                                                 Benchmark.best_of(1, lambda: run(interpreter_class)))
+        named, slotted = elapsed[NamedGlobals], elapsed[Interpreter]
+        print(f"{'tree':>14}: by name {named:.3f}s, by slot {slotted:.3f}s ({named / slotted:.2f}x)")
+        for name, options in (('closure', LoxOptions(engine='closure')), ('tree --tier', LoxOptions(tier=True))):
+            elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(GLOBAL_SOURCE, options))
+            print(f"{name:>14}: {elapsed:.3f}s")
+
+        # The lookups themselves, without the rest of the interpreter around them.
+        environment = GlobalEnvironment()
+        for name in ('clock', 'calls', 'fib', 'female', 'male', 'total'):
+            environment.define(name, 0.0)
+        token = Token(TokenType.IDENTIFIER, 'male', None, 1)
+        idx = environment.slot('male')
+        for label, lookup in (('by name', lambda: environment.get(token)),
+                              ('by slot', lambda: environment.get_slot(idx, token))):
+            elapsed = min(timeit.repeat(lookup, number=200000, repeat=repeat))
+            print(f"{label:>14}: {elapsed / 200000 * 1e9:.0f} ns per global lookup")
+
+    @staticmethod
+    def escapes(repeat: int = 3):
+        """
+        Frames allocated and run time of loop-heavy programs when every block
+        that declares variables gets a frame, and when only blocks a closure
+        captures from do, on the engines that use Environment frames
+        """
+        for program, source_code in (('loops', LOOP_SOURCE), ('variables', VARIABLE_SOURCE),
+                                     ('nested', NESTED_LOOP_SOURCE)):
+            for name, options in (('tree', LoxOptions()), ('closure', LoxOptions(engine='closure')),
+                                  ('tree --tier', LoxOptions(tier=True))):
+                results = []
+                for resolver_class in (FramePerBlock, Resolver):
+                    with mock.patch('interpreter.lox.Resolver', resolver_class):
+                        with mock.patch.object(Environment, '__init__', autospec=True,
+                                               side_effect=Environment.__init__) as frames:
+                            output = Benchmark.run_lox(source_code, options)
+                        elapsed = Benchmark.best_of(repeat, lambda: Benchmark.run_lox(source_code, options))
+                    results.append((output, frames.call_count, elapsed))
+                (before_output, before, before_time), (after_output, after, after_time) = results
+                if before_output != after_output:
+                    print(f"{program + ' ' + name:>22}: outputs differ")
+                    continue
+                print(f"{program + ' ' + name:>22}: {before} frames, {before_time:.3f}s per block; "
+                      f"{after} frames, {after_time:.3f}s escape-analyzed")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('benchmark', choices=Benchmark.BENCHMARKS)
+    parser.add_argument('--mode', choices=Benchmark.TOKEN_MODES, required=False)
+    args = parser.parse_args()
+    Benchmark.main([args.benchmark], args.mode)
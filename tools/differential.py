@@ -0,0 +1,737 @@
+import argparse
+import contextlib
+import io
+from typing import Dict, List, Tuple
+
+from interpreter.lox import Lox
+from interpreter.lox_error_handler import LoxErrorHandler
+from interpreter.lox_options import LoxOptions
+
+# Programs every engine must run identically, including their runtime errors.
+CORPUS: Dict[str, str] = {
+    'arithmetic': '''
+print 1 + 2 * 3 - 4 / 8;
+print -(3 - 5);
+print 10 / 4;
+print 1 + "a";
+print "n" + 2.5;
+print "ab" + "cd";
+print !nil;
+print !0;
+print 1 == 1;
+print nil == false;
+print "abc" < "abcd";
+print "b" > "aa";
+print 3 >= 3;
+print 2 <= 1;
+print 1 != 2;
+''',
+    'logic': '''
+print nil or "default";
+print false and 1;
+print 1 and 2;
+print false or nil;
+var hits = 0;
+fun hit() { hits = hits + 1; return true; }
+print false and hit();
+print true or hit();
+print hits;
+''',
+    'control': '''
+var total = 0;
+for (var i = 0; i < 10; i = i + 1) {
+    if (i == 7) break;
+    total = total + i;
+}
+print total;
+var n = 0;
+while (true) { n = n + 1; if (n > 5) break; }
+print n;
+var s = 0;
+for (var j = 0; j < 5; j = j + 1) for (var k = 0; k < 5; k = k + 1) { if (k > j) break; s = s + 1; }
+print s;
+if (0) print "zero is truthy"; else print "no";
+''',
+    'functions': '''
+fun fib(n) { if (n < 2) return n; return fib(n - 1) + fib(n - 2); }
+print fib(15);
+fun noReturn() {}
+print noReturn();
+fun early(x) { while (true) { { if (x > 3) return x; } x = x + 1; } }
+print early(0);
+print fib;
+print clock;
+var sq = fun (x) { return x * x; };
+print sq(7);
+''',
+    'closures': '''
+fun makeCounter() {
+    var i = 0;
+    fun count() { i = i + 1; return i; }
+    return count;
+}
+var c1 = makeCounter();
+var c2 = makeCounter();
+print c1();
+print c1();
+print c2();
+fun adder(n) { fun add(m) { return n + m; } return add; }
+print adder(3)(4);
+var a = "global";
+{
+    fun showA() { print a; }
+    showA();
+    var a = "block";
+    print a;
+    showA();
+}
+fun shared() {
+    var x = 1;
+    fun get() { return x; }
+    fun set(v) { x = v; return x; }
+    print get();
+    print set(5);
+    print get();
+    return get;
+}
+print shared()();
+var first = 0;
+var second = 0;
+for (var i = 0; i < 2; i = i + 1) {
+    var j = i * 10;
+    fun capture() { return j; }
+    if (i == 0) first = capture; else second = capture;
+}
+print first();
+print second();
+fun breakOut() {
+    var result = 0;
+    while (true) {
+        var kept = "kept";
+        fun keep() { return kept; }
+        result = keep;
+        break;
+    }
+    return result;
+}
+print breakOut()();
+''',
+    'returns': '''
+fun find(limit) {
+    for (var i = 0; i < limit; i = i + 1) {
+        for (var j = 0; j < limit; j = j + 1) {
+            if (i * j == 6) { { return i * 10 + j; } }
+            if (j > i) break;
+        }
+    }
+    return -1;
+}
+print find(5);
+print find(2);
+fun firstBreak() {
+    var n = 0;
+    while (true) {
+        while (true) { n = n + 1; if (n > 2) break; }
+        if (n > 2) break;
+    }
+    return n;
+}
+print firstBreak();
+fun implicit(x) { if (x) { print "then"; } else { print "else"; } }
+print implicit(true);
+print implicit(false);
+class Early { init(x) { this.x = x; if (x) return; this.x = "late"; } }
+print Early(1).x;
+print Early(false).x;
+fun countdown(n) { while (n > 0) { if (n == 3) return "three"; n = n - 1; } return "none"; }
+print countdown(10);
+print countdown(2);
+''',
+    'quickening': '''
+fun add(a, b) { return a + b; }
+fun less(a, b) { return a < b; }
+fun same(a, b) { return a == b; }
+fun neg(x) { return -x; }
+for (var i = 0; i < 3; i = i + 1) {
+    print add(i, 1);
+    print less(i, 1);
+    print same(i, 1);
+    print neg(i);
+}
+print add("to", "gether");
+print add("n", 1);
+print add(2, 3);
+print less("abc", "de");
+print less(1, 2);
+print same("a", "a");
+print same(nil, false);
+print same(2, 2);
+fun ratio(a, b) { return a / b; }
+print ratio(6, 3);
+print ratio(1, 4);
+''',
+    'error_quickened_negate': '''
+fun neg(x) { return -x; }
+print neg(1);
+print neg("one");
+''',
+    'tailcalls': '''
+fun sum(n, total) { if (n == 0) return total; return sum(n - 1, total + n); }
+print sum(500, 0);
+fun ping(n) { if (n == 0) return "ping"; return pong(n - 1); }
+fun pong(n) { if (n == 0) return "pong"; return ping(n - 1); }
+print ping(301);
+class Node {
+    init(value, next) { this.value = value; this.next = next; }
+    last() { if (this.next == false) return this.value; return this.next.last(); }
+    make(value) { return Node(value, this); }
+}
+var list = Node(1, false).make(2).make(3);
+print list.last();
+var last = list.last;
+fun callIt(f) { return f(); }
+print callIt(last);
+fun adder(n) { fun add(x) { return x + n; } return add; }
+fun apply(n) { return adder(n)(1); }
+print apply(41);
+class Box { init(f) { this.f = f; } run(x) { return this.f(x); } }
+print Box(adder(10)).run(5);
+fun inLoop(n) { while (true) { return sum(n, 0); } }
+print inLoop(4);
+''',
+    'globals': '''
+fun early() { return later() + counter; }
+fun later() { return 1; }
+var counter = 10;
+print early();
+counter = counter + 5;
+print early();
+fun later() { return 100; }
+print early();
+var counter = "re";
+fun greet() { return counter + "defined"; }
+print greet();
+class Late { get() { return Helper().value(); } }
+class Helper { value() { return "late class"; } }
+print Late().get();
+{
+    var counter = 1;
+    print counter;
+}
+print counter;
+''',
+    'error_global_declared_later': 'fun f() {\n  return later;\n}\nprint 1;\nprint f();\nvar later = 2;\n',
+    'escapes': '''
+fun collect() {
+    var last = 0;
+    for (var i = 0; i < 3; i = i + 1) {
+        var doubled = i * 2;
+        fun get() { return doubled; }
+        if (i == 1) last = get;
+    }
+    return last;
+}
+print collect()();
+fun hoisted() {
+    var total = 0;
+    for (var i = 0; i < 5; i = i + 1) {
+        var square = i * i;
+        { var cube = square * i; total = total + cube; }
+    }
+    { var a = 1; total = total + a; }
+    { var b = 2; total = total + b; }
+    return total;
+}
+print hoisted();
+fun shadow() {
+    var x = "outer";
+    { var x = "inner"; print x; }
+    return x;
+}
+print shadow();
+fun counter() {
+    var count = 0;
+    { fun bump() { count = count + 1; return count; } bump(); bump(); print count; }
+    return count;
+}
+print counter();
+fun factorials() {
+    var result = 0;
+    for (var n = 1; n < 4; n = n + 1) {
+        fun fact(k) { if (k <= 1) return 1; return k * fact(k - 1); }
+        result = result + fact(n);
+    }
+    return result;
+}
+print factorials();
+fun classy() {
+    var greeting = "hi";
+    { var name = "box"; class Box { label() { return name + greeting; } } print Box().label(); }
+    { var other = 3; print other; }
+    return greeting;
+}
+print classy();
+var sum = 0;
+for (var i = 0; i < 4; i = i + 1) { var j = i + 1; { var k = j * 2; sum = sum + k; } }
+print sum;
+while (sum > 0) { var step = 7; sum = sum - step; }
+print sum;
+''',
+    'classes': '''
+class Animal {
+    init(name) { this.name = name; }
+    speak() { return this.name + " makes a sound"; }
+}
+class Dog < Animal {
+    init(name, breed) { super.init(name); this.breed = breed; }
+    speak() { return this.name + " barks"; }
+    both() { return super.speak() + " / " + this.speak(); }
+}
+var d = Dog("Rex", "lab");
+print d.speak();
+print d.both();
+print d.breed;
+print d;
+print Dog;
+print d.speak;
+var m = d.speak;
+print m();
+d.speak = "field shadows";
+print d.speak;
+class Box { init() { this.v = 1; return; } get() { return this.v; } }
+print Box().get();
+print Box().init().get();
+class Chain { init() { this.n = 0; } inc() { this.n = this.n + 1; return this; } }
+print Chain().inc().inc().inc().n;
+class A { method() { return "A"; } }
+class B < A { method() { return "B"; } test() { return super.method(); } }
+class C < B {}
+print C().test();
+print C().method();
+class Outer {
+    method() {
+        fun inner() { return this; }
+        return inner();
+    }
+}
+print Outer().method();
+{
+    class Local { get() { return "local class"; } }
+    print Local().get();
+}
+''',
+    'fused': '''
+{
+    var s = "a";
+    s = s + 1;
+    s = s + 2;
+    print s;
+    var t = "abc";
+    print t < "abcd";
+    print t == "abc";
+    var n = 3;
+    n = n - 1;
+    print n;
+    print n != n;
+    var m = 2;
+    print n >= m;
+    class Counter {
+        init() { this.count = 0; this.label = "c"; }
+        bump() { this.count = this.count + 1; this.label = this.label + 1; return this; }
+    }
+    var c = Counter();
+    c.bump().bump();
+    print c.count;
+    print c.label;
+    c.count = c.count * 10;
+    print c.count;
+    c.extra = 1;
+    c.bump = c.bump + "x";
+    print c.bump;
+}
+''',
+    'scopes': '''
+fun outer() {
+    var x = 1;
+    fun middle() {
+        fun inner() { x = x + 1; return x; }
+        return inner;
+    }
+    return middle();
+}
+var f = outer();
+print f();
+print f();
+fun collect() {
+    var a = 0; var b = 0; var c = 0;
+    for (var i = 0; i < 3; i = i + 1) {
+        var k = i;
+        fun get() { return k * 10 + i; }
+        if (i == 0) a = get; else if (i == 1) b = get; else c = get;
+    }
+    print a(); print b(); print c();
+}
+collect();
+fun makeClass(greeting) {
+    class Greeter {
+        init(name) { this.name = name; }
+        greet() { return greeting + ", " + this.name; }
+    }
+    return Greeter;
+}
+print makeClass("hi")("bob").greet();
+class Base { hello() { return "base"; } }
+class Derived < Base {
+    hello() {
+        fun later() { return super.hello() + "!"; }
+        return later;
+    }
+}
+print Derived().hello()();
+var n = 3;
+if (n == 1) print "one"; else if (n == 2) print "two"; else if (n == 3) print "three"; else print "many";
+{
+    var shadow = 1;
+    { var shadow = 2; print shadow; }
+    print shadow;
+}
+var inst = Base();
+inst.f = fun (q) { return q * 2; };
+print inst.f(4);
+print anon_func;
+''',
+    'inheritance': '''
+class A { init(x) { this.x = x; } who() { return "A"; } get() { return this.x; } }
+class B < A { who() { return "B" + super.who(); } }
+class C < B {}
+class D < C { init() { super.init(4); } who() { return "D" + super.who(); } }
+print C(1).get();
+print C(2).who();
+print D().who();
+print D().get();
+print D().init().get();
+print D().who;
+''',
+    'error_inherited_arity': 'class A {\n  init(a, b) {\n    this.a = a + b;\n  }\n}\nclass B < A {}\nB(1);\n',
+    # Fields set in different orders, and enough of them, and enough
+    # different ones, to take instances past the shape limits.
+    'shapes': '''
+class P {}
+var a = P(); a.x = 1; a.y = 2;
+var b = P(); b.y = 3; b.x = 4;
+print a.x + a.y * 10;
+print b.x + b.y * 10;
+b.x = a.y;
+print b.x;
+var wide = P();
+''' + ''.join(f'wide.f{i} = {i};\n' for i in range(80)) + '''print wide.f0 + wide.f42 + wide.f79;
+wide.f42 = "s";
+print wide.f42;
+''' + ''.join(f'var p{i} = P(); p{i}.k{i} = {i}; p{i}.x = {i};\n' for i in range(20)) + '''print p3.k3 + p19.k19 + p19.x;
+p19.later = "added";
+print p19.later;
+''',
+    'error_fused_increment': '{\n  var b = true;\n  b = b + 1;\n}\n',
+    'error_fused_compare': '{\n  var b = true;\n  print b < 1;\n}\n',
+    'error_fused_field': 'class A {}\nvar a = A();\na.x = 1;\na.x = a.x + "s" + nil;\n',
+    'error_fused_missing_field': 'class A {}\nvar a = A();\na.x = a.x + 1;\n',
+    'operand_reassigned': '{\n  var a = 1;\n  print a + (a = 2);\n}\n',
+    'operand_reassigned_subtract': '{\n  var b = 10;\n  print b - (b = 1);\n}\n',
+    'operand_reassigned_by_call': 'var a = 1;\nfun f() {\n  a = "s";\n  return 1;\n}\nprint a + f();\n',
+    'set_object_reassigned': '''
+class Box {}
+var first = Box();
+var second = Box();
+var target = first;
+target.label = (target = second);
+print first.label == second;
+fun swap() { target = first; return "swapped"; }
+target.name = swap();
+print second.name;
+''',
+    'break_in_callee': '''
+fun stop(i) {
+    if (i == 3) break;
+    return i;
+}
+for (var i = 0; i < 10; i = i + 1) {
+    print stop(i);
+}
+print "after";
+fun outer() {
+    var n = 0;
+    while (true) {
+        n = n + 1;
+        stop(n);
+    }
+    return n;
+}
+print outer();
+fun through(i) { return stop(i); }
+var k = 0;
+while (k < 10) { k = k + 1; through(k); print k; }
+print "done";
+fun stopAt(n, i) { if (i == n) break; }
+fun collect() {
+    var keep = 0;
+    for (var i = 0; i < 5; i = i + 1) {
+        var captured = i * 10;
+        fun get() { return captured; }
+        keep = get;
+        stopAt(2, i);
+    }
+    return keep;
+}
+print collect()();
+class Stopper {
+    check(i) { if (i > 1) break; return i; }
+}
+var stopper = Stopper();
+var seen = 0;
+while (true) { seen = seen + 1; print stopper.check(seen); }
+print seen;
+var count = 0;
+while (count < 5 and stopAt(3, count = count + 1) == nil) print count;
+print count;
+''',
+    'break_top_level_block': '{ print 1; break; print 2; }\nprint 3;\n',
+    'break_escapes_top_level': 'fun f() { print "in"; break; }\nf();\nprint "after";\n',
+    'long_chain': '''
+var x = 1;
+print x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x;
+var s = "a";
+print s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s + s;
+fun one() { return 1; }
+print one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one() + one();
+print ((((((((((((((((((((((((((((((((((((((((((((((((((((((((((((1 + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1) + 1);
+print nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or nil or "last";
+print true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true and true;
+print ------------------------------------------------------------1;
+var i = 0;
+while (i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i + i < 200) i = i + 1;
+print i;
+if (x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x == 1) print "no"; else if (x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x == 40) print "yes";
+class B {}
+var b = B();
+b.f = x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x;
+print b.f;
+fun r() { return x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x; }
+print r();
+x = x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x;
+print x;
+{ var y = 2; y = y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y + y; print y; }
+print x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + x + nil;
+''',
+    'deep_loop_nesting': '''
+for (var i0 = 0; i0 < 1; i0 = i0 + 1) {
+    for (var i1 = 0; i1 < 1; i1 = i1 + 1) {
+        for (var i2 = 0; i2 < 1; i2 = i2 + 1) {
+            for (var i3 = 0; i3 < 1; i3 = i3 + 1) {
+                for (var i4 = 0; i4 < 1; i4 = i4 + 1) {
+                    for (var i5 = 0; i5 < 1; i5 = i5 + 1) {
+                        for (var i6 = 0; i6 < 1; i6 = i6 + 1) {
+                            for (var i7 = 0; i7 < 1; i7 = i7 + 1) {
+                                for (var i8 = 0; i8 < 1; i8 = i8 + 1) {
+                                    for (var i9 = 0; i9 < 1; i9 = i9 + 1) {
+                                        print 1;
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+fun f() { return 1; }
+for (var i0 = 0; i0 < 1; i0 = i0 + 1) {
+    for (var i1 = 0; i1 < 1; i1 = i1 + 1) {
+        for (var i2 = 0; i2 < 1; i2 = i2 + 1) {
+            for (var i3 = 0; i3 < 1; i3 = i3 + 1) {
+                for (var i4 = 0; i4 < 1; i4 = i4 + 1) {
+                    for (var i5 = 0; i5 < 1; i5 = i5 + 1) {
+                        for (var i6 = 0; i6 < 1; i6 = i6 + 1) {
+                            for (var i7 = 0; i7 < 1; i7 = i7 + 1) {
+                                for (var i8 = 0; i8 < 1; i8 = i8 + 1) {
+                                    for (var i9 = 0; i9 < 1; i9 = i9 + 1) {
+                                        print f();
+                                    }
+                                }
+                            }
+                        }
+                    }
+                }
+            }
+        }
+    }
+}
+''',
+    'deeper_loop_nesting': '''
+fun f() { return 3; }
+for (var i0 = 0; i0 < 1; i0 = i0 + 1) {
+    for (var i1 = 0; i1 < 1; i1 = i1 + 1) {
+        for (var i2 = 0; i2 < 1; i2 = i2 + 1) {
+            for (var i3 = 0; i3 < 1; i3 = i3 + 1) {
+                for (var i4 = 0; i4 < 1; i4 = i4 + 1) {
+                    for (var i5 = 0; i5 < 1; i5 = i5 + 1) {
+                        for (var i6 = 0; i6 < 1; i6 = i6 + 1) {
+                            for (var i7 = 0; i7 < 1; i7 = i7 + 1) {
+                                for (var i8 = 0; i8 < 1; i8 = i8 + 1) {
+                                    for (var i9 = 0; i9 < 1; i9 = i9 + 1) {
+                                        for (var i10 = 0; i10 < 1; i10 = i10 + 1) {
+                                            for (var i11 = 0; i11 < 1; i11 = i11 + 1) {
+                                                for (var i12 = 0; i12 < 1; i12 = i12 + 1) {
+                                                    for (var i13 = 0; i13 < 1; i13 = i13 + 1) {
+                                                        for (var i14 = 0; i14 < 1; i14 = i14 + 1) {
+                                                            for (var i15 = 0; i15 < 1; i15 = i15 + 1) {
+                                                                for (var i16 = 0; i16 < 1; i16 = i16 + 1) {
+                                                                    for (var i17 = 0; i17 < 1; i17 = i17 + 1) {
+                                                                        for (var i18 = 0; i18 < 1; i18 = i18 + 1) {
+                                                                            for (var i19 = 0; i19 < 1; i19 = i19 + 1) {
+                                                                                for (var i20 = 0; i20 < 1; i20 = i20 + 1) {
+                                                                                    for (var i21 = 0; i21 < 1; i21 = i21 + 1) {
+                                                                                        for (var i22 = 0; i22 < 1; i22 = i22 + 1) {
+                                                                                            for (var i23 = 0; i23 < 1; i23 = i23 + 1) {
+                                                                                                for (var i24 = 0; i24 < 1; i24 = i24 + 1) {
+print f();
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+}
+''',
+    'tail_calls_deep': '''
+fun count(i, total) {
+    if (i == 0) return total;
+    return count(i - 1, total + 1);
+}
+print count(3000, 0);
+fun isEven(n) { if (n == 0) return true; return isOdd(n - 1); }
+fun isOdd(n) { if (n == 0) return false; return isEven(n - 1); }
+print isEven(3001);
+class Counter {
+    init(limit) { this.limit = limit; }
+    up(i) { if (i == this.limit) return i; return this.up(i + 1); }
+}
+print Counter(3000).up(0);
+class Sub < Counter { up(i) { if (i == this.limit) return "sub"; return super.up(i); } }
+print Sub(5).up(0);
+fun makeAdder(n) { fun add(x) { return x + n; } return add; }
+fun viaClosure(n) { var k = n; fun get() { return k; } if (n == 0) return get; return viaClosure(n - 1); }
+print viaClosure(10)();
+fun native() { return clock(); }
+print native() > 0;
+class Empty {}
+fun make() { return Empty(); }
+print make();
+fun mk() { return Counter(3); }
+print mk().limit;
+fun bad() { return 3(); }
+fun arity() { return count(1); }
+fun stopper(i) { if (i == 2) break; return i; }
+fun relay(i) { return stopper(i); }
+for (var i = 0; i < 5; i = i + 1) print relay(i);
+print "after";
+print arity();
+''',
+    'error_add': 'print 1;\nprint true + 1;\n',
+    'error_operands': 'var x = "a";\nprint x - 1;\n',
+    'error_operand': 'print -"a";\n',
+    'error_divide': 'fun f(a) {\n  return a / 0;\n}\nprint f(3);\n',
+    'error_undefined': 'print 1;\nprint missing;\n',
+    'error_assign_undefined': 'missing = 1;\n',
+    'error_undefined_in_function': 'fun f() {\n  print 1;\n  return missing;\n}\nf();\n',
+    'error_assign_undefined_in_function': 'fun f() {\n  missing = 1;\n}\nf();\n',
+    'error_call': 'var x = 1;\nx();\n',
+    'error_arity': 'fun f(a, b) {}\nf(1);\n',
+    'error_class_arity': 'class A {}\nA(1);\n',
+    'error_property': 'class A {}\nprint A().missing;\n',
+    'error_get_non_instance': 'var x = 1;\nprint x.y;\n',
+    'error_set_non_instance': 'var x = 1;\nx.y = missing;\n',
+    'error_super_non_class': 'var NotClass = 1;\nclass A < NotClass {}\n',
+    'error_nil_var': 'var x = nil;\n',
+    'error_uninitialized_local': '{\n  var x;\n  print x;\n}\n',
+    'error_deep_line': 'fun f(n) {\n  if (n == 0) {\n    return nil + 1;\n  }\n  return f(n - 1);\n}\nf(5);\n',
+    'error_stack_overflow': 'fun f(n) {\n  return 1 + f(n + 1);\n}\nprint 1;\nprint f(0);\n',
+    'error_static': 'fun f() {\n  var unused = 1;\n}\n',
+}
+
+
+class Differential:
+    """
+    Runs Lox programs on every execution engine and reports any difference
+    in what they print or in whether they fail, compared to the tree-walking
+    Interpreter, at every optimization level. The tree-walker also runs
+    with tiering at thresholds low enough that functions and loops get
+    compiled while the program runs.
+    """
+    OPTIMIZE_LEVELS = (0, 1, 2)
+    TIER_CALLS = 2
+    TIER_LOOPS = 3
+
+    @staticmethod
+    def run(source_code: str, engine: str, optimize: int = 0, tier: bool = False) -> Tuple[str, bool, bool]:
+        error_handler = LoxErrorHandler()
+        options = LoxOptions(engine=engine, optimize=optimize, tier=tier, tier_calls=Differential.TIER_CALLS,
+                             tier_loops=Differential.TIER_LOOPS)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            Lox.run(error_handler, Lox.make_interpreter(error_handler, options), source_code, options=options)
+        return output.getvalue(), error_handler.HAS_ERROR, error_handler.HAS_RUNTIME_ERROR
+
+    @staticmethod
+    def main(paths: List[str]) -> int:
+        programs: Dict[str, str] = dict(CORPUS)
+        for path in paths:
+            with open(path, 'r') as file:
+                programs[path] = file.read()
+
+        failures = 0
+        reference = (LoxOptions.ENGINES[0], 0, False)
+        configurations = [(engine, optimize, False) for engine in LoxOptions.ENGINES
+                          for optimize in Differential.OPTIMIZE_LEVELS if (engine, optimize, False) != reference]
+        configurations += [(reference[0], optimize, True) for optimize in Differential.OPTIMIZE_LEVELS]
+        for name, source_code in programs.items():
+            expected = Differential.run(source_code, *reference)
+            for configuration in configurations:
+                actual = Differential.run(source_code, *configuration)
+                if actual != expected:
+                    failures += 1
+                    label = Differential.label(*configuration)
+                    print(f"FAIL {name} [{label}]\n--- {reference[0]}\n{expected[0]}{expected[1:]}\n"
+                          f"--- {label}\n{actual[0]}{actual[1:]}")
+        print(f"{len(programs)} programs, {len(configurations)} configurations against {reference[0]}: "
+              f"{'all match' if failures == 0 else f'{failures} mismatches'}")
+        return 1 if failures else 0
+
+    @staticmethod
+    def label(engine: str, optimize: int, tier: bool) -> str:
+        return f"{engine} -O{optimize}{' --tier' if tier else ''}"
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare every Lox engine against the tree-walker')
+    parser.add_argument('files', nargs='*', help='extra .lox programs to compare')
+    args = parser.parse_args()
+    exit(Differential.main(args.files))
@@ -13,29 +13,29 @@ class GenerateAST:
         output_dir = args[0]
         GenerateAST.define_ast(output_dir, "Expr", [
             "Ternary    -   condition: Expr, then_branch: Expr, else_branch: Expr",
-            "Assign     -   name: Token, value: Expr",
+            "Assign     -   name: Token, value: Expr | depth: Optional[int] = None, idx: int = -1",
             "Binary     -   left: Expr, operator: Token, right: Expr",
             "Call       -   callee: Expr, paren: Token, arguments: List[Expr]",
-            "Get        -   obj: Expr, name: Token",
+            "Get        -   obj: Expr, name: Token | cache: Any = None",
             "Grouping   -   expression: Expr",
             "Literal    -   value: Any",
             "Logical    -   left: Expr, operator: Token, right: Expr",
-            "Set        -   obj: Expr, name: Token, value: Expr",
-            "Super      -   keyword: Token, method: Token",
-            "This       -   keyword: Token",
+            "Set        -   obj: Expr, name: Token, value: Expr | cache: Any = None",
+            "Super      -   keyword: Token, method: Token | depth: Optional[int] = None, idx: int = -1, cache: Any = None",
+            "This       -   keyword: Token | depth: Optional[int] = None, idx: int = -1",
             "Unary      -   operator: Token, right: Expr",
-            "Var        -   name: Token" # VariableExpr
+            "Var        -   name: Token | depth: Optional[int] = None, idx: int = -1" # VariableExpr
         ])
 
         GenerateAST.define_ast(output_dir, "Stmt", [
-            "Block          -   statements: List[Stmt]",
+            "Block          -   statements: List[Stmt] | locals: List[str] = list()",
             "Expression     -   expression: Expr",
-            "Function       -   name: Token, params: List[Token], body: List[Stmt]",
-            "Class          -   name: Token, superclass: Optional[VarExpr], methods: List[FunctionStmt]",
+            "Function       -   name: Token, params: List[Token], body: List[Stmt] | locals: List[str] = list(), slot: Optional[int] = None",
+            "Class          -   name: Token, superclass: Optional[VarExpr], methods: List[FunctionStmt] | slot: Optional[int] = None",
             "If             -   condition: Expr, thenBranch: Stmt, elsebranch: Optional[Stmt]",
             "Print          -   expression: Expr",
-            "Return         -   keyword: Token, value: Optional[Expr]",
-            "Var            -   name: Token, initializer: Optional[Expr]",
+            "Return         -   keyword: Token, value: Optional[Expr] | tail: bool = False",
+            "Var            -   name: Token, initializer: Optional[Expr] | slot: Optional[int] = None",
             "While          -   condition: Expr, body: Stmt",
             "Break          -   keyword: Token"
         ], ["from interpreter.expr import Expr, VarExpr"])
@@ -62,40 +62,47 @@ class GenerateAST:
             file.write('\n')
 
             file.write(f'class {base_class}(ABC):\n')
+            file.write('\t__slots__ = ()\n')
+            file.write('\n')
             file.write(f'\t@abstractmethod\n')
             file.write(f'\tdef accept(self, visitor: I{base_class}Visitor):\n')
             file.write('\t\t...\n')
             file.write('\n')
 
             for class_definition in class_definitions:
-                class_parts = class_definition.split('-')
+                class_parts = class_definition.split('-', 1)
                 class_name = class_parts[0].strip() + base_class
-                fields = class_parts[1].strip()
+                # Fields after '|' are filled in by later passes rather than the
+                # parser, so they get a default instead of a constructor argument.
+                fields, _, annotations = (part.strip() for part in class_parts[1].partition('|'))
+                field_names = [field.split(':')[0].strip() for field in fields.split(',')] if fields else []
+                annotation_fields = [annotation.split('=') for annotation in annotations.split(',')] if annotations else []
+                annotation_names = [annotation[0].split(':')[0].strip() for annotation in annotation_fields]
                 file.write(f'class {class_name}({base_class}):\n')
+                file.write(f'\t__slots__ = {tuple(field_names + annotation_names)!r}\n')
+                file.write('\n')
                 if fields:
                     file.write(f'\tdef __init__(self, {fields}):\n')
-                    for field in fields.split(','):
-                        field = field.split(':')[0].strip()
+                    for field in field_names:
                         file.write(f'\t\tself.{field} = {field}\n')
                 else:
                     file.write(f'\tdef __init__(self):\n')
-                    file.write('\t\tpass\n')
+                    if not annotation_fields:
+                        file.write('\t\tpass\n')
+                for annotation, default in annotation_fields:
+                    file.write(f'\t\tself.{annotation.strip()} = {default.strip()}\n')
                 file.write('\n')
+                # Double dispatch: each node calls its own visitor method directly.
                 file.write(f'\tdef accept(self, visitor: I{base_class}Visitor):\n')
-                file.write(f'\t\treturn visitor.visit_{base_class.lower()}(self)\n')
+                file.write(f'\t\treturn visitor.visit_{GenerateAST.get_snake_case(class_name)}(self)\n')
                 file.write('\n')
 
             file.write(f'class {base_class}Visitor(I{base_class}Visitor):\n')
             file.write(f'\tdef visit_{base_class.lower()}(self, expr):\n')
-            file.write('\t\tmatch expr:\n')
-            for class_definition in class_definitions:
-                class_parts = class_definition.split('-')
-                class_name = class_parts[0].strip() + base_class
-                file.write(f'\t\t\tcase {class_name}():\n')
-                file.write(f'\t\t\t\treturn self.visit_{GenerateAST.get_snake_case(class_name)}(expr)\n')
+            file.write('\t\treturn expr.accept(self)\n')
             file.write('\n')
             for class_definition in class_definitions:
-                class_parts = class_definition.split('-')
+                class_parts = class_definition.split('-', 1)
                 class_name = class_parts[0].strip()
                 file.write(f'\t@abstractmethod\n')
                 file.write(f'\tdef visit_{GenerateAST.get_snake_case(class_name)}_{GenerateAST.get_snake_case(base_class)}(self, {base_class.lower()}: {class_name}{base_class}):\n')
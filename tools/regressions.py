@@ -0,0 +1,67 @@
+import contextlib
+import io
+import sys
+from typing import Dict, Tuple
+
+from interpreter.interpreter import Interpreter
+from interpreter.lox import Lox
+from interpreter.lox_error_handler import LoxErrorHandler
+
+# name -> (program, exactly what running it prints)
+REGRESSIONS: Dict[str, Tuple[str, str]] = {
+    # Environment.define recorded a global's slot one past its value, and the
+    # resolver's own-initializer check indexed the scope stack at the top level.
+    'globals': ('var a = 1;\nvar b = "two";\nprint a;\nprint b;\n', '1\ntwo\n'),
+    # The resolver numbered a scope's slots from 1 while frames fill from 0.
+    'local_slots': ('{\n  var a = 1;\n  var b = 2;\n  print a;\n  print b;\n}\n', '1\n2\n'),
+    # Assigning to a local stored the AssignExpr node instead of its value.
+    'local_assign': ('{\n  var a = 1;\n  a = a + 1;\n  print a;\n}\n', '2\n'),
+    # super read its resolved (depth, idx) pair as a distance, and was
+    # rejected inside subclasses instead of in classes without a superclass.
+    'super_call': ('class A {\n  name() { return "A"; }\n}\nclass B < A {\n  name() { return super.name() + "B"; }\n}\n'
+                   'print B().name();\n', 'AB\n'),
+    'super_without_superclass': ('class A {\n  name() { return super.name(); }\n}\n',
+                                 "[line 2]: Error  at 'super': Can't use 'super' in a class with no superclass.\n"),
+    # Initializers looked `this` up without a slot index.
+    'initializer': ('class Point {\n  init(x) {\n    this.x = x;\n    if (x > 1) return;\n    this.x = 0;\n  }\n}\n'
+                    'print Point(3).x;\nprint Point(1).x;\n', '3\n0\n'),
+    # Call errors were Python RuntimeErrors, which escaped the interpreter.
+    'call_non_callable': ('var x = 1;\nprint "before";\nx();\n',
+                          'before\nCan only call functions and classes. \n [line 3]\n'),
+    'call_arity': ('fun f(a, b) { return a + b; }\nf(1);\n', 'Expected 2 arguments but got 1. \n [line 2]\n'),
+    'own_initializer': ('{\n  var a = 1;\n  {\n    var a = a;\n    print a;\n  }\n}\n',
+                        "[line 4]: Error  at 'a': Can't read local variable in its own initializer.\n"
+                        "[line 2]: Error  at 'a': The variable a is not used.\n"),
+}
+
+
+class Regressions:
+    """
+    Runs Lox programs that used to misbehave and reports any whose output,
+    including error reports, differs from what it should print.
+    """
+    @staticmethod
+    def run(source_code: str) -> str:
+        error_handler = LoxErrorHandler()
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            Lox.run(error_handler, Interpreter(error_handler), source_code)
+        return output.getvalue()
+
+    @staticmethod
+    def main() -> int:
+        failures = 0
+        for name, (source_code, expected) in REGRESSIONS.items():
+            try:
+                actual = Regressions.run(source_code)
+            except Exception as error:
+                actual = f"{type(error).__name__}: {error}\n"
+            if actual != expected:
+                failures += 1
+                print(f"{name}: expected {expected!r}, got {actual!r}")
+        print(f"{len(REGRESSIONS)} programs: {'all pass' if failures == 0 else f'{failures} failed'}")
+        return failures
+
+
+if __name__ == '__main__':
+    sys.exit(1 if Regressions.main() else 0)